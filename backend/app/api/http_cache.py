@@ -0,0 +1,156 @@
+"""
+Respuestas JSON con validación condicional y compresión precalculada (vistas de planes).
+
+- ETag fuerte a partir de la versión de la fila (career_plans.version) y de la máscara
+  de campos: con un If-None-Match que coincide se responde 304 sin cuerpo, sin leer las
+  fases ni serializar nada.
+- Content-Encoding br (si está instalado `brotli`) o gzip según Accept-Encoding. Cada
+  codificación es una representación distinta, así que lleva su propio ETag (sufijo
+  -br / -gzip); If-None-Match acepta cualquiera de ellas.
+- El cuerpo ya comprimido se guarda en una LRU por worker con clave (ETag, codificación):
+  las vistas repetidas de una versión no vuelven a montar el plan ni a comprimirlo. Una
+  versión nueva cambia la clave y la entrada vieja sale por LRU.
+- Cache-Control: settings.PLAN_VIEW_CACHE_CONTROL, con Vary: Accept-Encoding, Authorization.
+"""
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.api.responses import dumps
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # opcional: sin él solo se sirve gzip
+    brotli = None
+
+MIN_COMPRESS_BYTES = 500  # como GZipMiddleware: por debajo no compensa la cabecera de gzip
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9  # se comprime una vez por versión: compensa más calidad que al vuelo
+CODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def make_etag(*parts) -> str:
+    """Validador (sin comillas ni codificación) a partir de la versión del recurso."""
+    return "-".join(str(part) for part in parts)
+
+
+def digest(value: str) -> str:
+    """Resumen corto para meter en un ETag algo largo (máscara, versiones de un listado)."""
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()[:10]
+
+
+def mask_tag(fields: Optional[List[str]]) -> str:
+    """Parte del ETag que distingue las máscaras de campos (`all` sin máscara)."""
+    return digest(",".join(fields)) if fields else "all"
+
+
+def _matching_etag(request: Request, tag: str) -> Optional[str]:
+    """ETag de If-None-Match que corresponde a `tag` (en cualquier codificación) o None."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    if header.strip() == "*":
+        return f'"{tag}"'
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        value = candidate.removeprefix("W/").strip('"')
+        for coding in ("br", "gzip"):
+            value = value.removesuffix(f"-{coding}")
+        if value == tag:
+            return candidate
+    return None
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Codificación soportada con mayor q en Accept-Encoding (br ante empate) o None."""
+    best, best_q = None, 0.0
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if name not in CODINGS:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        if q > best_q or (q == best_q and name == "br"):
+            best, best_q = name, q
+    return best
+
+
+def _compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressedBodyCache:
+    """LRU de cuerpos ya serializados (y comprimidos) limitada por bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, Optional[str]]]" = OrderedDict()
+        self._bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, Optional[str]]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry
+
+    def put(self, key: Hashable, body: bytes, coding: Optional[str]) -> None:
+        if len(body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous[0])
+        self._entries[key] = (body, coding)
+        self._bytes += len(body)
+        while self._bytes > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.stats["evictions"] += 1
+
+    def snapshot(self) -> Dict:
+        return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes, **self.stats}
+
+
+body_cache = CompressedBodyCache(settings.PLAN_VIEW_CACHE_MAX_BYTES)
+
+
+async def conditional_json(request: Request, tag: str, build: Callable[[], Awaitable[Any]]) -> Response:
+    """
+    Respuesta JSON de la versión `tag`: 304 si el cliente ya la tiene; si no, el cuerpo de
+    la LRU o, la primera vez, `build()` serializado y comprimido según Accept-Encoding.
+    """
+    headers = {"Cache-Control": settings.PLAN_VIEW_CACHE_CONTROL, "Vary": "Accept-Encoding, Authorization"}
+    matched = _matching_etag(request, tag)
+    if matched is not None:
+        return Response(status_code=304, headers={"ETag": matched, **headers})
+
+    requested = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    key = (tag, requested)
+    cached = body_cache.get(key)
+    if cached is None:
+        body = dumps(await build())
+        coding = requested if requested and len(body) >= MIN_COMPRESS_BYTES else None
+        if coding:
+            body = _compress(body, coding)
+        body_cache.put(key, body, coding)
+    else:
+        body, coding = cached
+    headers["ETag"] = f'"{tag}-{coding}"' if coding else f'"{tag}"'
+    if coding:
+        headers["Content-Encoding"] = coding
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,67 @@
+import logging
+import time
+
+from app.config import settings
+from app.services.metrics import (
+    RequestMetrics, current_request, http_request_db_queries, http_request_duration, new_request_id,
+)
+
+logger = logging.getLogger("app.requests")
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro (sin BaseHTTPMiddleware, que no deja pasar el streaming tal cual):
+    asigna un id a la petición (X-Request-ID, o el que mande el cliente), deja en
+    `current_request` los acumulados de SQL y LLM, y al enviar el último fragmento de
+    la respuesta registra la latencia por plantilla de ruta (no por URL, para no
+    multiplicar las series con los ids).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request = RequestMetrics(request_id=request_id or new_request_id())
+        token = current_request.set(request)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request.request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_request_duration.observe(elapsed, scope["method"], route, str(status))
+            http_request_db_queries.observe(request.db_queries, route)
+            if settings.LOG_REQUESTS:
+                logger.info(
+                    "%s %s %s %.1fms",
+                    scope["method"], route, status, elapsed * 1000,
+                    extra={
+                        "route": route,
+                        "status": status,
+                        "duration_ms": round(elapsed * 1000, 2),
+                        "db_queries": request.db_queries,
+                        "db_ms": round(request.db_seconds * 1000, 2),
+                        "llm_calls": request.llm_calls,
+                        "llm_ms": round(request.llm_seconds * 1000, 2),
+                    },
+                )
+            current_request.reset(token)
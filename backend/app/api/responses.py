@@ -0,0 +1,40 @@
+"""
+Serialización JSON de las respuestas sin pasar por jsonable_encoder.
+
+- `dumps`: orjson si está instalado (opcional), si no json compacto de la stdlib. Mismo
+  resultado que JSONResponse: UTF-8 sin escapar y sin espacios.
+- FastJSONResponse: default_response_class de la app, para las rutas que devuelven dicts.
+- model_response: el cuerpo sale de model_dump_json (serializador compilado de pydantic,
+  tipado si el modelo lo está) y FastAPI no vuelve a validar ni a recorrer el modelo.
+  Al devolver una respuesta propia, FastAPI ignora las cabeceras puestas en un
+  `response: Response` inyectado: se pasan en `headers`.
+"""
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # opcional: sin él se usa json de la stdlib
+    orjson = None
+
+
+def dumps(content: Any, default=None) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_response(model: BaseModel, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Respuesta con el modelo ya serializado por pydantic (la ruta conserva su response_model para la documentación)."""
+    return Response(
+        content=model.model_dump_json(), status_code=status_code, media_type="application/json", headers=headers
+    )
@@ -1,45 +1,123 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+import asyncio
+import logging
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, SessionLocal, release_connection
 from app.dependencies import get_current_user
 from app import models
-from app.schemas import QuestionnaireAnswers, CareerPlanResponse, GeneratePlanFromChatRequest
-from app.services.groq_service import GroqService
+from app.api.responses import dumps, model_response
+from app.api.sse import SSE_HEADERS, sse_event
+from app.schemas import (
+    QuestionnaireAnswers, CareerPlanResponse, GeneratePlanFromChatRequest,
+    PlanJobRequest, ChatPlanJobRequest, JobResponse, BatchPlanRequest,
+)
+from app.config import settings
+from app.services.prompts import PLAN_PROMPT_VERSION
+from app.services.chat_context import estimate_tokens
+from app.services.plan_cache import PlanCache, plan_cache_key
+from app.services.plan_repair import plan_repair_stats
+from app.services.plan_stream_parser import PlanStreamParser
+from app.services import plan_search
+from app.services.job_queue import JobQueue, QueueFullError, send_callback
+from app.services.llm_client import get_groq_service
+from app.services.plan_storage import load_full_plan, store_plan
+from app.services.rate_limit import groq_rate_limiter
+from app.services.model_router import model_router
+from app.services.resilience import LLMUnavailableError, chat_hedger, circuit_breakers
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/ai", tags=["AI"])
-groq_service = GroqService()
+plan_cache = PlanCache()
+
+
+def _answers_dict(answers: QuestionnaireAnswers) -> Dict:
+    answers_dict = answers.model_dump()
+    # Asegurar que interests sea lista para el join en el prompt
+    if isinstance(answers_dict.get("interests"), str):
+        answers_dict["interests"] = [answers_dict["interests"]]
+    return answers_dict
+
+
+def _career_plan_from_answers(user_id: int, answers: QuestionnaireAnswers, generated_plan: Dict) -> models.CareerPlan:
+    return models.CareerPlan(
+        user_id=user_id,
+        title=generated_plan["plan_title"],
+        tech_stack=str(answers.interests),
+        difficulty_level=answers.level,
+        hours_per_day=answers.hours_per_day,
+        goal=answers.goal,
+        timeline_weeks=generated_plan.get("total_weeks", 24)
+    )
+
+
+async def _save_plan(db: AsyncSession, career_plan: models.CareerPlan, generated_plan: Dict) -> CareerPlanResponse:
+    """Guarda la fila y sus fases (plan_storage) y devuelve la respuesta con el plan completo."""
+    db.add(career_plan)
+    await db.flush()
+    store_plan(db, career_plan, generated_plan)
+    await db.commit()
+    await db.refresh(career_plan)
+    return _plan_response(career_plan, generated_plan)
+
+
+def _plan_response(career_plan: models.CareerPlan, generated_plan: Dict) -> CareerPlanResponse:
+    # La fila solo guarda la cabecera: la respuesta lleva el plan completo que ya tenemos en memoria
+    return CareerPlanResponse.model_validate(career_plan).model_copy(update={"generated_plan": generated_plan})
+
+
+async def _generate_plan(answers_dict: Dict, kind: str) -> Dict:
+    """Con PLAN_RETRIEVAL_ENABLED adapta el plan guardado más parecido en vez de generarlo entero."""
+    reference = None
+    if settings.PLAN_RETRIEVAL_ENABLED:
+        async with SessionLocal() as lookup_db:
+            reference = await plan_search.find_reference(lookup_db, answers_dict)
+    return await get_groq_service().generate_career_plan(answers_dict, kind, reference=reference)
+
+
+async def _generate_plan_cached(answers_dict: Dict, fresh: bool, db: Optional[AsyncSession], kind: str = "plan"):
+    """Genera el plan pasando por la caché. Devuelve (plan, "hit" | "coalesced" | "miss" | "off")."""
+    if not settings.PLAN_CACHE_ENABLED:
+        return await _generate_plan(answers_dict, kind), "off"
+    key = plan_cache_key(answers_dict, model_router.plan_model, PLAN_PROMPT_VERSION)
+    return await plan_cache.get_or_generate(
+        key,
+        lambda: _generate_plan(answers_dict, kind),
+        model=model_router.plan_model,
+        prompt_version=PLAN_PROMPT_VERSION,
+        db=db,
+        use_cache=not fresh
+    )
 
 
 @router.post("/generate-plan", response_model=CareerPlanResponse)
 async def generate_plan(
     answers: QuestionnaireAnswers,
+    fresh: bool = False,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
+    """
+    Genera un plan a partir del cuestionario. Cuestionarios equivalentes reutilizan
+    un plan cacheado; `fresh=true` fuerza una variación nueva del modelo.
+    La cabecera X-Plan-Cache indica hit, coalesced, miss u off.
+    """
+    await release_connection(db)
     try:
-        answers_dict = answers.model_dump()
-        # Asegurar que interests sea lista para el join en el prompt
-        if isinstance(answers_dict.get("interests"), str):
-            answers_dict["interests"] = [answers_dict["interests"]]
-        generated_plan = await groq_service.generate_career_plan(answers_dict)
-
-        career_plan = models.CareerPlan(
-            user_id=current_user.id,
-            title=generated_plan["plan_title"],
-            tech_stack=str(answers.interests),
-            difficulty_level=answers.level,
-            hours_per_day=answers.hours_per_day,
-            goal=answers.goal,
-            timeline_weeks=generated_plan.get("total_weeks", 24),
-            generated_plan=generated_plan
+        generated_plan, cache_status = await _generate_plan_cached(_answers_dict(answers), fresh, db)
+        career_plan = _career_plan_from_answers(current_user.id, answers, generated_plan)
+        # model_response es una respuesta nueva: las cabeceras van en ella, no en un Response inyectado
+        return model_response(
+            await _save_plan(db, career_plan, generated_plan), headers={"X-Plan-Cache": cache_status}
         )
 
-        db.add(career_plan)
-        db.commit()
-        db.refresh(career_plan)
-
-        return career_plan
-
+    except LLMUnavailableError:
+        raise
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -52,15 +130,206 @@ async def generate_plan(
         )
 
 
+@router.post("/generate-plan/stream")
+async def generate_plan_stream(
+    answers: QuestionnaireAnswers,
+    fresh: bool = False,
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Genera el plan en Server-Sent Events: eventos `token` con el texto según llega,
+    un evento `phase` por cada fase en cuanto su JSON se cierra y un evento `done`
+    con el CareerPlanResponse una vez parseado y guardado.
+    Con un plan en caché se envían directamente las fases y `done`, sin tokens.
+    Las fases o campos incompletos se reparan antes de `done`, que lleva el plan completo.
+    Si el cliente se desconecta o el JSON final no es recuperable, no se crea ninguna fila.
+    """
+    user_id = current_user.id
+    answers_dict = _answers_dict(answers)
+    use_cache = settings.PLAN_CACHE_ENABLED
+    cache_key = plan_cache_key(answers_dict, model_router.plan_model, PLAN_PROMPT_VERSION) if use_cache else None
+
+    async def event_stream():
+        generated_plan = None
+        cacheable = False
+        if use_cache and not fresh:
+            async with SessionLocal() as lookup_db:
+                generated_plan = await plan_cache.get(cache_key, lookup_db)
+        if generated_plan is not None:
+            for phase in generated_plan.get("phases", []):
+                yield sse_event("phase", phase)
+        else:
+            parser = PlanStreamParser()
+            try:
+                async for delta in get_groq_service().stream_career_plan(answers_dict):
+                    yield sse_event("token", {"content": delta})
+                    for phase in parser.feed(delta):
+                        yield sse_event("phase", phase)
+            except LLMUnavailableError as e:
+                yield sse_event("error", {"detail": str(e), "retry_after": e.retry_after})
+                return
+            except Exception as e:
+                logger.exception("Error in plan stream")
+                yield sse_event("error", {"detail": f"Error inesperado: {str(e)}"})
+                return
+
+            try:
+                generated_plan = await get_groq_service().validate_plan(parser.finish(), estimate_tokens(parser.text))
+            except json.JSONDecodeError as e:
+                yield sse_event("error", {"detail": f"Error generando el plan: La IA no generó JSON válido: {str(e)}"})
+                return
+            except LLMUnavailableError as e:
+                yield sse_event("error", {"detail": str(e), "retry_after": e.retry_after})
+                return
+            except ValueError as e:
+                yield sse_event("error", {"detail": f"Error generando el plan: {str(e)}"})
+                return
+            # Un plan cortado que se ha podido completar ya es válido y se puede cachear
+            cacheable = use_cache
+
+        async with SessionLocal() as db:
+            try:
+                if cacheable:
+                    await plan_cache.put(cache_key, generated_plan, model_router.plan_model, PLAN_PROMPT_VERSION, db)
+                career_plan = _career_plan_from_answers(user_id, answers, generated_plan)
+                done = await _save_plan(db, career_plan, generated_plan)
+            except Exception as e:
+                await db.rollback()
+                yield sse_event("error", {"detail": f"Error guardando el plan: {str(e)}"})
+                return
+        yield sse_event("done", done)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+def _ndjson(data: Dict) -> bytes:
+    return dumps(data) + b"\n"
+
+
+@router.post("/generate-plan/batch")
+async def generate_plan_batch(
+    body: BatchPlanRequest,
+    fresh: bool = False,
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Genera planes para una cohorte. Perfiles equivalentes (misma clave de la caché de
+    planes) se generan una sola vez; el resto sale en paralelo hasta
+    GROQ_MAX_CONCURRENT_BATCH y los límites por minuto de la API key.
+    Responde en NDJSON: una línea `item` por elemento en cuanto su plan está listo
+    y una línea `done` con los ids cuando todas las filas se han insertado de una vez.
+    Los planes del lote se guardan inactivos. Si el cliente se desconecta no se guarda nada.
+    """
+    if len(body.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo {settings.BATCH_MAX_ITEMS} elementos por lote"
+        )
+    user_id = current_user.id
+    groups: Dict[str, list] = {}
+    answers_by_key: Dict[str, Dict] = {}
+    for index, answers in enumerate(body.items):
+        answers_dict = _answers_dict(answers)
+        key = plan_cache_key(answers_dict, model_router.plan_model, PLAN_PROMPT_VERSION)
+        groups.setdefault(key, []).append(index)
+        answers_by_key.setdefault(key, answers_dict)
+
+    async def generate(key: str):
+        try:
+            plan, cache_status = await _generate_plan_cached(answers_by_key[key], fresh, None, kind="batch")
+            return key, plan, cache_status, None
+        except Exception as e:
+            return key, None, None, str(e) or type(e).__name__
+
+    async def lines():
+        tasks = [asyncio.ensure_future(generate(key)) for key in groups]
+        plans = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                key, plan, cache_status, error = await next_done
+                for index in groups[key]:
+                    if error is None:
+                        plans[index] = plan
+                        yield _ndjson({"type": "item", "index": index, "status": "ok", "cache": cache_status, "plan": plan})
+                    else:
+                        yield _ndjson({"type": "item", "index": index, "status": "error", "error": error})
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        indexes = sorted(plans)
+        async with SessionLocal() as db:
+            try:
+                career_plans = []
+                for index in indexes:
+                    career_plan = _career_plan_from_answers(user_id, body.items[index], plans[index])
+                    career_plan.is_active = False
+                    career_plans.append(career_plan)
+                # Un INSERT multi-fila para los planes y otro para todas sus fases
+                db.add_all(career_plans)
+                await db.flush()
+                for index, career_plan in zip(indexes, career_plans):
+                    store_plan(db, career_plan, plans[index])
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                yield _ndjson({"type": "error", "detail": f"Error guardando el lote: {str(e)}"})
+                return
+        yield _ndjson({
+            "type": "done",
+            "plans": [{"index": index, "plan_id": plan.id} for index, plan in zip(indexes, career_plans)],
+            "items": len(body.items),
+            "unique_profiles": len(groups),
+            "failed": len(body.items) - len(indexes),
+        })
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/limits/stats")
+def rate_limit_stats():
+    """Limitador por minuto de la API key, circuitos por modelo y hedging del chat en este worker."""
+    return {
+        **groq_rate_limiter.snapshot(),
+        "circuits": {model: breaker.snapshot() for model, breaker in circuit_breakers.items()},
+        "hedging": {"delay_seconds": chat_hedger.delay, **chat_hedger.stats},
+    }
+
+
+@router.get("/repair/stats")
+def repair_stats():
+    """Planes validados, reparados (por fase o por campo) y tokens ahorrados frente a regenerarlos."""
+    return plan_repair_stats.snapshot()
+
+
+@router.get("/retrieval/stats")
+def retrieval_stats():
+    """Planes generados adaptando uno guardado (aciertos del índice, fallbacks y tokens)."""
+    return plan_search.snapshot()
+
+
+@router.get("/models/stats")
+def model_stats():
+    """Modelo elegido para cada tarea y latencia/tokens/fallos por modelo en este worker."""
+    return model_router.snapshot()
+
+
+@router.get("/cache/stats")
+def plan_cache_stats():
+    """Aciertos/fallos de la caché de planes de este worker."""
+    return {"enabled": settings.PLAN_CACHE_ENABLED, **plan_cache.snapshot()}
+
+
 @router.post("/generate-plan-from-chat", response_model=CareerPlanResponse)
 async def generate_plan_from_chat(
     body: GeneratePlanFromChatRequest,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Genera un plan de carrera a partir de un mensaje libre del usuario (ej. qué quiere estudiar)."""
+    await release_connection(db)
     try:
-        generated_plan = await groq_service.generate_career_plan_from_chat(body.message)
+        generated_plan = await get_groq_service().generate_career_plan_from_chat(body.message)
 
         career_plan = models.CareerPlan(
             user_id=current_user.id,
@@ -69,16 +338,12 @@ async def generate_plan_from_chat(
             difficulty_level=None,
             hours_per_day=None,
             goal=None,
-            timeline_weeks=generated_plan.get("total_weeks", 24),
-            generated_plan=generated_plan
+            timeline_weeks=generated_plan.get("total_weeks", 24)
         )
+        return model_response(await _save_plan(db, career_plan, generated_plan))
 
-        db.add(career_plan)
-        db.commit()
-        db.refresh(career_plan)
-
-        return career_plan
-
+    except LLMUnavailableError:
+        raise
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -89,3 +354,238 @@ async def generate_plan_from_chat(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error inesperado: {str(e)}"
         )
+
+
+# --- Generación en segundo plano ---
+# El trabajo es la propia fila de CareerPlan: se crea en estado queued (inactiva)
+# y el worker guarda en ella el resultado o el error. Un worker se queda el trabajo
+# con un UPDATE condicional (queued -> running): las entregas duplicadas y los
+# reencolados de otros workers no lo ejecutan dos veces. started_at hace de lease:
+# un 'running' más antiguo que JOB_LEASE_SECONDS es de un worker caído y se reencola.
+
+
+def _job_response(career_plan: models.CareerPlan, generated_plan: Optional[Dict] = None) -> JobResponse:
+    return JobResponse(
+        job_id=career_plan.id,
+        status=career_plan.status,
+        error=career_plan.error,
+        created_at=career_plan.created_at,
+        completed_at=career_plan.completed_at,
+        plan=_plan_response(career_plan, generated_plan) if career_plan.status == "completed" else None,
+    )
+
+
+async def _claim_job(db: AsyncSession, job_id: int) -> Optional[datetime]:
+    """Pasa el trabajo de queued a running si sigue en cola; devuelve el started_at del intento o None."""
+    started_at = datetime.now(timezone.utc)
+    result = await db.execute(
+        update(models.CareerPlan)
+        .where(models.CareerPlan.id == job_id, models.CareerPlan.status == "queued")
+        .values(status="running", started_at=started_at)
+    )
+    await db.commit()
+    return started_at if result.rowcount == 1 else None
+
+
+async def _release_job(job_id: int, started_at: datetime):
+    """Devuelve a la cola un trabajo interrumpido (apagado del worker) para que otro lo retome."""
+    async with SessionLocal() as db:
+        await db.execute(
+            update(models.CareerPlan)
+            .where(
+                models.CareerPlan.id == job_id,
+                models.CareerPlan.status == "running",
+                models.CareerPlan.started_at == started_at,
+            )
+            .values(status="queued", started_at=None)
+        )
+        await db.commit()
+    if not plan_jobs.backend.volatile:
+        await plan_jobs.submit(job_id)
+
+
+async def _run_plan_job(job_id: int):
+    """Handler de la cola: genera el plan del trabajo y guarda estado y resultado en su fila."""
+    async with SessionLocal() as db:
+        started_at = await _claim_job(db, job_id)
+        if started_at is None:
+            return  # borrado, ya procesado o en otro worker (entrega duplicada)
+        try:
+            career_plan = await db.get(models.CareerPlan, job_id)
+            job_input = career_plan.job_input
+            # Sin transacción abierta ni conexión ocupada mientras se espera al LLM
+            await release_connection(db)
+            try:
+                if job_input["kind"] == "answers":
+                    generated_plan, _ = await _generate_plan_cached(
+                        job_input["answers"], job_input.get("fresh", False), db, kind="job"
+                    )
+                else:
+                    generated_plan = await get_groq_service().generate_career_plan_from_chat(job_input["message"], "job")
+            except Exception as e:
+                generated_plan, error = None, str(e) or type(e).__name__
+            else:
+                error = None
+        except asyncio.CancelledError:
+            await asyncio.shield(_release_job(job_id, started_at))
+            raise
+
+        # Si el lease ha caducado y otro worker ha retomado el trabajo, el resultado es suyo
+        owned = await db.scalar(select(models.CareerPlan.id).where(
+            models.CareerPlan.id == job_id,
+            models.CareerPlan.status == "running",
+            models.CareerPlan.started_at == started_at,
+        ))
+        if owned is None:
+            logger.warning("Job %s lost its lease, discarding result", job_id)
+            return
+        if error is None:
+            try:
+                career_plan.title = generated_plan.get("plan_title", "Mi plan de carrera")
+                career_plan.timeline_weeks = generated_plan.get("total_weeks", 24)
+                store_plan(db, career_plan, generated_plan)
+                career_plan.status = "completed"
+                career_plan.is_active = True
+            except Exception as e:
+                error = str(e) or type(e).__name__
+        if error is not None:
+            career_plan.status = "failed"
+            career_plan.error = error
+        career_plan.completed_at = datetime.now(timezone.utc)
+        await db.commit()
+        result = _job_response(career_plan, generated_plan if career_plan.status == "completed" else None)
+
+    await send_callback(career_plan.callback_url, result.model_dump(mode="json"))
+    if result.status == "failed":
+        raise RuntimeError(result.error)
+
+
+async def recover_plan_jobs():
+    """Reencola los trabajos 'running' cuyo lease ha caducado (el worker que los tenía se cayó)."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    stale = (
+        (models.CareerPlan.status == "running")
+        & ((models.CareerPlan.started_at < cutoff) | models.CareerPlan.started_at.is_(None))
+    )
+    async with SessionLocal() as db:
+        job_ids = (await db.execute(
+            update(models.CareerPlan).where(stale).values(status="queued", started_at=None)
+            .returning(models.CareerPlan.id)
+        )).scalars().all()
+        await db.commit()
+    for job_id in sorted(job_ids):
+        logger.warning("Job %s lease expired, requeueing", job_id)
+        try:
+            await plan_jobs.submit(job_id)
+        except QueueFullError:
+            break  # siguen en queued: con la cola en memoria los retoma el próximo arranque
+
+
+plan_jobs = JobQueue(_run_plan_job, recover=recover_plan_jobs)
+
+
+async def resume_plan_jobs():
+    """
+    Al arrancar: recupera los trabajos con el lease caducado y, con la cola en memoria
+    (que los pierde al reiniciar), reencola los que seguían en cola. Si varios workers
+    reencolan el mismo trabajo, solo uno se lo queda (_claim_job).
+    """
+    await recover_plan_jobs()
+    if not plan_jobs.backend.volatile:
+        return
+    async with SessionLocal() as db:
+        job_ids = (await db.execute(
+            select(models.CareerPlan.id)
+            .where(models.CareerPlan.status == "queued")
+            .order_by(models.CareerPlan.id)
+        )).scalars().all()
+    for job_id in job_ids:
+        try:
+            await plan_jobs.submit(job_id)
+        except QueueFullError:
+            break
+
+
+async def _enqueue_plan_job(db: AsyncSession, career_plan: models.CareerPlan, response: Response) -> JobResponse:
+    career_plan.status = "queued"
+    career_plan.is_active = False
+    db.add(career_plan)
+    await db.commit()
+    await db.refresh(career_plan)
+    try:
+        await plan_jobs.submit(career_plan.id)
+    except QueueFullError:
+        await db.delete(career_plan)
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Cola de generación llena. Intenta de nuevo en unos segundos.",
+            headers={"Retry-After": "10"},
+        )
+    response.headers["Location"] = f"/ai/jobs/{career_plan.id}"
+    return _job_response(career_plan)
+
+
+@router.post("/jobs/generate-plan", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def generate_plan_job(
+    body: PlanJobRequest,
+    response: Response,
+    fresh: bool = False,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Igual que /ai/generate-plan pero sin esperar al LLM: devuelve 202 con el id del
+    trabajo. El estado se consulta en GET /ai/jobs/{id} o llega a `callback_url`.
+    """
+    answers = QuestionnaireAnswers(**body.model_dump(exclude={"callback_url"}))
+    career_plan = models.CareerPlan(
+        user_id=current_user.id,
+        title="Generando plan...",
+        tech_stack=str(answers.interests),
+        difficulty_level=answers.level,
+        hours_per_day=answers.hours_per_day,
+        goal=answers.goal,
+        timeline_weeks=answers.timeline_weeks,
+        job_input={"kind": "answers", "answers": _answers_dict(answers), "fresh": fresh},
+        callback_url=body.callback_url,
+    )
+    return await _enqueue_plan_job(db, career_plan, response)
+
+
+@router.post("/jobs/generate-plan-from-chat", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def generate_plan_from_chat_job(
+    body: ChatPlanJobRequest,
+    response: Response,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Versión en segundo plano de /ai/generate-plan-from-chat."""
+    career_plan = models.CareerPlan(
+        user_id=current_user.id,
+        title="Generando plan...",
+        tech_stack=body.message,
+        job_input={"kind": "chat", "message": body.message},
+        callback_url=body.callback_url,
+    )
+    return await _enqueue_plan_job(db, career_plan, response)
+
+
+@router.get("/jobs/stats")
+async def plan_jobs_stats():
+    """Estado de la cola de este worker: en espera, en ejecución, completados, fallidos, rechazados."""
+    return await plan_jobs.snapshot()
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_plan_job(
+    job_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    career_plan = await db.get(models.CareerPlan, job_id)
+    if career_plan is None or career_plan.user_id != current_user.id or career_plan.job_input is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trabajo no encontrado")
+    if career_plan.status != "completed":
+        return model_response(_job_response(career_plan))
+    return model_response(_job_response(career_plan, await load_full_plan(db, career_plan)))
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from app.dependencies import get_current_user
+from app import models
+from app.schemas import UserInDB
+from app.services.auth import user_cache
+
+router = APIRouter(prefix="/auth", tags=["Auth"])
+
+
+@router.get("/me", response_model=UserInDB)
+async def me(current_user: models.User = Depends(get_current_user)):
+    """Usuario resuelto a partir del token (o el de desarrollo)."""
+    return current_user
+
+
+@router.get("/cache/stats")
+def user_cache_stats():
+    """Aciertos/fallos de la caché token -> usuario de este worker."""
+    return user_cache.snapshot()
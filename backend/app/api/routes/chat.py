@@ -1,78 +1,475 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.dependencies import get_current_user
+import asyncio
+import contextlib
+import json
+import logging
+from typing import Dict, List, Optional, Set
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, SessionLocal, release_connection
+from app.dependencies import get_current_user, user_for_token
 from app import models
-from app.schemas import ChatRequest, ChatResponse
-from app.services.groq_service import GroqService
+from app.api.responses import dumps, model_response
+from app.api.sse import SSE_HEADERS, sse_event
+from app.schemas import ChatRequest, ChatResponse, ChatHistoryResponse
+from app.config import settings
+from app.services import chat_session
+from app.services.chat_context import ChatContext
+from app.services.chat_session import ChatSession, ws_stats
+from app.services.chat_writer import chat_writer
+from app.services.llm_client import get_groq_service
+from app.services.progress import load_progress_context
+from app.services.resilience import LLMUnavailableError
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
-groq_service = GroqService()
+# Usuarios con un resumen en curso en este worker (uno a la vez por usuario)
+_summaries_in_progress: Set[int] = set()
+# Resúmenes lanzados desde /chat/ws (referencia para que no los recoja el GC a medias)
+_summary_tasks: Set[asyncio.Task] = set()
+
+
+class _SlowConsumer(Exception):
+    """El cliente del WebSocket no lee lo que se le envía."""
+
+
+async def _open_session(db: AsyncSession, user_id: int) -> ChatSession:
+    """Plan activo y progreso, historial reciente y resumen acumulado del usuario."""
+    # Plan activo y su resumen de progreso (contadores ya calculados: una búsqueda por clave)
+    user_context = await load_progress_context(db, user_id)
+
+    # Obtener historial de chat reciente y el resumen de lo anterior
+    chat_history = await _recent_history(db, user_id, settings.CHAT_HISTORY_FETCH_LIMIT)
+    summary = await db.get(models.ConversationSummary, user_id) if settings.CHAT_SUMMARY_ENABLED else None
+    return ChatSession(user_id=user_id, user_context=user_context, messages=chat_history, summary=summary)
+
+
+async def _load_chat_context(db: AsyncSession, user: models.User):
+    """
+    Devuelve (user_context, chat_context) para el prompt: plan activo y progreso +
+    historial reciente recortado al presupuesto de tokens + resumen acumulado.
+    """
+    session = await _open_session(db, user.id)
+    return session.user_context, session.chat_context()
+
+
+def _schedule_summary(background_tasks: BackgroundTasks, user_id: int, chat_context: ChatContext):
+    if chat_context.needs_summary:
+        background_tasks.add_task(_refresh_summary, user_id, chat_context)
+
+
+async def _refresh_summary(user_id: int, chat_context: ChatContext):
+    """
+    Incorpora al resumen los mensajes que han salido de la ventana. Se ejecuta
+    después de enviar la respuesta; si falla se conserva el resumen anterior.
+    Devuelve (resumen, last_message_id) si lo ha guardado, None si no.
+    """
+    if user_id in _summaries_in_progress:
+        return None
+    _summaries_in_progress.add(user_id)
+    try:
+        text = await get_groq_service().summarize_conversation(chat_context.summary, chat_context.pending)
+        if not text:
+            return None
+        last_message_id = chat_context.pending[-1]["id"]
+        async with SessionLocal() as db:
+            row = await db.get(models.ConversationSummary, user_id)
+            if row is None:
+                db.add(models.ConversationSummary(user_id=user_id, summary=text, last_message_id=last_message_id))
+            elif row.last_message_id < last_message_id:
+                row.summary = text
+                row.last_message_id = last_message_id
+            await db.commit()
+        return text, last_message_id
+    except Exception:
+        logger.exception("Error updating chat summary")
+        return None
+    finally:
+        _summaries_in_progress.discard(user_id)
+
+
+async def _history_page(db: AsyncSession, user_id: int, limit: int, cursor: Optional[int] = None) -> List[models.ChatMessage]:
+    """
+    Página de historial (más recientes primero) con paginación por cursor:
+    el cursor es el id del último mensaje de la página anterior y se continúa
+    por (timestamp, id) sobre el índice (user_id, timestamp), sin OFFSET.
+    """
+    query = select(models.ChatMessage).where(models.ChatMessage.user_id == user_id)
+    if cursor is not None:
+        # Comparar con el timestamp guardado (subconsulta por PK) y no con uno
+        # reconstruido en Python, que en SQLite puede diferir en el formato
+        cursor_timestamp = select(models.ChatMessage.timestamp).where(
+            models.ChatMessage.id == cursor
+        ).scalar_subquery()
+        query = query.where(
+            tuple_(models.ChatMessage.timestamp, models.ChatMessage.id) < tuple_(cursor_timestamp, cursor)
+        )
+    query = query.order_by(
+        models.ChatMessage.timestamp.desc(), models.ChatMessage.id.desc()
+    ).limit(limit)
+    return list((await db.execute(query)).scalars())
+
+
+async def _recent_history(db: AsyncSession, user_id: int, limit: int) -> List:
+    """Historial reciente incluyendo los turnos que siguen en el búfer de escritura."""
+    # Copia antes de consultar: si el lote se escribe entretanto ya trae su id y se descarta abajo
+    pending = chat_writer.pending_for(user_id)
+    messages = await _history_page(db, user_id, limit)
+    if pending:
+        stored = {m.id for m in messages}
+        messages = ([m for m in pending if m.id is None or m.id not in stored] + messages)[:limit]
+    return messages
+
+
+async def _save_turn(db: AsyncSession, user_id: int, message: str, response_text: str):
+    """
+    Guarda el mensaje del usuario y la respuesta del asistente en una sola transacción,
+    o los encola en el búfer de escritura diferida si está activo. Devuelve ambos mensajes.
+    """
+    if chat_writer.active:
+        return await chat_writer.enqueue(user_id, message, response_text)
+
+    # Guardar mensaje del usuario
+    user_message = models.ChatMessage(
+        user_id=user_id,
+        role="user",
+        content=message
+    )
+    db.add(user_message)
+
+    # Guardar respuesta del asistente
+    assistant_message = models.ChatMessage(
+        user_id=user_id,
+        role="assistant",
+        content=response_text
+    )
+    db.add(assistant_message)
+
+    await db.commit()
+    await db.refresh(assistant_message)
+    return user_message, assistant_message
+
+
+@router.get("/history", response_model=ChatHistoryResponse)
+async def get_history(
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[int] = None,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Historial de chat del usuario, del más reciente al más antiguo, paginado por cursor."""
+    if chat_writer.has_pending(current_user.id):
+        # Los cursores son ids de la base de datos: escribir antes lo pendiente
+        await chat_writer.flush()
+    messages = await _history_page(db, current_user.id, limit + 1, cursor)
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    return model_response(ChatHistoryResponse(
+        messages=messages,
+        next_cursor=str(messages[-1].id) if has_more else None
+    ))
 
 
 @router.post("/message", response_model=ChatResponse)
 async def send_message(
     request: ChatRequest,
+    background_tasks: BackgroundTasks,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    # Obtener plan activo del usuario para contexto
-    active_plan = db.query(models.CareerPlan).filter(
-        models.CareerPlan.user_id == current_user.id,
-        models.CareerPlan.is_active == True
-    ).first()
-
-    # Obtener historial de chat reciente
-    chat_history = db.query(models.ChatMessage).filter(
-        models.ChatMessage.user_id == current_user.id
-    ).order_by(models.ChatMessage.timestamp.desc()).limit(10).all()
-
-    history = [
-        {"role": msg.role, "content": msg.content}
-        for msg in reversed(chat_history)
-    ]
-
-    # Preparar contexto del usuario
-    user_context = {
-        "plan_title": active_plan.title if active_plan else "Sin plan aún",
-        "current_phase": "Fase 1",
-        "progress_percentage": 0,
-        "completed_projects": 0
-    }
+    user_context, chat_context = await _load_chat_context(db, current_user)
+    await release_connection(db)
+    _schedule_summary(background_tasks, current_user.id, chat_context)
 
     try:
-        response_text = await groq_service.chat_with_context(
+        response_text = await get_groq_service().chat_with_context(
             message=request.message,
             user_context=user_context,
-            chat_history=history
-        )
-
-        # Guardar mensaje del usuario
-        user_message = models.ChatMessage(
-            user_id=current_user.id,
-            role="user",
-            content=request.message
-        )
-        db.add(user_message)
-
-        # Guardar respuesta del asistente
-        assistant_message = models.ChatMessage(
-            user_id=current_user.id,
-            role="assistant",
-            content=response_text
+            chat_history=chat_context.history,
+            summary=chat_context.summary,
+            user_id=current_user.id
         )
-        db.add(assistant_message)
 
-        db.commit()
-        db.refresh(assistant_message)
+        _, assistant_message = await _save_turn(db, current_user.id, request.message, response_text)
 
-        return ChatResponse(
+        return model_response(ChatResponse(
             message=response_text,
             timestamp=assistant_message.timestamp
-        )
+        ))
 
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error en el chat: {str(e)}"
         )
+
+
+@router.post("/message/stream")
+async def send_message_stream(
+    request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Igual que /chat/message pero en Server-Sent Events: un evento `token` por
+    fragmento y un evento `done` con el ChatResponse cuando la respuesta se ha guardado.
+    Si el cliente se desconecta o Groq falla a mitad, no se guarda nada.
+    """
+    user_context, chat_context = await _load_chat_context(db, current_user)
+    await release_connection(db)
+    _schedule_summary(background_tasks, current_user.id, chat_context)
+    user_id = current_user.id
+
+    async def event_stream():
+        parts = []
+        try:
+            async for delta in get_groq_service().stream_chat_with_context(
+                message=request.message,
+                user_context=user_context,
+                chat_history=chat_context.history,
+                summary=chat_context.summary,
+                user_id=user_id
+            ):
+                parts.append(delta)
+                yield sse_event("token", {"content": delta})
+        except LLMUnavailableError as e:
+            yield sse_event("error", {"detail": str(e), "retry_after": e.retry_after})
+            return
+        except Exception as e:
+            logger.exception("Error in chat stream")
+            yield sse_event("error", {"detail": f"Error en el chat: {str(e)}"})
+            return
+
+        response_text = "".join(parts)
+        if not response_text.strip():
+            yield sse_event("error", {"detail": "La IA no generó respuesta. Intenta de nuevo."})
+            return
+
+        # La sesión de la petición puede estar ya cerrada: usar una propia para el guardado final
+        async with SessionLocal() as write_db:
+            try:
+                _, assistant_message = await _save_turn(write_db, user_id, request.message, response_text)
+                done = ChatResponse(message=response_text, timestamp=assistant_message.timestamp)
+            except Exception as e:
+                await write_db.rollback()
+                yield sse_event("error", {"detail": f"Error guardando el chat: {str(e)}"})
+                return
+        yield sse_event("done", done)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+def _bearer_token(websocket: WebSocket, token: Optional[str]) -> Optional[str]:
+    """Token de ?token= (los navegadores no ponen cabeceras en un WebSocket) o de Authorization."""
+    if token:
+        return token
+    scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    return credentials.strip() or None
+
+
+async def _ws_send(websocket: WebSocket, payload: Dict):
+    """
+    Envía un evento. Tras una desconexión el envío falla con distintos errores según el
+    servidor (RuntimeError, ConnectionClosed, OSError...): todos se tratan como desconexión.
+    """
+    try:
+        await asyncio.wait_for(
+            websocket.send_text(dumps(payload).decode("utf-8")), settings.CHAT_WS_SEND_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        raise _SlowConsumer()
+    except WebSocketDisconnect:
+        raise
+    except Exception as e:
+        raise WebSocketDisconnect(code=status.WS_1006_ABNORMAL_CLOSURE, reason=type(e).__name__) from e
+
+
+async def _ws_close(websocket: WebSocket, code: int, reason: str = ""):
+    # Con un cliente que no lee, el cierre también puede quedarse esperando
+    with contextlib.suppress(Exception):
+        await asyncio.wait_for(websocket.close(code=code, reason=reason), settings.CHAT_WS_SEND_TIMEOUT_SECONDS)
+
+
+def _refresh_session_summary(session: ChatSession, chat_context: ChatContext):
+    """Como _schedule_summary, y el resumen guardado pasa también a la sesión de la conexión."""
+    if not chat_context.needs_summary:
+        return
+    task = asyncio.create_task(_refresh_summary(session.user_id, chat_context))
+    _summary_tasks.add(task)
+
+    def done(task: asyncio.Task):
+        _summary_tasks.discard(task)
+        result = None if task.cancelled() else task.result()
+        if result is not None:
+            session.set_summary(*result)
+
+    task.add_done_callback(done)
+
+
+async def _stream_reply(websocket: WebSocket, session: ChatSession, message: str) -> Optional[str]:
+    """
+    Envía la respuesta token a token y la devuelve completa (None si Groq ha fallado).
+    Backpressure: mientras el envío anterior no ha terminado los fragmentos se acumulan
+    y salen juntos en el siguiente, así que un cliente lento recibe menos mensajes más
+    grandes sin frenar la lectura de Groq; si tarda más de CHAT_WS_SEND_TIMEOUT_SECONDS
+    en aceptar un envío se cierra la conexión.
+    """
+    chat_context = session.chat_context()
+    _refresh_session_summary(session, chat_context)
+    parts: List[str] = []
+    pending: List[str] = []
+    sending: Optional[asyncio.Task] = None
+    error: Optional[Dict] = None
+    try:
+        async for delta in get_groq_service().stream_chat_with_context(
+            message=message,
+            user_context=session.user_context,
+            chat_history=chat_context.history,
+            summary=chat_context.summary,
+            user_id=session.user_id
+        ):
+            parts.append(delta)
+            pending.append(delta)
+            if sending is None or sending.done():
+                if sending is not None:
+                    sending.result()
+                sending = asyncio.create_task(_ws_send(websocket, {"type": "token", "content": "".join(pending)}))
+                pending = []
+    except LLMUnavailableError as e:
+        error = {"type": "error", "detail": str(e), "retry_after": e.retry_after}
+    except (_SlowConsumer, WebSocketDisconnect):
+        raise
+    except Exception as e:
+        logger.exception("Error in chat websocket")
+        error = {"type": "error", "detail": f"Error en el chat: {str(e)}"}
+    finally:
+        if sending is not None:
+            # Se espera siempre (también tras un error) para no dejar envíos concurrentes
+            await asyncio.wait([sending])
+    if sending is not None:
+        sending.result()
+    if error is not None:
+        await _ws_send(websocket, error)
+        return None
+    if pending:
+        await _ws_send(websocket, {"type": "token", "content": "".join(pending)})
+    return "".join(parts)
+
+
+async def _ws_turn(websocket: WebSocket, session: ChatSession, message: str):
+    """Un turno del WebSocket: respuesta en streaming, guardado y actualización de la sesión."""
+    response_text = await _stream_reply(websocket, session, message)
+    if response_text is None:
+        return
+    if not response_text.strip():
+        await _ws_send(websocket, {"type": "error", "detail": "La IA no generó respuesta. Intenta de nuevo."})
+        return
+
+    async with SessionLocal() as db:
+        try:
+            user_message, assistant_message = await _save_turn(db, session.user_id, message, response_text)
+        except Exception as e:
+            await db.rollback()
+            await _ws_send(websocket, {"type": "error", "detail": f"Error guardando el chat: {str(e)}"})
+            return
+    session.add_turn(user_message, assistant_message)
+    ws_stats["turns"] += 1
+    done = ChatResponse(message=response_text, timestamp=assistant_message.timestamp)
+    await _ws_send(websocket, {"type": "done", **done.model_dump(mode="json")})
+
+
+@router.websocket("/ws")
+async def chat_websocket(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """
+    Chat por WebSocket para conversaciones seguidas: autentica una vez (?token= o
+    Authorization: Bearer), carga plan, progreso, historial y resumen en una ChatSession
+    y la actualiza en memoria con cada turno, sin las consultas de /chat/message.
+
+    Cliente: {"type": "message", "message": "..."} o {"type": "ping"}; un turno a la vez.
+    Servidor: `ready` al conectar, `token` {"content"} por fragmento, `done` con el
+    ChatResponse cuando el turno se ha guardado, `error` {"detail"} (la conexión sigue
+    abierta) y `pong`. Se cierra tras CHAT_WS_IDLE_TIMEOUT_SECONDS sin mensajes.
+    """
+    await websocket.accept()
+    if ws_stats["active"] >= settings.CHAT_WS_MAX_CONNECTIONS:
+        ws_stats["rejected"] += 1
+        await _ws_close(websocket, status.WS_1013_TRY_AGAIN_LATER, "Demasiadas conexiones")
+        return
+
+    ws_stats["active"] += 1
+    ws_stats["opened"] += 1
+    try:
+        try:
+            async with SessionLocal() as db:
+                user = await user_for_token(_bearer_token(websocket, token), db)
+                session = await _open_session(db, user.id)
+        except HTTPException as e:
+            ws_stats["auth_failed"] += 1
+            await _ws_close(websocket, status.WS_1008_POLICY_VIOLATION, e.detail)
+            return
+        await _ws_send(websocket, {"type": "ready"})
+
+        while True:
+            try:
+                received = await asyncio.wait_for(websocket.receive(), settings.CHAT_WS_IDLE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                ws_stats["idle_closed"] += 1
+                await _ws_close(websocket, status.WS_1000_NORMAL_CLOSURE, "Cerrada por inactividad")
+                return
+            if received["type"] == "websocket.disconnect":
+                break
+            try:
+                data = json.loads(received.get("text") or received.get("bytes") or "")
+                kind = data.get("type", "message")
+                if kind == "ping":
+                    await _ws_send(websocket, {"type": "pong"})
+                    continue
+                if kind != "message":
+                    raise ValueError(f"Tipo de mensaje desconocido: {kind}")
+                request = ChatRequest.model_validate(data)
+            except (ValueError, AttributeError, ValidationError) as e:
+                await _ws_send(websocket, {"type": "error", "detail": f"Mensaje no válido: {str(e)}"})
+                continue
+
+            if session.stale:
+                # Recoger lo que haya cambiado fuera de esta conexión (progreso, otras pestañas)
+                async with SessionLocal() as db:
+                    session = await _open_session(db, session.user_id)
+                ws_stats["context_reloads"] += 1
+            await _ws_turn(websocket, session, request.message)
+    except WebSocketDisconnect:
+        pass
+    except _SlowConsumer:
+        ws_stats["slow_closed"] += 1
+        await _ws_close(websocket, status.WS_1008_POLICY_VIOLATION, "Cliente demasiado lento")
+    finally:
+        ws_stats["active"] -= 1
+
+
+@router.get("/ws/stats")
+def chat_websocket_stats():
+    """Conexiones WebSocket de este worker: abiertas, rechazadas y cerradas por inactividad o lentitud."""
+    return chat_session.snapshot()
+
+
+@router.get("/cache/stats")
+def semantic_cache_stats():
+    """Aciertos/fallos de la caché semántica del chat de este worker."""
+    semantic_cache = get_groq_service().semantic_cache
+    if semantic_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **semantic_cache.snapshot()}
+
+
+@router.get("/writes/stats")
+def chat_write_stats():
+    """Estado del búfer de escritura diferida de este worker (lotes, mensajes pendientes)."""
+    return {"enabled": chat_writer.active, **chat_writer.snapshot()}
@@ -0,0 +1,267 @@
+from collections import defaultdict
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.dependencies import get_current_user
+from app import models
+from app.api.http_cache import conditional_json, digest, make_etag, mask_tag
+from app.schemas import (
+    CareerPlanResponse, CareerPlanSummary, PhaseProgressUpdate, PhaseSummary, PlanProgressDetail,
+    PlanProgressResponse, PlanSearchResult, ProjectProgressUpdate,
+)
+from app.services import plan_search, progress
+from app.services.plan_storage import (
+    apply_field_mask, assemble_plan, decompress_json, load_phases, mask_needs_content, phase_to_dict,
+)
+
+router = APIRouter(prefix="/ai/plans", tags=["Plans"])
+
+FIELDS_DESCRIPTION = (
+    "Máscara de campos separados por comas con rutas con puntos, "
+    "p. ej. `plan_title,phases.title,phases.projects.title`"
+)
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()] or None
+
+
+async def _owned_plan(db: AsyncSession, plan_id: int, user: models.User, column=models.CareerPlan):
+    """Fila del plan (o solo `column`) si pertenece al usuario; 404 en otro caso."""
+    found = (await db.execute(
+        select(column).where(
+            models.CareerPlan.id == plan_id,
+            models.CareerPlan.user_id == user.id
+        )
+    )).scalar_one_or_none()
+    if found is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plan no encontrado")
+    return found
+
+
+async def _phase_summaries(db: AsyncSession, plan_ids: List[int]) -> dict:
+    """Títulos y duraciones de las fases de varios planes (sin descomprimir contenido)."""
+    phases = defaultdict(list)
+    phase_rows = await db.execute(
+        select(
+            models.PlanPhase.plan_id,
+            models.PlanPhase.position,
+            models.PlanPhase.title,
+            models.PlanPhase.duration_weeks,
+        )
+        .where(models.PlanPhase.plan_id.in_(plan_ids))
+        .order_by(models.PlanPhase.plan_id, models.PlanPhase.position)
+    )
+    for row in phase_rows:
+        phases[row.plan_id].append(PhaseSummary(position=row.position, title=row.title, duration_weeks=row.duration_weeks))
+    return phases
+
+
+@router.get("", response_model=List[CareerPlanSummary])
+async def list_plans(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Planes del usuario (más recientes primero) con los títulos de sus fases, sin contenido.
+    El ETag cambia si cambia algún plan del listado (id o versión); con If-None-Match
+    igual se responde 304 sin leer las fases.
+    """
+    plans = (await db.execute(
+        select(
+            models.CareerPlan.id,
+            models.CareerPlan.title,
+            models.CareerPlan.timeline_weeks,
+            models.CareerPlan.is_active,
+            models.CareerPlan.status,
+            models.CareerPlan.created_at,
+            models.CareerPlan.version,
+        )
+        .where(models.CareerPlan.user_id == current_user.id)
+        .order_by(models.CareerPlan.id.desc())
+        .limit(limit)
+    )).all()
+    versions = ",".join(f"{plan.id}.{plan.version}" for plan in plans)
+    tag = make_etag("plans", current_user.id, limit, digest(versions))
+
+    async def build():
+        if not plans:
+            return []
+        phases = await _phase_summaries(db, [plan.id for plan in plans])
+        return [
+            CareerPlanSummary(**plan._mapping, phases=phases[plan.id]).model_dump(mode="json")
+            for plan in plans
+        ]
+
+    return await conditional_json(request, tag, build)
+
+
+@router.get("/search", response_model=List[PlanSearchResult])
+async def search_plans(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(10, ge=1, le=50),
+    mode: str = Query("hybrid", pattern="^(hybrid|text|vector)$"),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Busca entre los planes del usuario por texto (FTS5 / tsvector sobre títulos, objetivo,
+    fases, proyectos y tecnologías), por similitud del perfil o combinando ambos (`hybrid`).
+    El documento indexado lleva texto libre del usuario (objetivo, mensaje del chat), así
+    que nunca se busca en planes de otros: eso solo lo hace find_reference por dentro.
+    """
+    hits = await plan_search.search_plans(db, q, limit, user_id=current_user.id, mode=mode)
+    if not hits:
+        return []
+    ids = [plan_id for plan_id, _ in hits]
+    entries = {
+        row.plan_id: row for row in await db.execute(
+            select(
+                models.PlanSearchEntry.plan_id,
+                models.PlanSearchEntry.level,
+                models.PlanSearchEntry.total_weeks,
+                models.CareerPlan.title,
+            )
+            .join(models.CareerPlan, models.CareerPlan.id == models.PlanSearchEntry.plan_id)
+            .where(models.PlanSearchEntry.plan_id.in_(ids))
+        )
+    }
+    phases = await _phase_summaries(db, ids)
+    return [
+        PlanSearchResult(
+            plan_id=plan_id, title=entries[plan_id].title, level=entries[plan_id].level,
+            total_weeks=entries[plan_id].total_weeks, score=score, phases=phases[plan_id],
+        )
+        for plan_id, score in hits if plan_id in entries
+    ]
+
+
+@router.get("/{plan_id}")
+async def get_plan(
+    plan_id: int,
+    request: Request,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Plan completo (CareerPlanResponse). Con `fields`, generated_plan se proyecta a esos
+    campos; si la máscara solo toca títulos/duraciones/descripciones de las fases no se
+    descomprime ningún contenido.
+    ETag por versión del plan y máscara: 304 con If-None-Match igual y, si no, el cuerpo
+    ya comprimido de esa versión (http_cache).
+    """
+    mask = _parse_fields(fields)
+    career_plan = await _owned_plan(db, plan_id, current_user)
+
+    async def build():
+        with_content = mask_needs_content(mask)
+        rows = await load_phases(db, plan_id, with_content=with_content)
+        body = CareerPlanResponse.model_validate(career_plan).model_dump(mode="json")
+        body["generated_plan"] = apply_field_mask(
+            assemble_plan(career_plan.generated_plan, rows, with_content), mask
+        )
+        return body
+
+    return await conditional_json(request, make_etag("plan", plan_id, career_plan.version, mask_tag(mask)), build)
+
+
+@router.get("/{plan_id}/phases/{position}")
+async def get_plan_phase(
+    plan_id: int,
+    position: int,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Máscara de campos de la fase, p. ej. `title,projects.title`"),
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Una sola fase del plan (1 = primera), leyendo y descomprimiendo solo esa fila. ETag como get_plan."""
+    mask = _parse_fields(fields)
+    version = await _owned_plan(db, plan_id, current_user, column=models.CareerPlan.version)
+
+    async def build():
+        with_content = mask_needs_content(mask, prefix="")
+        rows = await load_phases(db, plan_id, position=position, with_content=with_content)
+        if not rows:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fase no encontrada")
+        return apply_field_mask(phase_to_dict(rows[0], with_content), mask)
+
+    return await conditional_json(request, make_etag("phase", plan_id, version, position, mask_tag(mask)), build)
+
+
+def _progress_body(summary: models.PlanProgress) -> dict:
+    return {
+        "plan_id": summary.plan_id,
+        "total_phases": summary.total_phases,
+        "completed_phases": summary.completed_phases,
+        "total_projects": summary.total_projects,
+        "completed_projects": summary.completed_projects,
+        "current_phase": summary.current_phase,
+        "current_phase_title": summary.current_phase_title,
+        "progress_percentage": progress.progress_percentage(summary),
+    }
+
+
+async def _owned_phase(db: AsyncSession, plan_id: int, position: int, user: models.User, with_content: bool = False):
+    await _owned_plan(db, plan_id, user, column=models.CareerPlan.id)
+    rows = await load_phases(db, plan_id, position=position, with_content=with_content)
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fase no encontrada")
+    return rows[0]
+
+
+@router.get("/{plan_id}/progress", response_model=PlanProgressDetail)
+async def get_plan_progress(
+    plan_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Resumen de progreso del plan con las fases completadas y el estado de cada proyecto."""
+    await _owned_plan(db, plan_id, current_user, column=models.CareerPlan.id)
+    summary = await progress.ensure_summary(db, plan_id, current_user.id)
+    detail = await progress.load_progress_detail(db, plan_id)
+    return PlanProgressDetail(
+        **_progress_body(summary),
+        completed_phase_positions=detail["completed_phases"],
+        projects=detail["projects"],
+    )
+
+
+@router.put("/{plan_id}/phases/{position}/progress", response_model=PlanProgressResponse)
+async def update_phase_progress(
+    plan_id: int,
+    position: int,
+    request: PhaseProgressUpdate,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Marca una fase (1 = primera) como completada o pendiente; devuelve el resumen del plan."""
+    await _owned_phase(db, plan_id, position, current_user)
+    summary = await progress.set_phase_completed(db, current_user.id, plan_id, position, request.completed)
+    return _progress_body(summary)
+
+
+@router.put("/{plan_id}/phases/{position}/projects/{project_index}/progress", response_model=PlanProgressResponse)
+async def update_project_progress(
+    plan_id: int,
+    position: int,
+    project_index: int,
+    request: ProjectProgressUpdate,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Marca un proyecto de la fase (1 = primero) y guarda su repositorio / notas; devuelve el resumen del plan."""
+    phase = await _owned_phase(db, plan_id, position, current_user, with_content=True)
+    if not 1 <= project_index <= len(decompress_json(phase.content).get("projects") or []):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado")
+    summary = await progress.set_project_progress(
+        db, current_user.id, plan_id, position, project_index,
+        request.completed, github_url=request.github_url, notes=request.notes,
+    )
+    return _progress_body(summary)
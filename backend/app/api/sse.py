@@ -0,0 +1,17 @@
+from typing import Any
+
+from pydantic import BaseModel
+
+from app.api.responses import dumps
+
+# Cabeceras para que proxies (nginx, Vercel) no acumulen el stream antes de enviarlo
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Formatea un evento Server-Sent Events con datos JSON (los modelos, con model_dump_json)."""
+    payload = data.model_dump_json() if isinstance(data, BaseModel) else dumps(data, default=str).decode("utf-8")
+    return f"event: {event}\ndata: {payload}\n\n"
@@ -0,0 +1,46 @@
+"""
+Validación de las callback_url de los trabajos (SSRF): https y solo hosts públicos.
+La usan los esquemas al recibir la petición y la cola al enviar el callback.
+"""
+import ipaddress
+from typing import Set
+from urllib.parse import urlsplit
+
+from app.config import settings
+
+
+def allowed_callback_hosts() -> Set[str]:
+    return {host.strip().lower() for host in settings.JOB_CALLBACK_ALLOWED_HOSTS.split(",") if host.strip()}
+
+
+def is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])  # sin zona de IPv6 (fe80::1%eth0)
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global
+
+
+def check_callback_url(url: str) -> str:
+    """
+    Valida una callback_url al recibir el trabajo: https y sin apuntar a la red interna
+    (loopback, privadas, link-local como la de metadatos de la nube) para que la API no
+    sirva de proxy hacia ella (SSRF). Los hosts de JOB_CALLBACK_ALLOWED_HOSTS se admiten
+    siempre. Los nombres se resuelven y comprueban otra vez al enviar (send_callback).
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if not host:
+        raise ValueError("callback_url sin host")
+    if host in allowed_callback_hosts():
+        return url
+    if parts.scheme != "https":
+        raise ValueError("callback_url debe usar https")
+    if host == "localhost" or host.endswith(".localhost"):
+        raise ValueError("callback_url no puede apuntar a la red interna")
+    try:
+        public = is_public_address(host)
+    except ValueError:
+        return url  # nombre de host: se comprueba lo que resuelve al enviar
+    if not public:
+        raise ValueError("callback_url no puede apuntar a la red interna")
+    return url
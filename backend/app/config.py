@@ -13,16 +13,143 @@ class Settings(BaseSettings):
     APP_NAME: str = "Plan Carrera API"
     DEBUG: bool = False
     
-    # Base de datos
+    # Observabilidad: /metrics (Prometheus) y logs con id de petición
+    METRICS_ENABLED: bool = True
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = False  # una línea JSON por registro (para agregadores de logs)
+    LOG_REQUESTS: bool = False  # una línea por petición con latencia, consultas SQL y llamadas al LLM
+    
+    # Base de datos (sqlite:// y postgresql:// se convierten a los drivers aiosqlite / asyncpg)
     DATABASE_URL: str = "sqlite:///./plan_carrera.db"
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # por debajo del idle timeout típico de Postgres gestionado / pgbouncer
+    DB_POOL_PRE_PING: bool = True
+    # Al arrancar se comprueba que no falten migraciones. True = aplicarlas (desarrollo);
+    # en producción / serverless, False y `python -m app.migrations` en el despliegue
+    MIGRATE_ON_STARTUP: bool = True
+    # Solo SQLite
+    SQLITE_WAL: bool = True
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 20000
+    SQLITE_MMAP_SIZE_MB: int = 256
     
-    # JWT / Auth (si se usa)
+    # JWT / Auth
     SECRET_KEY: str = "change-me-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7
+    AUTH_REQUIRED: bool = False  # False = sin cabecera Authorization se usa el usuario de desarrollo
+    # Caché token -> usuario (se salta la firma y la consulta para tokens vistos hace poco)
+    USER_CACHE_MAX_ENTRIES: int = 1024
+    USER_CACHE_TTL_SECONDS: int = 300
     
     # Groq AI (reemplaza Claude)
     GROQ_API_KEY: str = ""
+    GROQ_BASE_URL: Optional[str] = None  # None = API oficial; útil para apuntar a un servidor falso local
+    GROQ_TIMEOUT_SECONDS: float = 60.0
+    GROQ_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    GROQ_MAX_CONNECTIONS: int = 50
+    GROQ_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    GROQ_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    # El cliente se crea en el primer uso; con esto, el SDK se carga en segundo plano tras arrancar
+    GROQ_WARMUP_ON_STARTUP: bool = True
+    # Modelos: el pequeño para chat sencillo y resúmenes, el grande para planes y chat complejo
+    GROQ_MODEL_LARGE: str = "llama-3.3-70b-versatile"
+    GROQ_MODEL_SMALL: str = "llama-3.1-8b-instant"
+    MODEL_ROUTING_ENABLED: bool = True  # False = todo al modelo grande, sin alternativa
+    CHAT_COMPLEX_MIN_TOKENS: int = 120  # mensajes más largos van al modelo grande
+    CHAT_LATENCY_SLO_SECONDS: float = 4.0
+    PLAN_LATENCY_SLO_SECONDS: float = 45.0
+    MODEL_SLO_BREACHES: int = 3  # superaciones seguidas del SLO para degradar un modelo
+    MODEL_DEGRADED_SECONDS: float = 60.0
+    # Plantillas de app/prompts/<modo>: "full" o "compact" (instrucciones recortadas, menos tokens)
+    PROMPT_MODE: str = "full"
+    # Resiliencia: reintentos propios (el SDK no reintenta), circuito y hedging del chat
+    GROQ_MAX_RETRIES: int = 2
+    GROQ_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    GROQ_RETRY_MAX_DELAY_SECONDS: float = 8.0
+    GROQ_CIRCUIT_FAILURE_THRESHOLD: int = 5  # fallos seguidos para abrir (0 = sin circuito)
+    GROQ_CIRCUIT_RESET_SECONDS: float = 30.0
+    GROQ_CIRCUIT_HALF_OPEN_CALLS: int = 1
+    GROQ_HEDGE_DELAY_SECONDS: float = 2.5  # 0 = sin hedging en el chat
+    # Llamadas simultáneas por worker (los planes no pueden acaparar los huecos del chat)
+    GROQ_MAX_CONCURRENT_CHATS: int = 32
+    GROQ_MAX_CONCURRENT_PLANS: int = 4
+    GROQ_MAX_CONCURRENT_BATCH: int = 8  # planes de /ai/generate-plan/batch (separados de los interactivos)
+    GROQ_MAX_CONCURRENT_JOBS: int = 4  # planes de la cola de trabajos (/ai/jobs), tampoco compiten con los interactivos
+    # Límites por minuto de la API key (0 = sin límite). Valores del plan de Groq contratado
+    GROQ_REQUESTS_PER_MINUTE: int = 0
+    GROQ_TOKENS_PER_MINUTE: int = 0
+    BATCH_MAX_ITEMS: int = 200
+
+    # Contexto del chat: historial recortado a un presupuesto de tokens + resumen acumulado
+    CHAT_CONTEXT_TOKEN_BUDGET: int = 1500  # historial + resumen (sin el prompt de sistema)
+    CHAT_HISTORY_FETCH_LIMIT: int = 40
+    CHAT_MESSAGE_MAX_TOKENS: int = 400  # recorte por mensaje del historial (bloques de código pegados)
+    CHAT_SUMMARY_ENABLED: bool = True
+    CHAT_SUMMARY_MIN_NEW_TOKENS: int = 600  # tokens fuera de la ventana necesarios para rehacer el resumen
+    CHAT_SUMMARY_MAX_TOKENS: int = 250
+    # Escritura diferida de los turnos del chat: INSERT multi-fila + un COMMIT por lote
+    CHAT_WRITE_BEHIND_ENABLED: bool = False
+    CHAT_WRITE_BATCH_SIZE: int = 200  # mensajes por lote (cada turno son 2)
+    CHAT_WRITE_FLUSH_SECONDS: float = 0.05  # espera máxima de un mensaje en memoria
+    CHAT_WRITE_MAX_PENDING: int = 5000  # por encima, la petición espera a la escritura
+    # WebSocket del chat (/chat/ws): contexto cargado una vez por conexión
+    CHAT_WS_MAX_CONNECTIONS: int = 2000  # por worker; por encima se rechaza la conexión
+    CHAT_WS_IDLE_TIMEOUT_SECONDS: float = 300  # sin mensajes del cliente: se cierra
+    CHAT_WS_SEND_TIMEOUT_SECONDS: float = 10  # cliente que no lee lo enviado: se cierra
+    CHAT_WS_CONTEXT_TTL_SECONDS: float = 300  # recarga de plan, progreso e historial
+
+    # Cola de generación de planes en segundo plano (/ai/jobs)
+    JOB_QUEUE_BACKEND: str = "memory"  # "memory" (asyncio.Queue por worker) | "redis"
+    JOB_QUEUE_REDIS_URL: str = "redis://localhost:6379/0"
+    JOB_QUEUE_NAME: str = "plan_jobs"
+    JOB_QUEUE_WORKERS: int = 4
+    JOB_QUEUE_MAX_DEPTH: int = 100  # trabajos en espera; por encima se responde 503
+    JOB_CALLBACK_TIMEOUT_SECONDS: float = 10.0
+    # callback_url solo admite https a hosts públicos; estos hosts ("a.com,b.local") se admiten
+    # además con http y aunque resuelvan a la red interna (servicios propios, pruebas locales)
+    JOB_CALLBACK_ALLOWED_HOSTS: str = ""
+    # Un trabajo 'running' sin terminar tras este tiempo se da por perdido (worker caído) y se reencola
+    JOB_LEASE_SECONDS: float = 900
+    JOB_RECOVERY_INTERVAL_SECONDS: float = 60  # cada cuánto busca cada worker trabajos perdidos
+
+    # Validación de los planes generados: las fases o campos que no cumplen se regeneran
+    # con un prompt pequeño en lugar de repetir el plan entero
+    PLAN_REPAIR_ENABLED: bool = True  # False = un plan inválido es un error (el cliente reintenta)
+    PLAN_MIN_PHASES: int = 4
+    PLAN_MIN_LEARNING_ITEMS: int = 10
+    PLAN_REPAIR_MAX_FIELDS: int = 2  # más campos rotos en una fase = regenerar la fase entera
+
+    # Caché de planes generados (clave = respuestas normalizadas + modelo + versión del prompt)
+    PLAN_CACHE_ENABLED: bool = True
+    PLAN_CACHE_MAX_ENTRIES: int = 512
+    PLAN_CACHE_TTL_SECONDS: int = 60 * 60 * 24
+    PLAN_CACHE_PERSIST: bool = False  # segundo nivel en la tabla plan_cache (compartido entre workers)
+    PLAN_CACHE_PERSIST_TTL_SECONDS: int = 60 * 60 * 24 * 7
+    PLAN_CACHE_TIMELINE_BUCKET_WEEKS: int = 4
+
+    # Caché semántica de respuestas del chat (requiere numpy)
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.75  # similitud coseno mínima para reutilizar una respuesta
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 2000
+    SEMANTIC_CACHE_TTL_SECONDS: int = 60 * 60 * 24
+    SEMANTIC_CACHE_DIM: int = 1024
+    SEMANTIC_CACHE_MIN_CHARS: int = 12
+
+    # Búsqueda sobre los planes guardados (FTS5 / tsvector + vectores en memoria, requiere numpy)
+    PLAN_SEARCH_DIM: int = 512  # ~2 KB por plan indexado en cada worker
+    # Generar adaptando el plan guardado más parecido (prompt de edición corto) en vez de uno nuevo
+    PLAN_RETRIEVAL_ENABLED: bool = False
+    PLAN_RETRIEVAL_MIN_SCORE: float = 0.5  # similitud coseno mínima del perfil con el plan de referencia
+
+    # Lectura de planes (/ai/plans): ETag + 304 y cuerpos comprimidos (br/gzip) por versión del plan.
+    # Las respuestas son de un usuario autenticado: "private" impide que una CDN las comparta
+    # entre usuarios y "no-cache" hace que se revaliden siempre con el ETag (304 sin cuerpo)
+    PLAN_VIEW_CACHE_CONTROL: str = "private, no-cache"
+    PLAN_VIEW_CACHE_MAX_BYTES: int = 16 * 1024 * 1024  # LRU de cuerpos comprimidos por worker
     
     class Config:
         env_file = str(_env_path) if _env_path.exists() else ".env"
@@ -1,28 +1,83 @@
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
 from app.database import get_db
 from app import models
+from app.services.auth import DEV_USER_KEY, InvalidTokenError, decode_access_token, user_cache
 
 security = HTTPBearer(auto_error=False)
 
+DEV_USER_EMAIL = "dev@plan-carrera.local"
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> models.User:
-    """Obtiene el usuario actual. En desarrollo sin JWT, devuelve el primer usuario o uno por defecto."""
-    if credentials and credentials.credentials:
-        # Aquí se podría validar JWT y obtener user_id
-        pass
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def _user_from_token(token: str, db: AsyncSession) -> models.User:
+    try:
+        user_id, token_exp = decode_access_token(token)
+    except InvalidTokenError:
+        raise _unauthorized("Token inválido o caducado")
+    user = await db.get(models.User, user_id)
+    if user is None:
+        raise _unauthorized("Usuario no encontrado")
+    user_cache.put(token, user, token_exp)
+    return user
+
+
+async def _dev_user(db: AsyncSession) -> models.User:
     # Para desarrollo: usar primer usuario de la BD o crear uno por defecto
-    user = db.query(models.User).first()
+    user = (await db.execute(select(models.User).limit(1))).scalar_one_or_none()
     if not user:
         user = models.User(
-            email="dev@plan-carrera.local",
+            email=DEV_USER_EMAIL,
             name="Usuario desarrollo"
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Otra petición concurrente lo creó primero
+            await db.rollback()
+            user = (await db.execute(
+                select(models.User).where(models.User.email == DEV_USER_EMAIL)
+            )).scalar_one()
+        else:
+            await db.refresh(user)
+    user_cache.put(DEV_USER_KEY, user)
     return user
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> models.User:
+    """
+    Obtiene el usuario actual a partir del JWT (HS256, `sub` = id de usuario).
+    Sin cabecera Authorization y con AUTH_REQUIRED=False devuelve el usuario de desarrollo.
+    Los tokens vistos recientemente se resuelven desde la caché sin verificar ni consultar.
+    """
+    token = credentials.credentials if credentials and credentials.credentials else None
+    return await user_for_token(token, db)
+
+
+async def user_for_token(token: Optional[str], db: AsyncSession) -> models.User:
+    """Lo mismo que get_current_user a partir del token ya extraído (también lo usa /chat/ws)."""
+    if token is None and settings.AUTH_REQUIRED:
+        raise _unauthorized("Se requiere autenticación")
+
+    cached = user_cache.get(token or DEV_USER_KEY)
+    if cached is not None:
+        return cached
+    if token is None:
+        return await _dev_user(db)
+    return await _user_from_token(token, db)
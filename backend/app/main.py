@@ -1,15 +1,55 @@
-from fastapi import FastAPI
+import asyncio
+import math
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.api.routes import ai, chat
+from app.config import settings
+from app.database import engine
+from app.migrations import pending_migrations, run_migrations
+from app.api.middleware import MetricsMiddleware
+from app.api.responses import FastJSONResponse
+from app.api.routes import ai, auth, chat, plans
+from app.services import llm_client, metrics
+from app.services.chat_writer import chat_writer
+from app.services.logging_setup import configure_logging
+from app.services.resilience import LLMUnavailableError
+
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # El esquema lo gestiona `python -m app.migrations`; aquí solo una comprobación barata
+    pending = await pending_migrations()
+    if pending and settings.MIGRATE_ON_STARTUP:
+        await run_migrations()
+    elif pending:
+        raise RuntimeError(f"Faltan migraciones ({', '.join(pending)}): ejecuta python -m app.migrations")
+    await ai.plan_jobs.start()
+    await ai.resume_plan_jobs()
+    if settings.CHAT_WRITE_BEHIND_ENABLED:
+        await chat_writer.start()
+    warmup = asyncio.create_task(llm_client.warm_up()) if settings.GROQ_WARMUP_ON_STARTUP else None
+    yield
+    if warmup is not None:
+        warmup.cancel()
+    await ai.plan_jobs.stop()
+    # Vaciar los turnos del chat pendientes antes de cerrar el pool de la base de datos
+    await chat_writer.stop()
+    # Cerrar el pool HTTP del cliente de Groq (si llegó a crearse)
+    await llm_client.close_groq_service()
+    await engine.dispose()
 
-# Crear tablas
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Plan Carrera API",
     description="API para planes de carrera y chat con IA (Groq)",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # Las rutas que devuelven dicts se serializan con orjson; las de planes y chat
+    # devuelven el modelo ya serializado (model_response)
+    default_response_class=FastJSONResponse,
 )
 
 app.add_middleware(
@@ -20,7 +60,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.METRICS_ENABLED:
+    # Último en añadirse = el más externo: mide también CORS y los errores
+    app.add_middleware(MetricsMiddleware)
+    metrics.install_db_metrics(engine.sync_engine)
+
+
+@app.exception_handler(LLMUnavailableError)
+async def llm_unavailable_handler(request: Request, exc: LLMUnavailableError):
+    """Groq caído o saturado: 503 con Retry-After para que el cliente reintente más tarde."""
+    headers = {"Retry-After": str(math.ceil(exc.retry_after))} if exc.retry_after else None
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc), "retry_after": exc.retry_after},
+        headers=headers,
+    )
+
+
+app.include_router(auth.router)
 app.include_router(ai.router)
+app.include_router(plans.router)
 app.include_router(chat.router)
 
 
@@ -32,3 +91,11 @@ def root():
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Latencias HTTP por ruta, consultas SQL, llamadas/tokens de Groq (formato Prometheus, por worker)."""
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("", status_code=404)
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
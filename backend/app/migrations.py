@@ -0,0 +1,169 @@
+"""
+Migraciones de esquema idempotentes.
+
+`create_all` solo crea las tablas que no existen: no añade índices ni columnas
+a tablas ya creadas. Cada migración se aplica una vez y queda registrada en
+`schema_migrations`.
+
+El esquema se gestiona con este comando (en el despliegue, antes de arrancar la API):
+    python -m app.migrations
+Al arrancar, la API solo comprueba con una consulta que no falte ninguna migración
+(y las aplica si MIGRATE_ON_STARTUP). Como `create_all` ya no corre en cada arranque,
+una tabla nueva necesita su propia migración.
+
+Una migración no debe depender de columnas que añaden migraciones posteriores: las que
+reescriben filas usan definiciones ligeras (`table()` / `column()`) con solo las
+columnas que existían en ese punto, no los modelos actuales (que pueden llevar
+columnas nuevas u `onupdate` como career_plans.version).
+"""
+import asyncio
+import json
+from typing import Callable, List, Tuple
+
+from sqlalchemy import JSON, Integer, column, inspect, select, table, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database import Base, engine
+from app import models
+from app.services.plan_storage import split_plan
+
+
+def _create_index(table, name: str) -> Callable[[Connection], None]:
+    def step(conn: Connection):
+        index = next(i for i in table.indexes if i.name == name)
+        index.create(bind=conn, checkfirst=True)
+    return step
+
+
+def _add_column(table, name: str) -> Callable[[Connection], None]:
+    def step(conn: Connection):
+        if name in {c["name"] for c in inspect(conn).get_columns(table.name)}:
+            return  # tabla creada por create_all con la columna ya incluida
+        column = table.c[name]
+        ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}"
+        if column.server_default is not None:
+            ddl += f" DEFAULT '{column.server_default.arg}'"
+        if not column.nullable:
+            ddl += " NOT NULL"
+        conn.execute(text(ddl))
+    return step
+
+
+def _create_tables(*tables) -> Callable[[Connection], None]:
+    def step(conn: Connection):
+        for table in tables:
+            table.create(bind=conn, checkfirst=True)
+    return step
+
+
+def _create_plan_search(conn: Connection):
+    """Tabla plan_search, su índice de texto (FTS5 o GIN sobre tsvector) y el indexado de los planes existentes."""
+    from app.services.plan_search import reindex_plans
+
+    models.PlanSearchEntry.__table__.create(bind=conn, checkfirst=True)
+    if conn.dialect.name == "sqlite":
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS plan_search_fts USING fts5("
+            "text, content='plan_search', content_rowid='plan_id', tokenize='unicode61 remove_diacritics 2')"
+        ))
+        # Tabla de contenido externo: los triggers mantienen el índice al escribir en plan_search
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS plan_search_ai AFTER INSERT ON plan_search BEGIN "
+            "INSERT INTO plan_search_fts(rowid, text) VALUES (new.plan_id, new.text); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS plan_search_ad AFTER DELETE ON plan_search BEGIN "
+            "INSERT INTO plan_search_fts(plan_search_fts, rowid, text) VALUES ('delete', old.plan_id, old.text); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS plan_search_au AFTER UPDATE ON plan_search BEGIN "
+            "INSERT INTO plan_search_fts(plan_search_fts, rowid, text) VALUES ('delete', old.plan_id, old.text); "
+            "INSERT INTO plan_search_fts(rowid, text) VALUES (new.plan_id, new.text); END"
+        ))
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_plan_search_text_fts ON plan_search USING GIN (to_tsvector('spanish', text))"
+        ))
+    reindex_plans(conn)
+
+
+def _split_stored_plans(conn: Connection):
+    """Pasa las fases de los planes guardados completos en generated_plan a plan_phases."""
+    # career_plans tal como estaba en 0008 (sin version ni su onupdate, que llegan en 0012)
+    plans = table("career_plans", column("id", Integer), column("generated_plan", JSON))
+    rows = conn.execute(select(plans.c.id, plans.c.generated_plan).where(plans.c.generated_plan.is_not(None))).all()
+    for plan_id, generated_plan in rows:
+        if isinstance(generated_plan, str):
+            generated_plan = json.loads(generated_plan)
+        if not isinstance(generated_plan, dict) or "phases" not in generated_plan:
+            continue
+        outline, phases = split_plan(generated_plan)
+        if phases:
+            conn.execute(models.PlanPhase.__table__.insert(), [{"plan_id": plan_id, **phase} for phase in phases])
+        conn.execute(update(plans).where(plans.c.id == plan_id).values(generated_plan=outline))
+
+
+def _postgres_only(sql: str) -> Callable[[Connection], None]:
+    def step(conn: Connection):
+        if conn.dialect.name == "postgresql":
+            conn.execute(text(sql))
+    return step
+
+
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_chat_messages_user_id_timestamp",
+     _create_index(models.ChatMessage.__table__, "ix_chat_messages_user_id_timestamp")),
+    ("0002_career_plans_user_id_is_active",
+     _create_index(models.CareerPlan.__table__, "ix_career_plans_user_id_is_active")),
+    ("0003_career_plans_status", _add_column(models.CareerPlan.__table__, "status")),
+    ("0004_career_plans_job_input", _add_column(models.CareerPlan.__table__, "job_input")),
+    ("0005_career_plans_callback_url", _add_column(models.CareerPlan.__table__, "callback_url")),
+    ("0006_career_plans_error", _add_column(models.CareerPlan.__table__, "error")),
+    ("0007_career_plans_completed_at", _add_column(models.CareerPlan.__table__, "completed_at")),
+    ("0008_split_plan_phases", _split_stored_plans),
+    ("0009_career_plans_generated_plan_jsonb", _postgres_only(
+        "ALTER TABLE career_plans ALTER COLUMN generated_plan TYPE JSONB USING generated_plan::jsonb")),
+    ("0010_progress_tables", _create_tables(
+        models.PhaseProgress.__table__, models.ProjectProgress.__table__, models.PlanProgress.__table__)),
+    ("0011_plan_search", _create_plan_search),
+    ("0012_career_plans_version", _add_column(models.CareerPlan.__table__, "version")),
+    ("0013_career_plans_started_at", _add_column(models.CareerPlan.__table__, "started_at")),
+]
+
+
+def _migrate(conn: Connection) -> List[str]:
+    Base.metadata.create_all(bind=conn)
+    applied = set(conn.execute(select(models.SchemaMigration.version)).scalars())
+    applied_now = []
+    for version, step in MIGRATIONS:
+        if version in applied:
+            continue
+        step(conn)
+        conn.execute(models.SchemaMigration.__table__.insert().values(version=version))
+        applied_now.append(version)
+    return applied_now
+
+
+def _pending(conn: Connection) -> List[str]:
+    if not inspect(conn).has_table(models.SchemaMigration.__tablename__):
+        return [version for version, _ in MIGRATIONS]
+    applied = set(conn.execute(select(models.SchemaMigration.version)).scalars())
+    return [version for version, _ in MIGRATIONS if version not in applied]
+
+
+async def pending_migrations(bind: AsyncEngine = engine) -> List[str]:
+    """Migraciones sin aplicar (todas si la base de datos está vacía). Una o dos consultas."""
+    async with bind.connect() as conn:
+        return await conn.run_sync(_pending)
+
+
+async def run_migrations(bind: AsyncEngine = engine) -> List[str]:
+    """Crea las tablas nuevas y aplica las migraciones pendientes. Devuelve las aplicadas."""
+    async with bind.begin() as conn:
+        return await conn.run_sync(_migrate)
+
+
+if __name__ == "__main__":
+    applied = asyncio.run(run_migrations())
+    print(f"Migraciones aplicadas: {', '.join(applied) if applied else 'ninguna (esquema al día)'}")
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, JSON, Index, LargeBinary, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -28,12 +29,113 @@ class CareerPlan(Base):
     hours_per_day = Column(Integer, nullable=True)
     goal = Column(String(500), nullable=True)
     timeline_weeks = Column(Integer, nullable=True)
-    generated_plan = Column(Text, nullable=True)  # JSON del plan completo
+    # Cabecera del plan (plan_title, total_weeks...); las fases viven en plan_phases
+    generated_plan = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Generación en segundo plano (/ai/jobs): 'queued' | 'running' | 'completed' | 'failed'
+    status = Column(String(20), nullable=False, default="completed", server_default="completed")
+    job_input = Column(JSON, nullable=True)  # petición original para que cualquier worker pueda ejecutarla
+    callback_url = Column(String(2000), nullable=True)
+    error = Column(Text, nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    # Inicio del intento en curso: un 'running' más antiguo que JOB_LEASE_SECONDS se recupera
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    # Sube en cada UPDATE de la fila (también los de Core): base del ETag de /ai/plans
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=text("version + 1"))
 
     user = relationship("User", back_populates="career_plans")
 
+    __table_args__ = (
+        # Plan activo del usuario (contexto del chat)
+        Index("ix_career_plans_user_id_is_active", "user_id", "is_active"),
+    )
+
+
+class PlanPhase(Base):
+    __tablename__ = "plan_phases"
+
+    id = Column(Integer, primary_key=True)
+    plan_id = Column(Integer, ForeignKey("career_plans.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)  # 1..n en el orden del plan
+    phase_id = Column(Integer, nullable=True)  # `id` que puso el modelo en la fase
+    title = Column(String(500), nullable=False)
+    duration_weeks = Column(Integer, nullable=True)
+    description = Column(Text, nullable=True)
+    content = Column(LargeBinary, nullable=False)  # zlib(JSON): learning_items, projects, resources...
+
+    __table_args__ = (
+        Index("ix_plan_phases_plan_id_position", "plan_id", "position", unique=True),
+    )
+
+
+class PlanSearchEntry(Base):
+    """
+    Documento de búsqueda de un plan (plan_search.py): texto para FTS5 / tsvector
+    y vector del perfil para la búsqueda por similitud.
+    """
+    __tablename__ = "plan_search"
+
+    plan_id = Column(Integer, ForeignKey("career_plans.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    level = Column(String(50), nullable=True)  # difficulty_level del cuestionario
+    total_weeks = Column(Integer, nullable=True)
+    text = Column(Text, nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # float32[PLAN_SEARCH_DIM], normalizado (L2)
+
+
+class PhaseProgress(Base):
+    __tablename__ = "user_phase_progress"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    plan_id = Column(Integer, ForeignKey("career_plans.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)  # plan_phases.position
+    completed = Column(Boolean, nullable=False, default=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_user_phase_progress_plan_id_position", "plan_id", "position", unique=True),
+    )
+
+
+class ProjectProgress(Base):
+    __tablename__ = "user_project_progress"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    plan_id = Column(Integer, ForeignKey("career_plans.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)  # fase del proyecto (plan_phases.position)
+    project_index = Column(Integer, nullable=False)  # 1..n dentro de `projects` de la fase
+    completed = Column(Boolean, nullable=False, default=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    github_url = Column(String(500), nullable=True)
+    notes = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_user_project_progress_plan_id_project", "plan_id", "position", "project_index", unique=True),
+    )
+
+
+class PlanProgress(Base):
+    """
+    Contadores de progreso de un plan, mantenidos en cada escritura de progreso:
+    el contexto del chat los lee con una búsqueda por clave en vez de agregar.
+    """
+    __tablename__ = "plan_progress"
+
+    plan_id = Column(Integer, ForeignKey("career_plans.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    total_phases = Column(Integer, nullable=False, default=0)
+    completed_phases = Column(Integer, nullable=False, default=0)
+    total_projects = Column(Integer, nullable=False, default=0)
+    completed_projects = Column(Integer, nullable=False, default=0)
+    current_phase = Column(Integer, nullable=True)  # primera fase sin completar; None = plan terminado
+    current_phase_title = Column(String(500), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
@@ -45,3 +147,35 @@ class ChatMessage(Base):
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("User", back_populates="chat_messages")
+
+    __table_args__ = (
+        # Historial reciente por usuario y paginación por cursor
+        Index("ix_chat_messages_user_id_timestamp", "user_id", "timestamp"),
+    )
+
+
+class PlanCacheEntry(Base):
+    __tablename__ = "plan_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256 de las respuestas normalizadas
+    model = Column(String(100), nullable=False)
+    prompt_version = Column(String(20), nullable=False)
+    plan = Column(Text, nullable=False)  # JSON serializado tal cual lo devolvió el modelo
+    expires_at = Column(Integer, nullable=False)  # epoch en segundos
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ConversationSummary(Base):
+    __tablename__ = "conversation_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    summary = Column(Text, nullable=False)
+    last_message_id = Column(Integer, nullable=False)  # último ChatMessage incluido en el resumen
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+
+    version = Column(String(100), primary_key=True)
+    applied_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,6 +1,8 @@
-from pydantic import BaseModel
-from typing import List, Optional, Any
+from pydantic import AfterValidator, AnyHttpUrl, BaseModel, Field
+from typing import Annotated, List, Optional, Any
 from datetime import datetime
+from app.config import settings
+from app.callback_urls import check_callback_url
 
 
 # --- Questionnaire / Plan generation ---
@@ -35,6 +37,141 @@ class CareerPlanResponse(BaseModel):
         from_attributes = True
 
 
+class BatchPlanRequest(BaseModel):
+    items: List[QuestionnaireAnswers] = Field(..., min_length=1)
+
+
+class PhaseSummary(BaseModel):
+    position: int
+    title: str
+    duration_weeks: Optional[int] = None
+
+
+class CareerPlanSummary(BaseModel):
+    """Vista de listado: sin el contenido de las fases."""
+    id: int
+    title: str
+    timeline_weeks: Optional[int] = None
+    is_active: bool = True
+    status: str = "completed"
+    created_at: Optional[datetime] = None
+    phases: List[PhaseSummary] = []
+
+
+class PlanSearchResult(BaseModel):
+    plan_id: int
+    title: str
+    level: Optional[str] = None
+    total_weeks: Optional[int] = None
+    score: float  # bm25/ts_rank, similitud coseno o RRF según `mode`
+    phases: List[PhaseSummary] = []
+
+
+# --- Plan generado por el modelo (validación antes de guardar, ver plan_repair) ---
+class PlanResource(BaseModel):
+    title: str
+    url: str = ""
+    type: str = "course"
+
+    class Config:
+        extra = "allow"
+
+
+class PlanProject(BaseModel):
+    difficulty: str
+    title: str
+    description: str = ""
+    requirements: List[str] = Field(..., min_length=1)
+    github_tips: str = ""
+    technologies: List[str] = []
+
+    class Config:
+        extra = "allow"
+
+
+class PlanPhaseContent(BaseModel):
+    id: int
+    title: str
+    duration_weeks: int
+    description: str = ""
+    learning_items: List[str] = Field(..., min_length=settings.PLAN_MIN_LEARNING_ITEMS)
+    projects: List[PlanProject] = Field(..., min_length=3, max_length=3)
+    resources: List[PlanResource] = Field(..., min_length=1)
+
+    class Config:
+        extra = "allow"
+
+
+class GeneratedPlan(BaseModel):
+    plan_title: str
+    total_weeks: int
+    phases: List[PlanPhaseContent] = Field(..., min_length=settings.PLAN_MIN_PHASES)
+
+    class Config:
+        extra = "allow"
+
+
+# --- Background jobs ---
+# https a un host público (o de JOB_CALLBACK_ALLOWED_HOSTS); se guarda como texto
+CallbackUrl = Annotated[AnyHttpUrl, AfterValidator(lambda url: check_callback_url(str(url)))]
+
+
+class PlanJobRequest(QuestionnaireAnswers):
+    callback_url: Optional[CallbackUrl] = None  # recibe un POST con el JobResponse al terminar
+
+
+class ChatPlanJobRequest(GeneratePlanFromChatRequest):
+    callback_url: Optional[CallbackUrl] = None
+
+
+class JobResponse(BaseModel):
+    job_id: int
+    status: str  # queued | running | completed | failed
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    plan: Optional[CareerPlanResponse] = None  # solo cuando status == completed
+
+
+# --- Progreso ---
+class PhaseProgressUpdate(BaseModel):
+    completed: bool = True
+
+
+class ProjectProgressUpdate(BaseModel):
+    completed: bool = True
+    github_url: Optional[str] = Field(None, max_length=500)
+    notes: Optional[str] = None
+
+
+class ProjectProgressItem(BaseModel):
+    position: int
+    project_index: int
+    completed: bool
+    completed_at: Optional[datetime] = None
+    github_url: Optional[str] = None
+    notes: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class PlanProgressResponse(BaseModel):
+    plan_id: int
+    total_phases: int
+    completed_phases: int
+    total_projects: int
+    completed_projects: int
+    current_phase: Optional[int] = None  # None = todas las fases completadas
+    current_phase_title: Optional[str] = None
+    progress_percentage: int
+
+
+class PlanProgressDetail(PlanProgressResponse):
+    completed_phase_positions: List[int] = []
+    projects: List[ProjectProgressItem] = []
+
+
 # --- Chat ---
 class ChatRequest(BaseModel):
     message: str
@@ -45,6 +182,21 @@ class ChatResponse(BaseModel):
     timestamp: Optional[datetime] = None
 
 
+class ChatMessageResponse(BaseModel):
+    id: int
+    role: str
+    content: str
+    timestamp: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ChatHistoryResponse(BaseModel):
+    messages: List[ChatMessageResponse]
+    next_cursor: Optional[str] = None  # pasar como ?cursor= para la página siguiente (más antigua)
+
+
 # --- User (for auth dependency) ---
 class UserBase(BaseModel):
     email: str
@@ -56,3 +208,4 @@ class UserInDB(UserBase):
 
     class Config:
         from_attributes = True
+
@@ -0,0 +1,110 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+import jwt
+from sqlalchemy import event
+
+from app.config import settings
+from app import models
+
+# Clave de la caché para las peticiones sin token (usuario de desarrollo)
+DEV_USER_KEY = ""
+
+
+class InvalidTokenError(Exception):
+    """Token ausente, mal firmado, caducado o sin `sub` válido."""
+
+
+def create_access_token(user_id: int, expires_minutes: Optional[int] = None) -> str:
+    """Emite un JWT HS256 con `sub` = id del usuario."""
+    expires = datetime.now(timezone.utc) + timedelta(
+        minutes=expires_minutes if expires_minutes is not None else settings.ACCESS_TOKEN_EXPIRE_MINUTES
+    )
+    return jwt.encode({"sub": str(user_id), "exp": expires}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def decode_access_token(token: str) -> Tuple[int, float]:
+    """Verifica firma y caducidad. Devuelve (user_id, exp en epoch)."""
+    try:
+        claims = jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM],
+            options={"require": ["sub", "exp"]},
+        )
+        return int(claims["sub"]), float(claims["exp"])
+    except (jwt.PyJWTError, ValueError) as e:
+        raise InvalidTokenError(str(e)) from e
+
+
+class UserCache:
+    """
+    LRU con TTL de token -> usuario (por worker).
+    Un acierto evita tanto la verificación de la firma como la consulta del usuario.
+    Cada entrada caduca con el TTL o con el `exp` del token, lo que llegue antes.
+    Los usuarios se guardan desacoplados de la sesión: las rutas solo leen columnas (id),
+    nunca relaciones perezosas.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.USER_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = settings.USER_CACHE_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, models.User]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+
+    def snapshot(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+    def get(self, key: str) -> Optional[models.User]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, user = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return user
+            del self._entries[key]
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, user: models.User, token_exp: Optional[float] = None) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        self._entries[key] = (expires_at, user)
+        self._entries.move_to_end(key)
+        self.stats["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Descarta todas las entradas (tokens y usuario de desarrollo) de ese usuario."""
+        stale = [key for key, (_, user) in self._entries.items() if user.id == user_id]
+        for key in stale:
+            del self._entries[key]
+        self.stats["invalidations"] += len(stale)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    # Se dispara en el flush; si luego hay rollback solo se pierde una entrada de caché
+    user_cache.invalidate_user(target.id)
@@ -0,0 +1,101 @@
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app import models
+
+# Palabras, números y signos sueltos: aproximación local al tokenizador BPE del modelo
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+# Longitud media de un token BPE en texto español / código (caracteres)
+_CHARS_PER_TOKEN = 4
+
+TRUNCATED_MARK = " …[recortado]"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimación de tokens sin tokenizador real: cada signo cuenta 1 y cada palabra
+    ceil(len / 4). Tiende a sobrestimar un poco, que es el lado seguro para un presupuesto.
+    """
+    if not text:
+        return 0
+    return sum(
+        math.ceil(len(piece) / _CHARS_PER_TOKEN) if piece[0].isalnum() or piece[0] == "_" else 1
+        for piece in _TOKEN_PIECES.findall(text)
+    )
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Recorta el texto al presupuesto conservando el principio."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # Primer corte por caracteres y ajuste fino hacia atrás
+    cut = text[: max_tokens * _CHARS_PER_TOKEN]
+    while cut and estimate_tokens(cut) > max_tokens:
+        cut = cut[: int(len(cut) * 0.9)]
+    return cut.rstrip() + TRUNCATED_MARK
+
+
+@dataclass
+class ChatContext:
+    """Historial que entra en el prompt y mensajes que han quedado fuera sin resumir."""
+    history: List[Dict]
+    summary: Optional[str] = None
+    history_tokens: int = 0
+    pending: List[Dict] = field(default_factory=list)  # fuera de la ventana, más antiguos primero
+    pending_tokens: int = 0
+
+    @property
+    def needs_summary(self) -> bool:
+        return settings.CHAT_SUMMARY_ENABLED and self.pending_tokens >= settings.CHAT_SUMMARY_MIN_NEW_TOKENS
+
+
+def build_chat_context(
+    messages: List[models.ChatMessage],
+    summary: Optional[models.ConversationSummary] = None,
+    budget: int = settings.CHAT_CONTEXT_TOKEN_BUDGET,
+) -> ChatContext:
+    """
+    Llena el presupuesto de tokens con los mensajes más recientes (`messages` viene
+    del más reciente al más antiguo). El resumen acumulado ocupa su parte primero y
+    los mensajes ya resumidos no se repiten. Los que no caben pasan a `pending`
+    para el siguiente resumen incremental.
+    """
+    summary_text = summary.summary if summary else None
+    last_summarized = summary.last_message_id if summary else 0
+    remaining = budget - estimate_tokens(summary_text or "")
+
+    window, pending = [], []
+    used = 0
+    overflow = False
+    for msg in messages:
+        # id None: turno aún en el búfer de escritura (siempre más reciente que lo resumido)
+        if msg.id is not None and msg.id <= last_summarized:
+            break
+        entry = {
+            "id": msg.id,
+            "role": msg.role,
+            "content": truncate_to_tokens(msg.content, settings.CHAT_MESSAGE_MAX_TOKENS),
+        }
+        tokens = estimate_tokens(entry["content"])
+        # En cuanto un mensaje no cabe, él y todos los anteriores quedan fuera (sin huecos)
+        if overflow or used + tokens > remaining:
+            overflow = True
+            # Sin id no se puede marcar como resumido: se queda fuera hasta que se escriba
+            if msg.id is not None:
+                pending.append(entry)
+            continue
+        window.append(entry)
+        used += tokens
+
+    pending.reverse()
+    window.reverse()
+    return ChatContext(
+        history=[{"role": m["role"], "content": m["content"]} for m in window],
+        summary=summary_text,
+        history_tokens=used,
+        pending=pending,
+        pending_tokens=sum(estimate_tokens(m["content"]) for m in pending),
+    )
@@ -0,0 +1,54 @@
+"""
+Sesión de chat de una conexión WebSocket (/chat/ws).
+
+El plan activo con su progreso, el historial reciente y el resumen se cargan una vez al
+conectar y se actualizan en memoria con cada turno: un turno no repite la autenticación
+ni las consultas de contexto de /chat/message. Cada CHAT_WS_CONTEXT_TTL_SECONDS se
+recargan de la base de datos para recoger lo que cambie fuera de la conexión (progreso
+marcado o mensajes enviados desde otra pestaña).
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app import models
+from app.config import settings
+from app.services.chat_context import ChatContext, build_chat_context
+
+
+@dataclass
+class ChatSession:
+    user_id: int
+    user_context: Dict
+    # Del más reciente al más antiguo: ChatMessage o PendingMessage (búfer de escritura)
+    messages: List
+    summary: Optional[models.ConversationSummary] = None
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def stale(self) -> bool:
+        return time.monotonic() - self.loaded_at >= settings.CHAT_WS_CONTEXT_TTL_SECONDS
+
+    def chat_context(self) -> ChatContext:
+        return build_chat_context(self.messages, self.summary)
+
+    def add_turn(self, user_message, assistant_message) -> None:
+        self.messages[:0] = [assistant_message, user_message]
+        del self.messages[settings.CHAT_HISTORY_FETCH_LIMIT:]
+
+    def set_summary(self, text: str, last_message_id: int) -> None:
+        """Resumen recién guardado por _refresh_summary (si no es más antiguo que el actual)."""
+        if self.summary is None or self.summary.last_message_id < last_message_id:
+            self.summary = models.ConversationSummary(
+                user_id=self.user_id, summary=text, last_message_id=last_message_id
+            )
+
+
+ws_stats = {
+    "active": 0, "opened": 0, "rejected": 0, "auth_failed": 0,
+    "idle_closed": 0, "slow_closed": 0, "turns": 0, "context_reloads": 0,
+}
+
+
+def snapshot() -> Dict:
+    return {"max_connections": settings.CHAT_WS_MAX_CONNECTIONS, **ws_stats}
@@ -0,0 +1,175 @@
+"""
+Escritura diferida (write-behind) de los mensajes del chat.
+
+Con CHAT_WRITE_BEHIND_ENABLED cada turno (mensaje del usuario + respuesta) se encola en
+memoria y una tarea de fondo los guarda por lotes: un INSERT multi-fila y un solo COMMIT
+por lote (group commit) cuando se juntan CHAT_WRITE_BATCH_SIZE mensajes o pasan
+CHAT_WRITE_FLUSH_SECONDS desde el primero pendiente. La cola es FIFO y se escribe en
+orden, así que los ids (y los timestamps, que se fijan al encolar) respetan el orden de
+cada usuario.
+
+Lo pendiente vive en la memoria de este worker: su historial reciente lo ve (pending_for),
+otros workers en cuanto se escribe el lote. Al apagar se vacía entero; una caída brusca
+del proceso pierde como mucho lo encolado en el último intervalo.
+"""
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingMessage:
+    """Mensaje encolado: los mismos atributos que usan las rutas de un ChatMessage."""
+    user_id: int
+    role: str
+    content: str
+    timestamp: datetime
+    id: Optional[int] = None  # se asigna al insertar el lote, antes del commit
+
+
+class ChatWriteBuffer:
+    def __init__(
+        self,
+        batch_size: int = settings.CHAT_WRITE_BATCH_SIZE,
+        flush_seconds: float = settings.CHAT_WRITE_FLUSH_SECONDS,
+        max_pending: int = settings.CHAT_WRITE_MAX_PENDING,
+        session_factory=SessionLocal,
+    ):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self._session_factory = session_factory
+        self._queue: Deque[PendingMessage] = deque()
+        self._wakeup = asyncio.Event()  # hay algo pendiente
+        self._full = asyncio.Event()  # hay un lote completo: no esperar al plazo
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.failed_batches = 0
+
+    @property
+    def active(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Escribe todo lo pendiente y para la tarea de fondo (apagado del worker)."""
+        if self._task is None:
+            return
+        # Sin cancel(): cortar un lote a mitad del commit podría escribirlo dos veces
+        self._closing = True
+        self._wakeup.set()
+        self._full.set()
+        await self._task
+        self._task = None
+        self._closing = False
+
+    async def enqueue(self, user_id: int, message: str, response_text: str) -> Tuple[PendingMessage, PendingMessage]:
+        """Encola un turno completo y devuelve (mensaje del usuario, mensaje del asistente)."""
+        if len(self._queue) >= self.max_pending:
+            # Base de datos lenta o caída: la petición espera a la escritura en vez de acumular sin límite
+            await self.flush()
+        now = datetime.now(timezone.utc)
+        user_message = PendingMessage(user_id=user_id, role="user", content=message, timestamp=now)
+        assistant_message = PendingMessage(user_id=user_id, role="assistant", content=response_text, timestamp=now)
+        self._queue.extend((user_message, assistant_message))
+        self.enqueued += 2
+        self._wakeup.set()
+        if len(self._queue) >= self.batch_size:
+            self._full.set()
+        return user_message, assistant_message
+
+    def pending_for(self, user_id: int) -> List[PendingMessage]:
+        """Mensajes del usuario aún sin confirmar en la base de datos, del más reciente al más antiguo."""
+        return [m for m in reversed(self._queue) if m.user_id == user_id]
+
+    def has_pending(self, user_id: int) -> bool:
+        return any(m.user_id == user_id for m in self._queue)
+
+    async def flush(self) -> int:
+        """Escribe lo pendiente en lotes de batch_size; devuelve cuántos mensajes se guardaron."""
+        written = 0
+        async with self._flush_lock:
+            while self._queue:
+                batch = list(islice(self._queue, self.batch_size))
+                await self._write(batch)
+                for _ in batch:
+                    self._queue.popleft()
+                written += len(batch)
+        return written
+
+    async def _write(self, batch: List[PendingMessage]) -> None:
+        rows = [
+            {"user_id": m.user_id, "role": m.role, "content": m.content, "timestamp": m.timestamp}
+            for m in batch
+        ]
+        async with self._session_factory() as db:
+            try:
+                ids = (await db.execute(
+                    insert(models.ChatMessage).returning(models.ChatMessage.id, sort_by_parameter_order=True), rows
+                )).scalars().all()
+                # Ids antes del commit: quien lea la base de datos justo después los reconoce y no los duplica
+                for message, message_id in zip(batch, ids):
+                    message.id = message_id
+                await db.commit()
+            except Exception:
+                for message in batch:
+                    message.id = None
+                self.failed_batches += 1
+                raise
+        self.written += len(batch)
+        self.batches += 1
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            # Plazo contado desde el primer mensaje pendiente, o antes si se completa un lote
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self._full.clear()
+            try:
+                await self.flush()
+            except Exception:
+                if self._closing:
+                    logger.exception("Could not drain chat write buffer: %d messages lost", len(self._queue))
+                    return
+                logger.exception("Chat write batch failed, retrying (%d pending)", len(self._queue))
+                self._wakeup.set()
+                await asyncio.sleep(max(self.flush_seconds, 1.0))
+            if self._closing:
+                return
+
+    def snapshot(self) -> Dict:
+        return {
+            "pending": len(self._queue),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "avg_batch": round(self.written / self.batches, 1) if self.batches else 0,
+        }
+
+
+# Un búfer por worker
+chat_writer = ChatWriteBuffer()
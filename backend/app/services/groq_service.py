@@ -1,272 +1,521 @@
-from groq import Groq
+import asyncio
+import logging
+import time
+import httpx
+from groq import AsyncGroq
 from app.config import settings
-from typing import List, Dict
+from app.services.chat_context import estimate_tokens
+from app.services.metrics import llm_time_to_first_token, record_llm_call
+from app.services.plan_repair import (
+    describe_problems, find_problems, normalize_plan, phase_outline, plan_repair_stats,
+)
+from app.services.plan_search import retrieval_stats
+from app.services.plan_stream_parser import PlanStreamParser
+from app.services.model_router import model_router
+from app.services.prompts import prompts
+from app.services.rate_limit import groq_rate_limiter
+from app.services.resilience import (
+    LLMUnavailableError, backoff_delay, chat_hedger, circuit_breaker, is_retryable, retry_after_seconds,
+)
+import groq
+from typing import AsyncIterator, List, Dict, Optional
 import json
 
+MISSING_API_KEY_MESSAGE = (
+    "⚠️ El backend no tiene configurada GROQ_API_KEY. "
+    "Añade GROQ_API_KEY en backend/.env y reinicia el servidor."
+)
+
+logger = logging.getLogger(__name__)
+
 
 class GroqService:
     def __init__(self):
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
-        # Modelo Llama 3.3 70B (producción) - llama-3.1-70b está deprecado
-        self.model = "llama-3.3-70b-versatile"
-
-    async def generate_career_plan(self, answers: Dict) -> Dict:
+        # Cliente HTTP asíncrono con pool keep-alive compartido por todas las peticiones del worker
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GROQ_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.GROQ_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=httpx.Timeout(
+                settings.GROQ_TIMEOUT_SECONDS,
+                connect=settings.GROQ_CONNECT_TIMEOUT_SECONDS,
+            ),
+        )
+        self.client = AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            base_url=settings.GROQ_BASE_URL or None,
+            # Los reintentos los gestiona _call_with_resilience (backoff con jitter + circuito)
+            max_retries=0,
+            http_client=self.http_client,
+        )
+        # El modelo de cada llamada lo elige el router; self.model es el de los planes
+        # (forma parte de la clave de la caché de planes)
+        self.router = model_router
+        self.model = self.router.plan_model
+        # Concurrencia acotada por tipo de llamada: una ráfaga de planes largos
+        # no debe dejar sin huecos a los mensajes de chat
+        self._limits = {
+            "chat": asyncio.Semaphore(settings.GROQ_MAX_CONCURRENT_CHATS),
+            "plan": asyncio.Semaphore(settings.GROQ_MAX_CONCURRENT_PLANS),
+            "batch": asyncio.Semaphore(settings.GROQ_MAX_CONCURRENT_BATCH),
+            "job": asyncio.Semaphore(settings.GROQ_MAX_CONCURRENT_JOBS),
+        }
+        self.rate_limiter = groq_rate_limiter
+        # Plantillas compiladas al importar (PROMPT_MODE), compartidas por el worker
+        self.prompts = prompts
+        self.hedger = chat_hedger
+        # Caché semántica opcional delante del chat (numpy solo se importa si está activa)
+        self.semantic_cache = None
+        if settings.SEMANTIC_CACHE_ENABLED:
+            from app.services.semantic_cache import SemanticCache
+            self.semantic_cache = SemanticCache()
+
+    @staticmethod
+    def _reserved_tokens(params: Dict) -> int:
+        """Tokens a reservar en el limitador: prompt estimado + máximo de la respuesta."""
+        prompt = sum(estimate_tokens(m.get("content") or "") for m in params.get("messages", []))
+        return prompt + params.get("max_tokens", 0)
+
+    async def _call_with_resilience(self, call, model: str):
+        """
+        Ejecuta `call` (una llamada a Groq) pasando por el circuito del modelo y reintentando los
+        fallos transitorios con backoff exponencial + jitter. Un 429 además frena el
+        limitador durante el retry-after. Agotados los intentos (o con el circuito
+        abierto) lanza LLMUnavailableError; los errores no transitorios se propagan tal cual.
+        """
+        breaker = circuit_breaker(model)
+        attempts = settings.GROQ_MAX_RETRIES + 1
+        for attempt in range(attempts):
+            probe_round = breaker.before_call()
+            try:
+                result = await call()
+            except Exception as e:
+                if not is_retryable(e):
+                    # El proveedor ha respondido: no es un problema de disponibilidad
+                    if isinstance(e, groq.APIStatusError):
+                        breaker.record_success()
+                    raise
+                breaker.record_failure()
+                retry_after = retry_after_seconds(e)
+                if isinstance(e, groq.RateLimitError):
+                    self.rate_limiter.penalize(retry_after)
+                if attempt == attempts - 1:
+                    raise LLMUnavailableError(f"Groq no disponible ({model}): {type(e).__name__}", retry_after) from e
+                logger.warning("Groq %s, reintento %d/%d", type(e).__name__, attempt + 1, attempts - 1)
+                await asyncio.sleep(backoff_delay(attempt, retry_after))
+            else:
+                breaker.record_success()
+                self.rate_limiter.reward()
+                return result
+            finally:
+                # Sonda cancelada (cliente desconectado, hedge perdedor) o con un error inesperado
+                if probe_round is not None:
+                    breaker.end_probe(probe_round)
+
+    async def _attempt(self, kind: str, params: Dict):
+        """Un intento: hueco de concurrencia + reserva en el limitador + llamada."""
+        async with self._limits[kind]:
+            reserved = await self.rate_limiter.reserve(self._reserved_tokens(params))
+            completion = await self.client.chat.completions.create(**params)
+            usage = getattr(completion, "usage", None)
+            self.rate_limiter.settle(reserved, getattr(usage, "total_tokens", None))
+            return completion
+
+    async def _with_fallback(self, task: str, call, stream: bool = False):
+        """
+        Prueba los modelos que el router da para la tarea, en orden: si uno no está
+        disponible (reintentos agotados, circuito abierto) o no existe, pasa al siguiente.
+        `call(model)` hace la llamada; su latencia y uso de tokens quedan en el router
+        y en /metrics (en streaming, /metrics los registra al terminar el stream).
+        """
+        models = self.router.route(task)
+        for index, model in enumerate(models):
+            start = time.perf_counter()
+            try:
+                result = await call(model)
+            except (LLMUnavailableError, groq.NotFoundError):
+                record_llm_call(task, model, time.perf_counter() - start, outcome="error")
+                fallback = index < len(models) - 1
+                self.router.record_failure(model, fallback)
+                if not fallback:
+                    raise
+                logger.warning("Modelo %s no disponible para %s, probando %s", model, task, models[index + 1])
+                continue
+            elapsed = time.perf_counter() - start
+            usage = getattr(result, "usage", None)
+            self.router.record(model, task, elapsed, usage)
+            if not stream:
+                record_llm_call(task, model, elapsed, usage)
+            return result
+
+    async def _create_completion(self, kind: str, task: str, hedge: bool = False, **params):
+        """
+        Llama a la API de Groq sin bloquear el event loop, respetando el límite de
+        concurrencia y los límites por minuto de la API key. El modelo lo elige el
+        router según `task`. Con `hedge` (chat) se lanza una segunda petición si la
+        primera tarda más de GROQ_HEDGE_DELAY_SECONDS.
+        """
+        async def call(model: str):
+            model_params = {**params, "model": model}
+            if hedge:
+                return await self._call_with_resilience(
+                    lambda: self.hedger.run(lambda: self._attempt(kind, model_params)), model
+                )
+            return await self._call_with_resilience(lambda: self._attempt(kind, model_params), model)
+
+        return await self._with_fallback(task, call)
+
+    async def _open_stream(self, params: Dict):
+        # En streaming no llega `usage`: la reserva se queda completa
+        await self.rate_limiter.reserve(self._reserved_tokens(params))
+        return await self.client.chat.completions.create(stream=True, **params)
+
+    async def _stream_completion(self, kind: str, task: str, **params) -> AsyncIterator[str]:
+        """
+        Llama a Groq con stream=True y devuelve solo el texto de cada fragmento.
+        Solo se reintenta (o se cambia de modelo en) la apertura del stream: una vez
+        emitido texto no se repite. El router registra la latencia de apertura; /metrics,
+        el tiempo hasta el primer token, la duración total y los tokens del último
+        fragmento (`x_groq.usage`).
+        """
+        async with self._limits[kind]:
+            start = time.perf_counter()
+            stream = await self._with_fallback(
+                task,
+                lambda model: self._call_with_resilience(lambda: self._open_stream({**params, "model": model}), model),
+                stream=True,
+            )
+            model, usage, first_token, outcome = params.get("model"), None, True, "error"
+            try:
+                async for chunk in stream:
+                    model = getattr(chunk, "model", None) or model
+                    x_groq = getattr(chunk, "x_groq", None)
+                    if isinstance(x_groq, dict) and x_groq.get("usage"):
+                        usage = x_groq["usage"]
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if first_token:
+                            llm_time_to_first_token.observe(time.perf_counter() - start, task, model)
+                            first_token = False
+                        yield delta
+                outcome = "ok"
+            finally:
+                record_llm_call(task, model or "unknown", time.perf_counter() - start, usage, outcome)
+                # Si el cliente se desconecta, liberar la conexión del pool en lugar de leer el resto
+                await stream.response.aclose()
+
+    async def aclose(self):
+        """Cierra el pool de conexiones HTTP."""
+        await self.http_client.aclose()
+
+    @staticmethod
+    def _profile_fields(answers: Dict) -> Dict:
+        """Variables del perfil del cuestionario para las plantillas de plan."""
+        return dict(
+            level=answers.get('level', 'beginner'),
+            interests=', '.join(answers.get('interests', ['Python', 'SQL'])),
+            hours_per_day=answers.get('hours_per_day', 2),
+            goal=answers.get('goal', 'Aprender programación'),
+            timeline_weeks=answers.get('timeline_weeks', 24),
+            previous_experience=answers.get('previous_experience', 'Ninguna'),
+            learning_style=answers.get('learning_style', 'mixto'),
+        )
+
+    def _plan_messages(self, answers: Dict) -> List[Dict]:
+        """Mensajes (system + user) para generar un plan a partir del cuestionario."""
+        return self.prompts.render("plan", **self._profile_fields(answers))
+
+    @staticmethod
+    def parse_plan_json(content: str) -> Dict:
+        """
+        Parsea la respuesta del modelo ignorando el posible markdown (```json).
+        Si el JSON viene cortado (p. ej. por max_tokens) se recupera la parte completa.
+        """
+        parser = PlanStreamParser()
+        parser.feed(content)
+        plan = parser.finish()
+        if parser.truncated:
+            logger.warning("Plan JSON truncado: recuperadas %d fases", len(plan.get("phases", [])))
+        return plan
+
+    async def generate_career_plan(self, answers: Dict, kind: str = "plan", reference: Optional[Dict] = None) -> Dict:
         """
         Generar plan de carrera personalizado usando Groq AI
 
         Args:
             answers: Diccionario con respuestas del cuestionario
+            kind: "plan" (interactivo), "batch" o "job"; cada uno con su límite de concurrencia
+            reference: plan guardado parecido (plan_search.find_reference); si se da, el
+                plan se obtiene adaptándolo con un prompt de edición corto y, si la
+                adaptación falla, se genera completo
 
         Returns:
             Dict con estructura del plan de carrera
         """
-
-        prompt = f"""Eres un experto mentor en tecnología y desarrollo de carrera. Genera un plan de carrera personalizado DETALLADO en formato JSON válido.
-
-**Perfil del Usuario:**
-- Nivel actual: {answers.get('level', 'beginner')}
-- Tecnologías de interés: {', '.join(answers.get('interests', ['Python', 'SQL']))}
-- Tiempo disponible diario: {answers.get('hours_per_day', 2)} horas
-- Objetivo principal: {answers.get('goal', 'Aprender programación')}
-- Plazo deseado: {answers.get('timeline_weeks', 24)} semanas
-- Experiencia previa: {answers.get('previous_experience', 'Ninguna')}
-- Estilo de aprendizaje preferido: {answers.get('learning_style', 'mixto')}
-
-**INSTRUCCIONES:**
-Crea un plan estructurado con 4-5 fases progresivas. Cada fase DEBE incluir:
-
-1. **Información general:**
-   - id: número de fase (1, 2, 3, 4, 5)
-   - title: Título descriptivo y motivador
-   - duration_weeks: Duración realista en semanas
-   - description: Párrafo explicando qué se logrará en esta fase
-
-2. **learning_items:** Array con MÍNIMO 10 objetivos específicos de aprendizaje
-   - Deben ser concretos y accionables
-   - Progresión de básico a avanzado
-
-3. **projects:** Array con EXACTAMENTE 3 proyectos
-   - **Proyecto Fácil:**
-     * difficulty: "easy"
-     * title: Nombre del proyecto
-     * description: Qué construirá el usuario
-     * requirements: Array con 5-7 requisitos técnicos específicos
-     * github_tips: Consejos para documentar en GitHub
-     * technologies: Array de tecnologías a usar
-
-   - **Proyecto Medio:**
-     * difficulty: "medium"
-     * (misma estructura que fácil, 7-9 requisitos)
-
-   - **Proyecto Difícil:**
-     * difficulty: "hard"
-     * (misma estructura que fácil, 9-12 requisitos)
-
-4. **resources:** Array con 3-5 recursos de aprendizaje
-   - title: Nombre del recurso
-   - url: URL real o placeholder realista
-   - type: "course" | "documentation" | "video" | "book"
-
-**IMPORTANTE:**
-- Responde ÚNICAMENTE con JSON válido
-- NO incluyas markdown (```json)
-- NO agregues comentarios
-- Asegura que sea parseable con json.loads()
-- Todo en español
-- URLs realistas (Coursera, Udemy, YouTube, docs oficiales)
-
-**FORMATO DE RESPUESTA (JSON puro):**
-{{
-  "plan_title": "Nombre motivador del plan completo",
-  "total_weeks": número total de semanas,
-  "phases": [
-    {{
-      "id": 1,
-      "title": "Fase 1: Fundamentos",
-      "duration_weeks": 6,
-      "description": "Descripción de la fase",
-      "learning_items": [
-        "Item de aprendizaje 1",
-        "Item de aprendizaje 2",
-        "... hasta 10+"
-      ],
-      "projects": [
-        {{
-          "difficulty": "easy",
-          "title": "Proyecto Inicial",
-          "description": "Qué se construye",
-          "requirements": ["req1", "req2", "req3", "req4", "req5"],
-          "github_tips": "Consejos para el README",
-          "technologies": ["tech1", "tech2"]
-        }},
-        {{
-          "difficulty": "medium",
-          "title": "Proyecto Intermedio",
-          "description": "...",
-          "requirements": ["..."],
-          "github_tips": "...",
-          "technologies": ["..."]
-        }},
-        {{
-          "difficulty": "hard",
-          "title": "Proyecto Avanzado",
-          "description": "...",
-          "requirements": ["..."],
-          "github_tips": "...",
-          "technologies": ["..."]
-        }}
-      ],
-      "resources": [
-        {{
-          "title": "Nombre del curso",
-          "url": "https://ejemplo.com",
-          "type": "course"
-        }}
-      ]
-    }}
-  ]
-}}
-"""
+        if reference is not None:
+            try:
+                return await self._adapt_plan(answers, reference, kind)
+            except LLMUnavailableError:
+                raise
+            except Exception as e:
+                retrieval_stats["fallbacks"] += 1
+                logger.warning("No se pudo adaptar el plan de referencia (%s): generación completa", e)
 
         content = ""
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Eres un experto mentor en programación. Respondes SIEMPRE en español con JSON válido sin markdown."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model=self.model,
+            chat_completion = await self._create_completion(
+                kind,
+                "plan",
+                messages=self._plan_messages(answers),
                 temperature=0.7,
                 max_tokens=4000,
                 top_p=1,
                 stream=False
             )
 
-            content = chat_completion.choices[0].message.content.strip()
-
-            # Limpiar posible markdown
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
-
-            # Parsear JSON
-            plan_data = json.loads(content)
-
-            return plan_data
+            content = chat_completion.choices[0].message.content
+            plan = self.parse_plan_json(content)
+            return await self.validate_plan(plan, self._total_tokens(chat_completion, content), kind)
 
         except json.JSONDecodeError as e:
-            print(f"Error parsing JSON: {e}")
-            print(f"Content received: {content[:500] if content else 'N/A'}")
+            logger.warning("Error parsing JSON: %s; contenido: %s", e, content[:500] if content else "N/A")
             raise ValueError(f"La IA no generó JSON válido: {str(e)}")
-        except Exception as e:
-            print(f"Error generating plan: {e}")
+        except Exception:
+            logger.exception("Error generating plan")
             raise
 
-    async def generate_career_plan_from_chat(self, user_message: str) -> Dict:
+    async def _adapt_plan(self, answers: Dict, reference: Dict, kind: str) -> Dict:
+        """
+        El modelo solo devuelve la estructura nueva (título, semanas y qué fases del plan
+        base se conservan, con su título, duración y descripción ajustados); el contenido
+        de cada fase se copia del plan base. Unos cientos de tokens en vez de un plan entero.
+        """
+        base_phases = {phase.get("id"): phase for phase in reference.get("phases") or []}
+        outline = {
+            "plan_title": reference.get("plan_title"),
+            "total_weeks": reference.get("total_weeks"),
+            "phases": [
+                {
+                    "id": phase_id,
+                    "title": phase.get("title"),
+                    "duration_weeks": phase.get("duration_weeks"),
+                    "description": phase.get("description"),
+                    "technologies": sorted({
+                        tech for project in phase.get("projects") or [] if isinstance(project, dict)
+                        for tech in project.get("technologies") or []
+                    }),
+                }
+                for phase_id, phase in base_phases.items()
+            ],
+        }
+        completion = await self._create_completion(
+            kind,
+            "plan_adapt",
+            messages=self.prompts.render(
+                "plan_adapt", **self._profile_fields(answers), reference=json.dumps(outline, ensure_ascii=False)
+            ),
+            temperature=0.4,
+            max_tokens=800,
+            top_p=1,
+            response_format={"type": "json_object"},
+            stream=False
+        )
+        content = completion.choices[0].message.content or ""
+        edits = self.parse_plan_json(content)
+        phases = []
+        for edit in edits.get("phases") or []:
+            if not isinstance(edit, dict):
+                continue
+            try:
+                source = base_phases.get(int(edit.get("id")))
+            except (TypeError, ValueError):
+                source = None
+            if source is None:
+                continue
+            adjusted = {key: edit[key] for key in ("title", "duration_weeks", "description") if edit.get(key)}
+            phases.append({**source, **adjusted, "id": len(phases) + 1})
+        if not phases:
+            raise ValueError("la adaptación no conservó ninguna fase del plan base")
+
+        tokens = self._total_tokens(completion, content)
+        retrieval_stats["adapted"] += 1
+        retrieval_stats["adapt_tokens"] += tokens
+        plan = {
+            **{key: value for key, value in reference.items() if key != "phases"},
+            "plan_title": edits.get("plan_title") or reference.get("plan_title"),
+            "total_weeks": edits.get("total_weeks") or answers.get("timeline_weeks") or reference.get("total_weeks"),
+            "phases": phases,
+        }
+        return await self.validate_plan(plan, tokens, kind)
+
+    @staticmethod
+    def _total_tokens(completion, content: str) -> int:
+        usage = getattr(completion, "usage", None)
+        return getattr(usage, "total_tokens", None) or estimate_tokens(content or "")
+
+    async def validate_plan(self, plan: Dict, full_tokens: int, kind: str = "plan") -> Dict:
+        """
+        Valida el plan contra el esquema (schemas.PlanPhaseContent). Las fases que faltan
+        o no sirven y los campos incompletos (p. ej. menos de 10 learning_items) se
+        regeneran en paralelo con prompts pequeños y se integran en el plan, en lugar de
+        repetir la generación entera (`full_tokens` es lo que costó y se ahorra).
+        Lanza ValueError si el plan sigue sin ser válido.
+        """
+        stats = plan_repair_stats.stats
+        stats["validated"] += 1
+        plan = normalize_plan(plan)
+        problems = find_problems(plan)
+        if not problems:
+            stats["valid"] += 1
+            return plan
+        if not settings.PLAN_REPAIR_ENABLED:
+            stats["failed"] += 1
+            raise ValueError(f"Plan incompleto: {describe_problems(problems)}")
+
+        logger.info("Plan incompleto, reparando: %s", describe_problems(problems))
+        results = await asyncio.gather(
+            *(self._repair_plan_part(plan, index, field, kind) for index, field in problems),
+            return_exceptions=True
+        )
+        repair_tokens = 0
+        for (index, field), result in zip(problems, results):
+            if isinstance(result, LLMUnavailableError):
+                raise result
+            if isinstance(result, Exception):
+                logger.warning("Error reparando fase %d (%s): %s", index + 1, field or "completa", result)
+                continue
+            value, tokens = result
+            repair_tokens += tokens
+            if field is None:
+                if index < len(plan["phases"]):
+                    plan["phases"][index] = value
+                else:
+                    plan["phases"].append(value)
+                stats["phases_repaired"] += 1
+            else:
+                plan["phases"][index][field] = value
+                stats["fields_repaired"] += 1
+        stats["repair_tokens"] += repair_tokens
+
+        plan = normalize_plan(plan)
+        remaining = find_problems(plan)
+        if remaining:
+            stats["failed"] += 1
+            raise ValueError(f"Plan incompleto tras reparar: {describe_problems(remaining)}")
+        stats["repaired"] += 1
+        stats["saved_tokens"] += max(0, full_tokens - repair_tokens)
+        return plan
+
+    async def _repair_plan_part(self, plan: Dict, index: int, field: Optional[str], kind: str):
+        """Regenera una fase (field=None) o un campo de una fase. Devuelve (valor, tokens usados)."""
+        if field is None:
+            messages = self.prompts.render(
+                "plan_repair_phase",
+                plan_title=plan["plan_title"],
+                total_weeks=plan["total_weeks"],
+                outline=phase_outline(plan),
+                position=index + 1,
+            )
+            max_tokens = 1800
+        else:
+            phase = {key: value for key, value in plan["phases"][index].items() if key != field}
+            messages = self.prompts.render(
+                "plan_repair_field",
+                plan_title=plan["plan_title"],
+                phase=json.dumps(phase, ensure_ascii=False),
+                field=field,
+            )
+            max_tokens = 1200
+        completion = await self._create_completion(
+            kind,
+            "plan_repair",
+            messages=messages,
+            temperature=0.7,
+            max_tokens=max_tokens,
+            top_p=1,
+            response_format={"type": "json_object"},
+            stream=False
+        )
+        content = completion.choices[0].message.content or ""
+        data = self.parse_plan_json(content)
+        return (data if field is None else data.get(field)), self._total_tokens(completion, content)
+
+    async def stream_career_plan(self, answers: Dict) -> AsyncIterator[str]:
+        """
+        Igual que generate_career_plan pero devuelve los fragmentos de texto
+        a medida que el modelo los genera (el JSON se parsea al terminar).
+        """
+        async for delta in self._stream_completion(
+            "plan",
+            "plan",
+            messages=self._plan_messages(answers),
+            temperature=0.7,
+            max_tokens=4000,
+            top_p=1
+        ):
+            yield delta
+
+    async def generate_career_plan_from_chat(self, user_message: str, kind: str = "plan") -> Dict:
         """
         Genera un plan de carrera a partir de un único mensaje del usuario
         (ej. "Quiero aprender SQL y Python para ciencia de datos").
         Devuelve la misma estructura que generate_career_plan.
         """
-        prompt = f"""El usuario ha dicho lo siguiente sobre lo que quiere estudiar:
-
-"{user_message}"
-
-A partir de este mensaje, genera un plan de carrera personalizado DETALLADO en formato JSON válido. Usa el mismo formato exacto que en las instrucciones de generate_career_plan:
-
-- plan_title: nombre motivador del plan
-- total_weeks: número total de semanas (entre 12 y 52)
-- phases: array de 4-5 fases. Cada fase debe tener:
-  - id, title, duration_weeks, description
-  - learning_items: array de mínimo 10 ítems de aprendizaje concretos
-  - projects: exactamente 3 proyectos (difficulty: "easy", "medium", "hard") cada uno con title, description, requirements (array), github_tips, technologies (array)
-  - resources: array de 3-5 recursos con title, url, type ("course"|"documentation"|"video"|"book")
-
-Responde ÚNICAMENTE con JSON válido, sin markdown ni comentarios. Todo en español."""
-
         content = ""
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "Eres un experto en planes de carrera. Respondes SIEMPRE en español con JSON válido sin markdown."},
-                    {"role": "user", "content": prompt}
-                ],
-                model=self.model,
+            chat_completion = await self._create_completion(
+                kind,
+                "plan_from_chat",
+                messages=self.prompts.render("plan_from_chat", user_message=user_message),
                 temperature=0.7,
                 max_tokens=4000,
                 top_p=1,
                 stream=False
             )
-            content = chat_completion.choices[0].message.content.strip()
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            elif content.startswith("```"):
-                content = content.replace("```", "").strip()
-            return json.loads(content)
+            content = chat_completion.choices[0].message.content
+            plan = self.parse_plan_json(content)
+            return await self.validate_plan(plan, self._total_tokens(chat_completion, content), kind)
         except json.JSONDecodeError as e:
-            print(f"Error parsing JSON (from chat): {e}")
-            print(f"Content: {content[:500] if content else 'N/A'}")
+            logger.warning("Error parsing JSON (from chat): %s; contenido: %s", e, content[:500] if content else "N/A")
             raise ValueError(f"La IA no generó JSON válido: {str(e)}")
-        except Exception as e:
-            print(f"Error in generate_career_plan_from_chat: {e}")
+        except Exception:
+            logger.exception("Error in generate_career_plan_from_chat")
             raise
 
-    async def chat_with_context(
+    def _chat_messages(
         self,
         message: str,
         user_context: Dict,
-        chat_history: List[Dict]
-    ) -> str:
+        chat_history: List[Dict],
+        summary: Optional[str] = None
+    ) -> List[Dict]:
         """
-        Chat conversacional con contexto del progreso del usuario
-
-        Args:
-            message: Mensaje del usuario
-            user_context: Contexto del plan y progreso
-            chat_history: Historial de mensajes previos
-
-        Returns:
-            String con la respuesta de la IA
+        Prompt de sistema fijo + contexto del usuario (al final, para no romper el
+        prefijo común) + resumen de la conversación anterior + historial reciente +
+        mensaje actual. El historial ya viene recortado al presupuesto de tokens
+        (ver chat_context.build_chat_context).
         """
+        messages = self.prompts.render(
+            "chat",
+            plan_title=user_context.get('plan_title', 'Aún no tiene plan definido'),
+            current_phase=user_context.get('current_phase', 'Inicio del camino'),
+            progress_percentage=user_context.get('progress_percentage', 0),
+            completed_projects=user_context.get('completed_projects', 0),
+            recent_challenges=user_context.get('recent_challenges', 'No reportados aún'),
+        )
+
+        if summary:
+            messages.append({
+                "role": "system",
+                "content": f"Resumen de la conversación anterior con este usuario:\n{summary}"
+            })
 
-        system_prompt = f"""Eres un mentor experto en programación muy amigable, motivador y útil.
-
-**Contexto del Usuario:**
-- Plan de carrera: {user_context.get('plan_title', 'Aún no tiene plan definido')}
-- Fase actual: {user_context.get('current_phase', 'Inicio del camino')}
-- Progreso general: {user_context.get('progress_percentage', 0)}%
-- Proyectos completados: {user_context.get('completed_projects', 0)}
-- Últimos desafíos: {user_context.get('recent_challenges', 'No reportados aún')}
-
-**Tu Rol y Estilo:**
-- Ayudar con dudas técnicas de forma clara y práctica
-- Motivar constantemente con energía positiva
-- Explicar conceptos complejos de forma simple
-- Sugerir recursos útiles cuando sea relevante
-- Revisar código si lo comparten
-- Dar feedback constructivo
-- Usar emojis ocasionalmente (1-2 por mensaje) para ser amigable
-- Ser conciso pero completo (máximo 4 párrafos cortos)
-
-**Reglas:**
-- Siempre en español
-- Si no sabes algo, admítelo y sugiere dónde buscar
-- Enfócate en soluciones prácticas
-- Relaciona tus respuestas con su plan cuando sea relevante
-- Celebra sus logros
-"""
-
-        messages = [{"role": "system", "content": system_prompt}]
-
-        # Agregar historial reciente (últimos 8 mensajes para contexto)
-        for msg in chat_history[-8:]:
+        # Agregar historial reciente
+        for msg in chat_history:
             messages.append({
                 "role": msg["role"],
                 "content": msg["content"]
@@ -277,17 +526,55 @@ Responde ÚNICAMENTE con JSON válido, sin markdown ni comentarios. Todo en espa
             "role": "user",
             "content": message
         })
+        return messages
+
+    def _prompt_context(self, message: str, user_context: Dict, chat_history: List[Dict], summary: Optional[str]):
+        """
+        Las preguntas que la caché semántica comparte entre usuarios se responden solo
+        con el plan y la fase (la clave de la caché), sin progreso, historial ni resumen:
+        la respuesta no lleva datos de un usuario a otro.
+        """
+        if self.semantic_cache is not None and self.semantic_cache.is_shared(message):
+            shared = {key: user_context[key] for key in ("plan_title", "current_phase") if key in user_context}
+            return shared, [], None
+        return user_context, chat_history, summary
 
+    async def chat_with_context(
+        self,
+        message: str,
+        user_context: Dict,
+        chat_history: List[Dict],
+        summary: Optional[str] = None,
+        user_id: Optional[int] = None
+    ) -> str:
+        """
+        Chat conversacional con contexto del progreso del usuario
+
+        Args:
+            message: Mensaje del usuario
+            user_context: Contexto del plan y progreso
+            chat_history: Historial de mensajes previos
+            summary: Resumen acumulado de los mensajes que ya no entran en el historial
+            user_id: Usuario que pregunta (ámbito de la caché semántica)
+
+        Returns:
+            String con la respuesta de la IA
+        """
         if not (getattr(settings, "GROQ_API_KEY", None) or "").strip():
-            return (
-                "⚠️ El backend no tiene configurada GROQ_API_KEY. "
-                "Añade GROQ_API_KEY en backend/.env y reinicia el servidor."
-            )
+            return MISSING_API_KEY_MESSAGE
+
+        user_context, chat_history, summary = self._prompt_context(message, user_context, chat_history, summary)
+        if self.semantic_cache is not None:
+            cached = self.semantic_cache.lookup(message, user_context, user_id)
+            if cached is not None:
+                return cached
 
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=messages,
-                model=self.model,
+            chat_completion = await self._create_completion(
+                "chat",
+                self.router.chat_task(message),
+                hedge=True,
+                messages=self._chat_messages(message, user_context, chat_history, summary),
                 temperature=0.8,
                 max_tokens=600,
                 top_p=1,
@@ -297,12 +584,83 @@ Responde ÚNICAMENTE con JSON válido, sin markdown ni comentarios. Todo en espa
             response = chat_completion.choices[0].message.content
             if not response or not response.strip():
                 return "La IA no generó respuesta. Intenta de nuevo."
+            if self.semantic_cache is not None:
+                self.semantic_cache.store(message, user_context, response, user_id)
             return response
 
+        except LLMUnavailableError:
+            # La ruta responde 503 con Retry-After en lugar de guardar el error como respuesta
+            raise
         except Exception as e:
             err_msg = str(e).strip() or type(e).__name__
-            print(f"Error in chat: {e}")
+            logger.exception("Error in chat")
             return (
                 f"Error de Groq: {err_msg}. "
                 "Revisa tu API key en backend/.env y que el modelo esté disponible."
             )
+
+    async def stream_chat_with_context(
+        self,
+        message: str,
+        user_context: Dict,
+        chat_history: List[Dict],
+        summary: Optional[str] = None,
+        user_id: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """
+        Versión en streaming de chat_with_context: devuelve los tokens según llegan.
+        A diferencia de la versión completa, los errores de Groq se propagan
+        para que la ruta no guarde una respuesta a medias.
+        """
+        if not (getattr(settings, "GROQ_API_KEY", None) or "").strip():
+            yield MISSING_API_KEY_MESSAGE
+            return
+
+        user_context, chat_history, summary = self._prompt_context(message, user_context, chat_history, summary)
+        if self.semantic_cache is not None:
+            cached = self.semantic_cache.lookup(message, user_context, user_id)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        async for delta in self._stream_completion(
+            "chat",
+            self.router.chat_task(message),
+            messages=self._chat_messages(message, user_context, chat_history, summary),
+            temperature=0.8,
+            max_tokens=600,
+            top_p=1
+        ):
+            parts.append(delta)
+            yield delta
+
+        response = "".join(parts)
+        if self.semantic_cache is not None and response.strip():
+            self.semantic_cache.store(message, user_context, response, user_id)
+
+    async def summarize_conversation(self, previous_summary: Optional[str], messages: List[Dict]) -> str:
+        """
+        Resumen incremental: el resumen anterior + los mensajes que han salido de
+        la ventana de contexto se condensan en un nuevo resumen breve.
+        Los errores se propagan; quien llama conserva el resumen anterior.
+        """
+        transcript = "\n".join(
+            f"{'Usuario' if msg['role'] == 'user' else 'Mentor'}: {msg['content']}"
+            for msg in messages
+        )
+        chat_completion = await self._create_completion(
+            "chat",
+            "summary",
+            messages=self.prompts.render(
+                "summary",
+                max_words=settings.CHAT_SUMMARY_MAX_TOKENS,
+                previous_summary=previous_summary or "(vacío)",
+                transcript=transcript,
+            ),
+            temperature=0.3,
+            max_tokens=settings.CHAT_SUMMARY_MAX_TOKENS * 2,
+            top_p=1,
+            stream=False
+        )
+        return (chat_completion.choices[0].message.content or "").strip()
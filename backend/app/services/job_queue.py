@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import socket
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from app.callback_urls import allowed_callback_hosts, check_callback_url, is_public_address
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """La cola ya tiene JOB_QUEUE_MAX_DEPTH trabajos esperando."""
+
+
+class MemoryJobBackend:
+    """asyncio.Queue acotada: por worker y sin persistencia (se pierde al reiniciar)."""
+
+    name = "memory"
+    volatile = True
+
+    def __init__(self, max_depth: int = settings.JOB_QUEUE_MAX_DEPTH):
+        self.max_depth = max_depth
+        self._queue: "asyncio.Queue[int]" = asyncio.Queue(maxsize=max_depth)
+
+    async def put(self, job_id: int) -> None:
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            raise QueueFullError()
+
+    async def get(self) -> int:
+        return await self._queue.get()
+
+    async def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def aclose(self) -> None:
+        pass
+
+
+class RedisJobBackend:
+    """
+    Lista de Redis (LPUSH / BRPOP) compartida entre workers y procesos.
+    Sirve cualquier servidor compatible con el protocolo de Redis (Redis, Valkey, KeyDB...).
+    """
+
+    name = "redis"
+    volatile = False
+
+    def __init__(
+        self,
+        url: str = settings.JOB_QUEUE_REDIS_URL,
+        queue_name: str = settings.JOB_QUEUE_NAME,
+        max_depth: int = settings.JOB_QUEUE_MAX_DEPTH,
+    ):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self.queue_name = queue_name
+        self.max_depth = max_depth
+
+    async def put(self, job_id: int) -> None:
+        # Comprobación aproximada (no atómica): la cola puede pasarse por unos pocos trabajos
+        if await self._redis.llen(self.queue_name) >= self.max_depth:
+            raise QueueFullError()
+        await self._redis.lpush(self.queue_name, job_id)
+
+    async def get(self) -> int:
+        while True:
+            # Timeout corto para que la cancelación al apagar no espere a un BRPOP bloqueado
+            item = await self._redis.brpop([self.queue_name], timeout=1)
+            if item is not None:
+                return int(item[1])
+
+    async def depth(self) -> int:
+        return await self._redis.llen(self.queue_name)
+
+    async def aclose(self) -> None:
+        await self._redis.aclose()
+
+
+def create_backend():
+    if settings.JOB_QUEUE_BACKEND == "redis":
+        return RedisJobBackend()
+    if settings.JOB_QUEUE_BACKEND != "memory":
+        raise ValueError(f"JOB_QUEUE_BACKEND desconocido: {settings.JOB_QUEUE_BACKEND}")
+    return MemoryJobBackend()
+
+
+class JobQueue:
+    """
+    Pool acotado de tareas asyncio que consumen ids de trabajo del backend y los
+    pasan a `handler`. El handler guarda estado y resultado en la base de datos;
+    la cola solo transporta ids y lleva las métricas. `recover`, si se indica, se
+    ejecuta cada `recover_interval` segundos para reencolar trabajos perdidos.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[int], Awaitable[None]],
+        backend=None,
+        workers: int = settings.JOB_QUEUE_WORKERS,
+        recover: Optional[Callable[[], Awaitable[None]]] = None,
+        recover_interval: float = settings.JOB_RECOVERY_INTERVAL_SECONDS,
+    ):
+        self.handler = handler
+        self.backend = backend or create_backend()
+        self.workers = workers
+        self.recover = recover
+        self.recover_interval = recover_interval
+        self._tasks = []
+        self.running = 0
+        self.stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+    async def start(self) -> None:
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+            if self.recover is not None:
+                self._tasks.append(asyncio.create_task(self._recoverer()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.backend.aclose()
+
+    async def submit(self, job_id: int) -> None:
+        try:
+            await self.backend.put(job_id)
+        except QueueFullError:
+            self.stats["rejected"] += 1
+            raise
+        self.stats["submitted"] += 1
+
+    async def snapshot(self) -> Dict:
+        return {
+            **self.stats,
+            "backend": self.backend.name,
+            "workers": self.workers,
+            "running": self.running,
+            "depth": await self.backend.depth(),
+            "max_depth": self.backend.max_depth,
+        }
+
+    async def _recoverer(self) -> None:
+        while True:
+            await asyncio.sleep(self.recover_interval)
+            try:
+                await self.recover()
+            except Exception:
+                logger.exception("Error recovering jobs")
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self.backend.get()
+            self.running += 1
+            try:
+                await self.handler(job_id)
+                self.stats["completed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats["failed"] += 1
+                logger.exception("Error in job %s", job_id)
+            finally:
+                self.running -= 1
+
+
+async def _pinned_callback(url: str) -> Optional[Tuple[str, Dict[str, str], Dict[str, str]]]:
+    """
+    Resuelve el host una sola vez, comprueba que todas sus direcciones son públicas y
+    devuelve (url con esa IP, cabeceras, extensiones de httpx) para conectar justo a la
+    dirección comprobada: si httpx resolviera otra vez, un DNS que cambia de respuesta
+    (DNS rebinding) podría llevar la petición a la red interna. La cabecera Host, el SNI
+    y la verificación del certificado siguen usando el nombre original.
+    None si la URL no se admite.
+    """
+    try:
+        check_callback_url(url)
+    except ValueError:
+        return None
+    parts = urlsplit(url)
+    host = parts.hostname.lower()
+    if host in allowed_callback_hosts():
+        return url, {}, {}
+    port = parts.port or 443
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except OSError:
+        return None
+    if not infos or not all(is_public_address(info[4][0]) for info in infos):
+        return None
+    address = infos[0][4][0]
+    netloc = f"[{address}]:{port}" if ":" in address else f"{address}:{port}"
+    pinned = urlunsplit((parts.scheme, netloc, parts.path, parts.query, ""))
+    return pinned, {"Host": parts.netloc.rsplit("@", 1)[-1]}, {"sni_hostname": host}
+
+
+async def send_callback(url: Optional[str], payload: Dict) -> None:
+    """
+    POST del estado final del trabajo a la URL indicada por el cliente (sin seguir
+    redirecciones, que podrían llevar a la red interna). Los fallos solo se registran.
+    """
+    if not url:
+        return
+    target = await _pinned_callback(url)
+    if target is None:
+        logger.warning("Job callback to %s refused: not a public https host", url)
+        return
+    pinned, headers, extensions = target
+    import httpx
+
+    try:
+        async with httpx.AsyncClient(timeout=settings.JOB_CALLBACK_TIMEOUT_SECONDS, follow_redirects=False) as client:
+            response = await client.post(pinned, json=payload, headers=headers, extensions=extensions)
+            response.raise_for_status()
+    except Exception as e:
+        logger.warning("Error sending job callback to %s: %s", url, e)
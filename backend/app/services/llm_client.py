@@ -0,0 +1,46 @@
+"""
+GroqService compartido por todas las rutas del worker, creado en el primer uso.
+
+Importar este módulo no carga el SDK de Groq ni httpx: el servicio (y su pool de
+conexiones) se construye con la primera petición que lo necesita, así el arranque
+en frío de un worker no paga por un cliente que quizá no use.
+"""
+import asyncio
+import importlib
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from app.services.groq_service import GroqService
+
+# La precarga espera un poco: importar en un hilo compite por el GIL con las primeras peticiones
+WARMUP_DELAY_SECONDS = 1.0
+
+_service: Optional["GroqService"] = None
+
+
+def get_groq_service() -> "GroqService":
+    global _service
+    if _service is None:
+        from app.services.groq_service import GroqService
+
+        _service = GroqService()
+    return _service
+
+
+async def warm_up() -> None:
+    """
+    Importa el SDK de Groq y httpx en un hilo y crea el servicio, para que la primera
+    petición de chat no pague la importación. Se lanza tras el arranque, fuera del
+    camino de la primera respuesta.
+    """
+    await asyncio.sleep(WARMUP_DELAY_SECONDS)
+    await asyncio.to_thread(importlib.import_module, "app.services.groq_service")
+    get_groq_service()
+
+
+async def close_groq_service() -> None:
+    """Cierra el pool HTTP del servicio si llegó a crearse (apagado del worker)."""
+    global _service
+    if _service is not None:
+        await _service.aclose()
+        _service = None
@@ -0,0 +1,184 @@
+import bisect
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Segundos; cubren desde una consulta SQLite (~ms) hasta un plan largo del LLM
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        for values, total in self._values.items():
+            yield f"{self.name}{_label_text(self.labels, values)} {total:g}"
+
+
+class Histogram:
+    """
+    Histograma con cubos fijos. Se guarda la cuenta de cada cubo (no acumulada) y se
+    acumula al exportar, así observar es una búsqueda binaria y una suma.
+    """
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # valores de etiquetas -> [cuentas por cubo (+Inf al final), suma, total]
+        self._series: Dict[Tuple, List] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        for values, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _label_text(self.labels, values, 'le="' + le + '"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_label_text(self.labels, values)} {total:g}"
+            yield f"{self.name}_count{_label_text(self.labels, values)} {count}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: List = []
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Formato de texto de Prometheus (text/plain; version=0.0.4)."""
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta", ("method", "route", "status")
+)
+http_request_db_queries = registry.histogram(
+    "http_request_db_queries", "Consultas SQL por petición HTTP", ("route",), buckets=COUNT_BUCKETS
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Duración de las consultas SQL por tipo de sentencia", ("operation",)
+)
+llm_request_duration = registry.histogram(
+    "llm_request_duration_seconds", "Latencia de las llamadas a Groq (con reintentos)", ("task", "model", "outcome")
+)
+llm_time_to_first_token = registry.histogram(
+    "llm_time_to_first_token_seconds", "Tiempo hasta el primer token en streaming", ("task", "model")
+)
+llm_tokens = registry.counter(
+    "llm_tokens_total", "Tokens de Groq según el campo usage", ("task", "model", "type")
+)
+
+
+@dataclass
+class RequestMetrics:
+    """Acumulados de una petición HTTP (se comparten con las consultas SQL que hace)."""
+    request_id: str
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    llm_calls: int = 0
+    llm_seconds: float = 0.0
+
+
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request", default=None)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def _operation(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    return word if word in ("SELECT", "INSERT", "UPDATE", "DELETE", "PRAGMA", "WITH", "CREATE") else "OTHER"
+
+
+def install_db_metrics(sync_engine) -> None:
+    """
+    Mide cada consulta con los eventos de cursor de SQLAlchemy (también bajo el engine
+    async). El inicio se guarda en el contexto de ejecución: `conn.info` es bastante
+    más lento y este código corre en cada consulta.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_metrics_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        db_query_duration.observe(elapsed, _operation(statement))
+        request = current_request.get()
+        if request is not None:
+            request.db_queries += 1
+            request.db_seconds += elapsed
+
+
+def record_llm_tokens(task: str, model: str, usage) -> None:
+    """Tokens del campo `usage` de Groq (objeto de la respuesta o dict de x_groq en streaming)."""
+    if usage is None:
+        return
+    get = usage.get if isinstance(usage, dict) else lambda key: getattr(usage, key, None)
+    for kind in ("prompt", "completion"):
+        tokens = get(f"{kind}_tokens")
+        if tokens:
+            llm_tokens.inc(task, model, kind, amount=tokens)
+
+
+def record_llm_call(task: str, model: str, elapsed: float, usage=None, outcome: str = "ok") -> None:
+    """Latencia (y tokens, si hay `usage`) de una llamada a Groq."""
+    llm_request_duration.observe(elapsed, task, model, outcome)
+    record_llm_tokens(task, model, usage)
+    request = current_request.get()
+    if request is not None:
+        request.llm_calls += 1
+        request.llm_seconds += elapsed
@@ -0,0 +1,157 @@
+import re
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.services.chat_context import estimate_tokens
+
+# Tareas que se enrutan y el modelo principal de cada una
+TASKS = ("chat", "chat_complex", "summary", "plan", "plan_from_chat", "plan_repair", "plan_adapt")
+
+# Señales de que un mensaje de chat necesita el modelo grande: código pegado o
+# peticiones de razonamiento (diseño, depuración, comparación...)
+_CODE_PATTERN = re.compile(r"```|\bdef |\bclass |\bfunction\b|=>|\bSELECT\b|\bimport |Traceback|;\s*$", re.MULTILINE)
+_COMPLEX_WORDS = re.compile(
+    r"\b(arquitectura|diseñ\w*|optimiz\w*|compar\w*|depur\w*|debug\w*|revis\w*|refactoriz\w*|"
+    r"explica\w* en detalle|paso a paso|por qué falla|error)\b",
+    re.IGNORECASE,
+)
+
+
+def is_complex_message(message: str) -> bool:
+    """Heurística barata: mensaje largo, con código o que pide razonar sobre algo."""
+    if estimate_tokens(message) >= settings.CHAT_COMPLEX_MIN_TOKENS:
+        return True
+    return bool(_CODE_PATTERN.search(message) or _COMPLEX_WORDS.search(message))
+
+
+class ModelStats:
+    """Latencias recientes y tokens acumulados de un modelo."""
+
+    def __init__(self, window: int = 200):
+        self.latencies = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.fallbacks = 0  # veces que se pasó al siguiente modelo tras fallar este
+        self.slo_breaches = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tasks: Dict[str, int] = {}
+        self.consecutive_breaches = 0
+        self.degraded_until = 0.0
+
+    def snapshot(self) -> Dict:
+        ordered = sorted(self.latencies)
+
+        def pct(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 3)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "fallbacks": self.fallbacks,
+            "slo_breaches": self.slo_breaches,
+            "degraded": self.degraded_until > time.monotonic(),
+            "latency_p50": pct(50),
+            "latency_p95": pct(95),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tasks": dict(self.tasks),
+        }
+
+
+class ModelRouter:
+    """
+    Elige el modelo de cada llamada a Groq:
+    - chat sencillo y resúmenes -> modelo pequeño (rápido y barato)
+    - chat complejo, planes y reparación de planes -> modelo grande
+    Cada tarea tiene el otro modelo como alternativa si el principal falla. Un modelo
+    que supera el SLO de latencia de la tarea MODEL_SLO_BREACHES veces seguidas se
+    degrada durante MODEL_DEGRADED_SECONDS: mientras tanto se prueba primero la alternativa.
+    Con MODEL_ROUTING_ENABLED=false todo va al modelo grande, sin alternativa.
+    """
+
+    def __init__(self):
+        self.large = settings.GROQ_MODEL_LARGE
+        self.small = settings.GROQ_MODEL_SMALL
+        self.enabled = settings.MODEL_ROUTING_ENABLED
+        self.primary = {
+            "chat": self.small,
+            "chat_complex": self.large,
+            "summary": self.small,
+            "plan": self.large,
+            "plan_from_chat": self.large,
+            "plan_repair": self.large,
+            "plan_adapt": self.large,
+        }
+        self.slo = {
+            "chat": settings.CHAT_LATENCY_SLO_SECONDS,
+            "chat_complex": settings.CHAT_LATENCY_SLO_SECONDS,
+            "summary": settings.CHAT_LATENCY_SLO_SECONDS,
+            "plan": settings.PLAN_LATENCY_SLO_SECONDS,
+            "plan_from_chat": settings.PLAN_LATENCY_SLO_SECONDS,
+            "plan_repair": settings.PLAN_LATENCY_SLO_SECONDS,
+            "plan_adapt": settings.PLAN_LATENCY_SLO_SECONDS,
+        }
+        self.models: Dict[str, ModelStats] = {}
+
+    @property
+    def plan_model(self) -> str:
+        """Modelo de los planes (forma parte de la clave de la caché de planes)."""
+        return self.large
+
+    def _stats(self, model: str) -> ModelStats:
+        if model not in self.models:
+            self.models[model] = ModelStats()
+        return self.models[model]
+
+    def chat_task(self, message: str) -> str:
+        return "chat_complex" if is_complex_message(message) else "chat"
+
+    def route(self, task: str) -> List[str]:
+        """Modelos a probar en orden para la tarea: principal y alternativa."""
+        if not self.enabled:
+            return [self.large]
+        primary = self.primary[task]
+        fallback = self.large if primary == self.small else self.small
+        candidates = [primary] if fallback == primary else [primary, fallback]
+        # Un modelo degradado pasa al final (se sigue usando si la alternativa falla)
+        now = time.monotonic()
+        return sorted(candidates, key=lambda model: self._stats(model).degraded_until > now)
+
+    def record(self, model: str, task: str, latency: float, usage=None) -> None:
+        stats = self._stats(model)
+        stats.calls += 1
+        stats.tasks[task] = stats.tasks.get(task, 0) + 1
+        stats.latencies.append(latency)
+        if usage is not None:
+            stats.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            stats.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+        if latency > self.slo[task]:
+            stats.slo_breaches += 1
+            stats.consecutive_breaches += 1
+            if stats.consecutive_breaches >= settings.MODEL_SLO_BREACHES:
+                stats.degraded_until = time.monotonic() + settings.MODEL_DEGRADED_SECONDS
+                stats.consecutive_breaches = 0
+        else:
+            stats.consecutive_breaches = 0
+
+    def record_failure(self, model: str, fallback: bool) -> None:
+        stats = self._stats(model)
+        stats.errors += 1
+        if fallback:
+            stats.fallbacks += 1
+
+    def snapshot(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "routes": {task: self.route(task) for task in TASKS},
+            "models": {model: stats.snapshot() for model, stats in self.models.items()},
+        }
+
+
+# Métricas y degradación compartidas por todas las instancias de GroqService del worker
+model_router = ModelRouter()
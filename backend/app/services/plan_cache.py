@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import SessionLocal
+from app import models
+
+logger = logging.getLogger(__name__)
+
+
+def _clean_text(value) -> str:
+    return " ".join(str(value or "").lower().split())
+
+
+def normalize_answers(answers: Dict) -> Dict:
+    """
+    Forma canónica de las respuestas del cuestionario: minúsculas, espacios
+    colapsados, intereses ordenados y sin duplicados, semanas redondeadas al bucket.
+    Dos cuestionarios con la misma forma canónica comparten plan.
+    """
+    interests = answers.get("interests") or []
+    if isinstance(interests, str):
+        interests = [interests]
+    bucket = max(1, settings.PLAN_CACHE_TIMELINE_BUCKET_WEEKS)
+    weeks = int(answers.get("timeline_weeks") or 24)
+    return {
+        "level": _clean_text(answers.get("level")),
+        "interests": sorted({_clean_text(i) for i in interests if _clean_text(i)}),
+        "hours_per_day": int(answers.get("hours_per_day") or 0),
+        "goal": _clean_text(answers.get("goal")),
+        "timeline_weeks": max(bucket, round(weeks / bucket) * bucket),
+        "previous_experience": _clean_text(answers.get("previous_experience")),
+        "learning_style": _clean_text(answers.get("learning_style")),
+    }
+
+
+def plan_cache_key(answers: Dict, model: str, prompt_version: str) -> str:
+    canonical = json.dumps(
+        {"answers": normalize_answers(answers), "model": model, "prompt_version": prompt_version},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """
+    Caché de planes generados en dos niveles:
+    - memoria: LRU con TTL (por worker)
+    - base de datos (opcional): tabla plan_cache, compartida entre workers y reinicios
+    Las peticiones concurrentes con la misma clave esperan a una sola generación (single-flight).
+    Los planes se guardan serializados para que nadie modifique la copia cacheada.
+    El nivel de base de datos usa la sesión de la petición (`db`) para no pedir
+    una segunda conexión al pool mientras la petición ya tiene una.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.PLAN_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = settings.PLAN_CACHE_TTL_SECONDS,
+        persist: bool = settings.PLAN_CACHE_PERSIST,
+        persist_ttl_seconds: int = settings.PLAN_CACHE_PERSIST_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist = persist
+        self.persist_ttl_seconds = persist_ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {
+            "hits_memory": 0,
+            "hits_db": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    def snapshot(self) -> Dict:
+        # Las peticiones coalesced también se ahorran la llamada al LLM
+        hits = self.stats["hits_memory"] + self.stats["hits_db"] + self.stats["coalesced"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._memory),
+            "inflight": len(self._inflight),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+    async def get(self, key: str, db: Optional[AsyncSession] = None) -> Optional[Dict]:
+        """Busca en memoria y después en base de datos. Devuelve una copia del plan o None."""
+        payload, tier = await self._lookup(key, db)
+        self.stats[tier] += 1
+        return json.loads(payload) if payload is not None else None
+
+    async def _lookup(self, key: str, db: Optional[AsyncSession]) -> Tuple[Optional[str], str]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, payload = entry
+            if expires_at > time.time():
+                self._memory.move_to_end(key)
+                return payload, "hits_memory"
+            del self._memory[key]
+
+        if self.persist and db is not None:
+            payload = await self._db_get(db, key)
+            if payload is not None:
+                self._remember(key, payload)
+                return payload, "hits_db"
+
+        return None, "misses"
+
+    async def put(self, key: str, plan: Dict, model: str, prompt_version: str, db: Optional[AsyncSession] = None) -> str:
+        """Guarda el plan en ambos niveles y devuelve su forma serializada."""
+        payload = json.dumps(plan, ensure_ascii=False)
+        self._remember(key, payload)
+        self.stats["stores"] += 1
+        if self.persist and db is not None:
+            await self._db_put(db, key, payload, model, prompt_version)
+        return payload
+
+    async def get_or_generate(
+        self,
+        key: str,
+        generate: Callable[[], Awaitable[Dict]],
+        model: str,
+        prompt_version: str,
+        db: Optional[AsyncSession] = None,
+        use_cache: bool = True,
+    ) -> Tuple[Dict, str]:
+        """
+        Devuelve (plan, estado) con estado "hit", "coalesced" o "miss".
+        Con use_cache=False siempre genera (variación nueva) y actualiza la caché.
+        """
+        if not use_cache:
+            plan = await generate()
+            await self.put(key, plan, model, prompt_version, db)
+            return plan, "miss"
+
+        payload, tier = await self._lookup(key, db)
+        if payload is not None:
+            self.stats[tier] += 1
+            return json.loads(payload), "hit"
+
+        # La generación corre en su propia tarea: si el cliente que la lanzó se
+        # desconecta, los demás que esperan la misma clave siguen recibiendo el plan.
+        # Por eso no usa la sesión de esa petición, que puede estar cerrada o en uso
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._generate_and_store(key, generate, model, prompt_version, persist=db is not None)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget_inflight(key, done))
+            self.stats["misses"] += 1
+            status = "miss"
+        else:
+            self.stats["coalesced"] += 1
+            status = "coalesced"
+        payload = await asyncio.shield(task)
+        return json.loads(payload), status
+
+    async def _generate_and_store(self, key: str, generate, model: str, prompt_version: str, persist: bool) -> str:
+        plan = await generate()
+        if not (self.persist and persist):
+            return await self.put(key, plan, model, prompt_version)
+        async with SessionLocal() as db:
+            return await self.put(key, plan, model, prompt_version, db)
+
+    def _forget_inflight(self, key: str, task: asyncio.Future):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            # Marcar la excepción como recuperada aunque ningún cliente siga esperando
+            task.exception()
+
+    def _remember(self, key: str, payload: str):
+        self._memory[key] = (time.time() + self.ttl_seconds, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def _db_get(self, db: AsyncSession, key: str) -> Optional[str]:
+        entry = await db.get(models.PlanCacheEntry, key)
+        if entry is None or entry.expires_at <= time.time():
+            return None
+        return entry.plan
+
+    async def _db_put(self, db: AsyncSession, key: str, payload: str, model: str, prompt_version: str):
+        try:
+            await db.merge(models.PlanCacheEntry(
+                key=key,
+                model=model,
+                prompt_version=prompt_version,
+                plan=payload,
+                expires_at=int(time.time() + self.persist_ttl_seconds)
+            ))
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.warning("Error guardando plan en caché: %s", e)
@@ -0,0 +1,105 @@
+import json
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.config import settings
+from app.schemas import PlanPhaseContent
+
+# Campos de una fase que se pueden regenerar por separado con un prompt pequeño
+REPAIRABLE_FIELDS = ("learning_items", "projects", "resources")
+
+# (posición 0-based, campo) con campo=None para regenerar la fase entera
+Problem = Tuple[int, Optional[str]]
+
+
+def normalize_plan(plan: Dict) -> Dict:
+    """
+    Arreglos locales que no necesitan al modelo: ids por posición, títulos y
+    duraciones por defecto y total_weeks como suma de las fases si falta.
+    """
+    phases = plan.get("phases")
+    if not isinstance(phases, list):
+        phases = []
+    plan["phases"] = phases
+    for position, phase in enumerate(phases, start=1):
+        if not isinstance(phase, dict):
+            continue
+        phase["id"] = position
+        if not isinstance(phase.get("title"), str) or not phase["title"].strip():
+            phase["title"] = f"Fase {position}"
+        if not isinstance(phase.get("duration_weeks"), int) or phase["duration_weeks"] <= 0:
+            phase["duration_weeks"] = 4
+        if not isinstance(phase.get("description"), str):
+            phase["description"] = ""
+    if not isinstance(plan.get("plan_title"), str) or not plan["plan_title"].strip():
+        plan["plan_title"] = "Mi plan de carrera"
+    if not isinstance(plan.get("total_weeks"), int) or plan["total_weeks"] <= 0:
+        plan["total_weeks"] = sum(p["duration_weeks"] for p in phases if isinstance(p, dict)) or 24
+    return plan
+
+
+def find_problems(plan: Dict) -> List[Problem]:
+    """
+    Fases y campos que no cumplen el esquema (PlanPhaseContent). Si en una fase fallan
+    más de PLAN_REPAIR_MAX_FIELDS campos, o algo que no es un campo regenerable, se pide
+    la fase entera; las fases que faltan hasta PLAN_MIN_PHASES también.
+    """
+    problems: List[Problem] = []
+    phases = plan["phases"]
+    for index, phase in enumerate(phases):
+        if not isinstance(phase, dict):
+            problems.append((index, None))
+            continue
+        try:
+            PlanPhaseContent.model_validate(phase)
+        except ValidationError as e:
+            fields = sorted({str(error["loc"][0]) for error in e.errors()})
+            if set(fields) - set(REPAIRABLE_FIELDS) or len(fields) > settings.PLAN_REPAIR_MAX_FIELDS:
+                problems.append((index, None))
+            else:
+                problems.extend((index, field) for field in fields)
+    problems.extend((index, None) for index in range(len(phases), settings.PLAN_MIN_PHASES))
+    return problems
+
+
+def describe_problems(problems: List[Problem]) -> str:
+    return "; ".join(
+        f"fase {index + 1}: {field}" if field else f"fase {index + 1} completa"
+        for index, field in problems
+    )
+
+
+def phase_outline(plan: Dict) -> str:
+    """Títulos de las fases válidas, para dar contexto al regenerar una fase."""
+    return json.dumps(
+        [phase.get("title") for phase in plan["phases"] if isinstance(phase, dict)],
+        ensure_ascii=False,
+    )
+
+
+class PlanRepairStats:
+    """Contadores de validación/reparación de planes de este worker."""
+
+    def __init__(self):
+        self.stats = {
+            "validated": 0,
+            "valid": 0,
+            "repaired": 0,
+            "failed": 0,
+            "fields_repaired": 0,
+            "phases_repaired": 0,
+            "repair_tokens": 0,
+            "saved_tokens": 0,  # tokens de regenerar el plan entero - tokens de la reparación
+        }
+
+    def snapshot(self) -> Dict:
+        invalid = self.stats["validated"] - self.stats["valid"]
+        return {
+            **self.stats,
+            "repair_rate": round(self.stats["repaired"] / invalid, 3) if invalid else None,
+            "invalid_rate": round(invalid / self.stats["validated"], 3) if self.stats["validated"] else None,
+        }
+
+
+plan_repair_stats = PlanRepairStats()
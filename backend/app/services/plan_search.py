@@ -0,0 +1,301 @@
+"""
+Índice de búsqueda sobre los planes guardados (una fila de plan_search por plan).
+
+- Texto: tabla FTS5 `plan_search_fts` en SQLite (mantenida con triggers sobre plan_search)
+  o índice GIN sobre to_tsvector('spanish', text) en Postgres.
+- Similitud: vector de los intereses del plan (HashingVectorizer de semantic_cache) guardado en
+  la fila y cargado en una matriz NumPy por worker, que se pone al día con las filas
+  nuevas antes de cada búsqueda.
+
+La búsqueda híbrida combina los dos rankings con Reciprocal Rank Fusion; /ai/plans/search
+solo busca entre los planes del usuario. find_reference elige el plan guardado más parecido
+a un cuestionario, de cualquier usuario, para generar el nuevo adaptándolo
+(GroqService.generate_career_plan con `reference`) en vez de escribirlo desde cero: es la
+única búsqueda entre usuarios y su resultado solo va al LLM (contenido del plan, sin el
+objetivo ni el texto libre del usuario).
+
+Reindexar todos los planes (tras una importación masiva o al cambiar PLAN_SEARCH_DIM):
+    python -m app.services.plan_search --reindex
+"""
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config import settings
+from app.services.plan_storage import assemble_plan, load_full_plan
+
+logger = logging.getLogger(__name__)
+
+# Constante habitual de Reciprocal Rank Fusion: suaviza el peso de los primeros puestos
+RRF_K = 60
+
+retrieval_stats = {"lookups": 0, "hits": 0, "misses": 0, "adapted": 0, "fallbacks": 0, "adapt_tokens": 0}
+
+_vectorizer = None
+
+
+def _get_vectorizer():
+    # numpy solo se importa al indexar o buscar, no al arrancar el worker
+    global _vectorizer
+    if _vectorizer is None:
+        from app.services.semantic_cache import HashingVectorizer
+
+        _vectorizer = HashingVectorizer(settings.PLAN_SEARCH_DIM)
+    return _vectorizer
+
+
+def _document(plan_row, plan: Dict) -> str:
+    """Texto completo para FTS: cabecera, fases, proyectos y tecnologías."""
+    parts = [plan_row.title, plan_row.goal, plan_row.tech_stack]
+    for phase in plan.get("phases") or []:
+        parts += [phase.get("title"), phase.get("description")]
+        for project in phase.get("projects") or []:
+            if isinstance(project, dict):
+                parts += [project.get("title"), " ".join(project.get("technologies") or [])]
+    return "\n".join(str(part) for part in parts if part)
+
+
+def _profile(plan_row, plan: Dict) -> str:
+    """
+    Texto para el vector, comparable con answers_text: los intereses del cuestionario, que
+    son los que deciden el contenido de las fases (el objetivo y el plazo los ajusta la
+    adaptación). Los planes sin cuestionario (importados) usan las tecnologías de sus proyectos.
+    """
+    if plan_row.tech_stack:
+        return str(plan_row.tech_stack)
+    technologies = {
+        tech
+        for phase in plan.get("phases") or []
+        for project in phase.get("projects") or [] if isinstance(project, dict)
+        for tech in project.get("technologies") or []
+    }
+    return " ".join(sorted(map(str, technologies))) or plan_row.title
+
+
+def answers_text(answers: Dict) -> str:
+    interests = answers.get("interests") or []
+    if isinstance(interests, str):
+        interests = [interests]
+    return " ".join(map(str, interests))
+
+
+def search_row(plan_row, plan: Dict) -> Dict:
+    """Fila de plan_search para un plan (`plan_row`: CareerPlan o fila con sus columnas)."""
+    vector = _get_vectorizer().transform(_profile(plan_row, plan))
+    return {
+        "plan_id": plan_row.id,
+        "user_id": plan_row.user_id,
+        "level": plan_row.difficulty_level,
+        "total_weeks": plan.get("total_weeks") or plan_row.timeline_weeks,
+        "text": _document(plan_row, plan),
+        "vector": vector.tobytes(),
+    }
+
+
+def reindex_plans(conn: Connection, batch_size: int = 500) -> int:
+    """Reconstruye plan_search con todos los planes completados. Devuelve cuántos se indexaron."""
+    plans = models.CareerPlan.__table__
+    phases = models.PlanPhase.__table__
+    search = models.PlanSearchEntry.__table__
+    conn.execute(search.delete())
+    indexed = last_id = 0
+    while True:
+        batch = conn.execute(
+            select(plans.c.id, plans.c.user_id, plans.c.title, plans.c.tech_stack, plans.c.goal,
+                   plans.c.difficulty_level, plans.c.timeline_weeks, plans.c.generated_plan)
+            .where(plans.c.id > last_id, plans.c.status == "completed")
+            .order_by(plans.c.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+        rows_by_plan = defaultdict(list)
+        for row in conn.execute(
+            select(phases).where(phases.c.plan_id.in_([plan.id for plan in batch]))
+            .order_by(phases.c.plan_id, phases.c.position)
+        ):
+            rows_by_plan[row.plan_id].append(row)
+        entries = [
+            search_row(plan, assemble_plan(plan.generated_plan if isinstance(plan.generated_plan, dict) else {},
+                                           rows_by_plan[plan.id]))
+            for plan in batch if rows_by_plan[plan.id]
+        ]
+        if entries:
+            conn.execute(search.insert(), entries)
+        indexed += len(entries)
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("INSERT INTO plan_search_fts(plan_search_fts) VALUES ('rebuild')"))
+    return indexed
+
+
+class PlanVectorIndex:
+    """
+    Vectores de plan_search en una matriz NumPy (producto matriz-vector por búsqueda).
+    Cada worker tiene la suya. Los planes no se editan, pero las filas no llegan en
+    orden de id (un trabajo en segundo plano tiene id desde que se encola y se indexa al
+    terminar), así que en cada refresco se leen los plan_id del índice (solo la clave) y
+    se cargan los vectores de los que faltan y se quitan los de los planes borrados.
+    """
+
+    LOAD_BATCH = 500  # ids por consulta IN al cargar vectores
+
+    def __init__(self, dim: int = settings.PLAN_SEARCH_DIM):
+        self.dim = dim
+        self._known: Set[int] = set()  # plan_id ya leídos (también los de otra dimensión, descartados)
+        self._ids = self._user_ids = self._matrix = None
+        self._levels: List[Optional[str]] = []
+
+    @property
+    def size(self) -> int:
+        return len(self._levels)
+
+    async def refresh(self, db: AsyncSession) -> None:
+        import numpy as np
+
+        entry = models.PlanSearchEntry
+        stored = set((await db.execute(select(entry.plan_id))).scalars())
+        if self._matrix is None:
+            self._ids = np.zeros(0, dtype=np.int64)
+            self._user_ids = np.zeros(0, dtype=np.int64)
+            self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+        removed = self._known - stored
+        if removed:
+            keep = ~np.isin(self._ids, list(removed))
+            self._ids, self._user_ids, self._matrix = self._ids[keep], self._user_ids[keep], self._matrix[keep]
+            self._levels = [level for level, kept in zip(self._levels, keep) if kept]
+            self._known -= removed
+        missing = sorted(stored - self._known)
+        rows = []
+        for start in range(0, len(missing), self.LOAD_BATCH):
+            rows += (await db.execute(
+                select(entry.plan_id, entry.user_id, entry.level, entry.vector)
+                .where(entry.plan_id.in_(missing[start:start + self.LOAD_BATCH]))
+            )).all()
+        self._known.update(row.plan_id for row in rows)
+        # Vectores de otra dimensión (PLAN_SEARCH_DIM cambiado sin reindexar) no se pueden comparar
+        rows = [row for row in rows if len(row.vector) == self.dim * 4]
+        if not rows:
+            return
+        self._ids = np.concatenate([self._ids, np.array([row.plan_id for row in rows], dtype=np.int64)])
+        self._user_ids = np.concatenate([self._user_ids, np.array([row.user_id for row in rows], dtype=np.int64)])
+        vectors = np.frombuffer(b"".join(row.vector for row in rows), dtype=np.float32).reshape(len(rows), self.dim)
+        self._matrix = np.vstack([self._matrix, vectors])
+        self._levels += [row.level for row in rows]
+
+    def search(self, query, k: int, user_id: Optional[int] = None, level: Optional[str] = None) -> List[Tuple[int, float]]:
+        import numpy as np
+
+        if not self.size:
+            return []
+        scores = self._matrix @ query
+        if user_id is not None:
+            scores = np.where(self._user_ids == user_id, scores, -np.inf)
+        if level:
+            # Planes sin nivel guardado (importados) valen para cualquiera
+            allowed = np.array([stored in (None, level) for stored in self._levels])
+            scores = np.where(allowed, scores, -np.inf)
+        top = np.argsort(-scores)[:k]
+        return [(int(self._ids[i]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+vector_index = PlanVectorIndex()
+
+
+def _query_words(query: str) -> List[str]:
+    from app.services.semantic_cache import STOPWORDS, normalize_text
+
+    words = normalize_text(query).split()
+    return [word for word in words if word not in STOPWORDS] or words
+
+
+async def text_search(db: AsyncSession, query: str, k: int, user_id: Optional[int] = None) -> List[Tuple[int, float]]:
+    """Planes que contienen alguna de las palabras, por relevancia (bm25 / ts_rank)."""
+    words = _query_words(query)
+    if not words:
+        return []
+    owner = " AND s.user_id = :user_id" if user_id is not None else ""
+    if db.bind.dialect.name == "postgresql":
+        sql = (
+            "SELECT s.plan_id, ts_rank(to_tsvector('spanish', s.text), to_tsquery('spanish', :q)) AS score "
+            "FROM plan_search s WHERE to_tsvector('spanish', s.text) @@ to_tsquery('spanish', :q)"
+            f"{owner} ORDER BY score DESC LIMIT :k"
+        )
+        q = " | ".join(words)
+    else:
+        sql = (
+            "SELECT s.plan_id, -bm25(plan_search_fts) AS score FROM plan_search_fts "
+            "JOIN plan_search s ON s.plan_id = plan_search_fts.rowid "
+            f"WHERE plan_search_fts MATCH :q{owner} ORDER BY bm25(plan_search_fts) LIMIT :k"
+        )
+        q = " OR ".join(f'"{word}"' for word in words)
+    params = {"q": q, "k": k, **({"user_id": user_id} if user_id is not None else {})}
+    return [(row.plan_id, float(row.score)) for row in await db.execute(text(sql), params)]
+
+
+async def search_plans(
+    db: AsyncSession, query: str, limit: int = 10, user_id: Optional[int] = None, mode: str = "hybrid"
+) -> List[Tuple[int, float]]:
+    """(plan_id, puntuación) de los planes más relevantes. mode: "text" | "vector" | "hybrid"."""
+    ranked_lists = []
+    if mode in ("text", "hybrid"):
+        ranked_lists.append(await text_search(db, query, limit * 2, user_id))
+    if mode in ("vector", "hybrid"):
+        await vector_index.refresh(db)
+        ranked_lists.append(vector_index.search(_get_vectorizer().transform(query), limit * 2, user_id))
+    if len(ranked_lists) == 1:
+        return ranked_lists[0][:limit]
+    fused: Dict[int, float] = defaultdict(float)
+    for ranked in ranked_lists:
+        for rank, (plan_id, _) in enumerate(ranked):
+            fused[plan_id] += 1 / (RRF_K + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+async def find_reference(db: AsyncSession, answers: Dict) -> Optional[Dict]:
+    """Plan completo más parecido al cuestionario (mismo nivel) o None si ninguno llega al umbral."""
+    retrieval_stats["lookups"] += 1
+    await vector_index.refresh(db)
+    hits = vector_index.search(_get_vectorizer().transform(answers_text(answers)), 3, level=answers.get("level"))
+    for plan_id, score in hits:
+        if score < settings.PLAN_RETRIEVAL_MIN_SCORE:
+            break
+        career_plan = await db.get(models.CareerPlan, plan_id)
+        if career_plan is None:
+            continue  # borrado después del último refresco del índice
+        plan = await load_full_plan(db, career_plan)
+        retrieval_stats["hits"] += 1
+        logger.info("Plan de referencia %d (similitud %.2f)", career_plan.id, score)
+        return plan
+    retrieval_stats["misses"] += 1
+    return None
+
+
+def snapshot() -> Dict:
+    return {"enabled": settings.PLAN_RETRIEVAL_ENABLED, "indexed": vector_index.size, **retrieval_stats}
+
+
+async def _reindex() -> int:
+    from app.database import engine
+
+    async with engine.begin() as conn:
+        indexed = await conn.run_sync(reindex_plans)
+    await engine.dispose()
+    return indexed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Índice de búsqueda de planes")
+    parser.add_argument("--reindex", action="store_true", help="reconstruye plan_search con todos los planes")
+    args = parser.parse_args()
+    if args.reindex:
+        print(f"Planes indexados: {asyncio.run(_reindex())}")
+    else:
+        parser.print_help()
@@ -0,0 +1,148 @@
+"""
+Almacenamiento de planes generados partido en dos:
+- career_plans.generated_plan: solo la cabecera (plan_title, total_weeks...)
+- plan_phases: una fila por fase con título/duración/descripción en columnas
+  y el cuerpo pesado (learning_items, projects, resources) en JSON comprimido con zlib.
+
+Así los listados y las proyecciones leen solo lo que necesitan y el plan
+completo se reconstruye bajo demanda.
+"""
+import json
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+
+from app import models
+
+# Campos de la fase que van en columnas propias (el resto va comprimido en `content`)
+PHASE_COLUMNS = ("id", "title", "duration_weeks", "description")
+ZLIB_LEVEL = 6
+
+
+def compress_json(value) -> bytes:
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), ZLIB_LEVEL)
+
+
+def decompress_json(data: Optional[bytes]):
+    return json.loads(zlib.decompress(data)) if data else {}
+
+
+def _int_or_none(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def split_plan(plan: Dict) -> Tuple[Dict, List[Dict]]:
+    """Separa la cabecera del plan y las columnas de cada fase (kwargs de PlanPhase sin plan_id)."""
+    outline = {key: value for key, value in plan.items() if key != "phases"}
+    phases = []
+    for position, phase in enumerate(plan.get("phases") or [], start=1):
+        if not isinstance(phase, dict):
+            continue
+        phases.append({
+            "position": position,
+            "phase_id": _int_or_none(phase.get("id")),
+            "title": str(phase.get("title") or f"Fase {position}")[:500],
+            "duration_weeks": _int_or_none(phase.get("duration_weeks")),
+            "description": phase.get("description"),
+            "content": compress_json({k: v for k, v in phase.items() if k not in PHASE_COLUMNS}),
+        })
+    return outline, phases
+
+
+def phase_to_dict(row: models.PlanPhase, with_content: bool = True) -> Dict:
+    """Fase con la misma forma que devolvió el modelo (`id` es el id de la fase en el plan)."""
+    phase = {
+        "id": row.phase_id if row.phase_id is not None else row.position,
+        "title": row.title,
+        "duration_weeks": row.duration_weeks,
+        "description": row.description,
+    }
+    if with_content:
+        phase.update(decompress_json(row.content))
+    return phase
+
+
+def assemble_plan(outline: Optional[Dict], rows: Iterable[models.PlanPhase], with_content: bool = True) -> Dict:
+    plan = dict(outline or {})
+    plan["phases"] = [phase_to_dict(row, with_content) for row in rows]
+    return plan
+
+
+def store_plan(db: AsyncSession, career_plan: models.CareerPlan, plan: Dict) -> None:
+    """
+    Asigna la cabecera a `career_plan` y añade sus fases y su fila del índice de
+    búsqueda a la sesión. `career_plan` debe tener id (tras un flush); las fases
+    anteriores del plan no se tocan.
+    """
+    # Import diferido: plan_search importa este módulo
+    from app.services.plan_search import search_row
+
+    outline, phases = split_plan(plan)
+    career_plan.generated_plan = outline
+    for phase in phases:
+        db.add(models.PlanPhase(plan_id=career_plan.id, **phase))
+    if phases:
+        db.add(models.PlanSearchEntry(**search_row(career_plan, plan)))
+
+
+async def load_phases(
+    db: AsyncSession,
+    plan_id: int,
+    position: Optional[int] = None,
+    with_content: bool = True,
+) -> List[models.PlanPhase]:
+    query = select(models.PlanPhase).where(models.PlanPhase.plan_id == plan_id)
+    if position is not None:
+        query = query.where(models.PlanPhase.position == position)
+    if not with_content:
+        # Los blobs comprimidos no se leen si solo se piden columnas de la cabecera
+        query = query.options(defer(models.PlanPhase.content, raiseload=True))
+    return list((await db.execute(query.order_by(models.PlanPhase.position))).scalars())
+
+
+async def load_full_plan(db: AsyncSession, career_plan: models.CareerPlan) -> Dict:
+    return assemble_plan(career_plan.generated_plan, await load_phases(db, career_plan.id))
+
+
+def apply_field_mask(value, fields: Optional[List[str]]):
+    """
+    Proyección por máscara de campos con rutas separadas por puntos
+    (`plan_title,phases.title,phases.projects.title`). En las listas la ruta se
+    aplica a cada elemento. Sin máscara se devuelve el valor completo.
+    """
+    if not fields:
+        return value
+    tree: Dict = {}
+    for path in fields:
+        node = tree
+        for part in path.split("."):
+            node = node.setdefault(part, {})
+    return _project(value, tree)
+
+
+def _project(value, tree: Dict):
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: _project(value[key], sub) for key, sub in tree.items() if key in value}
+    return value
+
+
+def mask_needs_content(fields: Optional[List[str]], prefix: str = "phases.") -> bool:
+    """True si la máscara pide algún campo de las fases que vive en el blob comprimido."""
+    if not fields:
+        return True
+    for path in fields:
+        if path == prefix.rstrip("."):
+            return True
+        if path.startswith(prefix) and path[len(prefix):].split(".")[0] not in PHASE_COLUMNS:
+            return True
+    return False
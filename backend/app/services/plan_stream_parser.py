@@ -0,0 +1,125 @@
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Caracteres que cambian el estado del parser; el resto se salta sin mirar
+_SPECIAL = re.compile(r'[{}\[\],:"\\]')
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class PlanStreamParser:
+    """
+    Parser JSON incremental para la respuesta de generación de planes.
+
+    Se alimenta con los fragmentos de texto del modelo (`feed`) y devuelve cada
+    elemento de `phases[]` en cuanto se cierra, sin esperar al final del plan.
+    Ignora el texto previo al primer `{` (p. ej. ```json) y el posterior al cierre.
+    Si el texto termina cortado (max_tokens, desconexión), `finish` recupera el
+    plan cerrando las estructuras abiertas en el último valor completo.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.phases: List[Dict] = []
+        self.truncated = False
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._stack: List[str] = []
+        self._in_string = False
+        self._string_start = 0
+        self._skip_until = 0
+        self._last_string: Optional[str] = None
+        self._root_key: Optional[str] = None
+        self._phases_depth: Optional[int] = None
+        self._phase_start: Optional[int] = None
+        # Posiciones donde termina un valor completo + pila abierta en ese punto
+        self._checkpoints: List[Tuple[int, Tuple[str, ...]]] = []
+
+    @property
+    def done(self) -> bool:
+        return self._end is not None
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Añade texto y devuelve las fases que se han completado con él."""
+        self.text += chunk
+        completed = []
+        if self.done:
+            return completed
+        if self._start is None:
+            start = self.text.find("{", self._pos)
+            if start == -1:
+                self._pos = len(self.text)
+                return completed
+            self._start = start
+            self._pos = start
+
+        for match in _SPECIAL.finditer(self.text, self._pos):
+            i = match.start()
+            if i < self._skip_until:
+                continue
+            c = match.group()
+            if self._in_string:
+                if c == "\\":
+                    self._skip_until = i + 2
+                elif c == '"':
+                    self._in_string = False
+                    self._last_string = self.text[self._string_start + 1:i]
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ":":
+                if len(self._stack) == 1:
+                    self._root_key = self._last_string
+            elif c == ",":
+                self._checkpoints.append((i, tuple(self._stack)))
+            elif c in "{[":
+                if c == "[" and len(self._stack) == 1 and self._root_key == "phases":
+                    self._phases_depth = 2
+                elif c == "{" and self._phases_depth is not None and len(self._stack) == self._phases_depth:
+                    self._phase_start = i
+                self._stack.append(c)
+                self._checkpoints.append((i + 1, tuple(self._stack)))
+            elif c in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                depth = len(self._stack)
+                if c == "}" and self._phase_start is not None and depth == self._phases_depth:
+                    phase = json.loads(self.text[self._phase_start:i + 1])
+                    self._phase_start = None
+                    self.phases.append(phase)
+                    completed.append(phase)
+                elif c == "]" and self._phases_depth is not None and depth == self._phases_depth - 1:
+                    self._phases_depth = None
+                if not self._stack:
+                    self._end = i + 1
+                    break
+                self._checkpoints.append((i + 1, tuple(self._stack)))
+
+        self._pos = len(self.text) if self._end is None else self._end
+        return completed
+
+    def finish(self) -> Dict:
+        """
+        Devuelve el plan completo. Si el JSON quedó cortado, lo repara cerrando
+        las estructuras abiertas y marca `truncated`. Lanza json.JSONDecodeError
+        si no hay ningún prefijo recuperable.
+        """
+        if self._start is None:
+            raise json.JSONDecodeError("No se encontró ningún objeto JSON", self.text, 0)
+        if self.done:
+            return json.loads(self.text[self._start:self._end])
+
+        for pos, stack in reversed(self._checkpoints):
+            candidate = self.text[self._start:pos].rstrip().rstrip(",")
+            candidate += "".join(_CLOSERS[opener] for opener in reversed(stack))
+            try:
+                plan = json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+            self.truncated = True
+            return plan
+        raise json.JSONDecodeError("JSON incompleto sin prefijo recuperable", self.text, len(self.text))
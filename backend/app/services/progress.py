@@ -0,0 +1,278 @@
+"""
+Progreso del usuario en sus planes: fases y proyectos completados (user_phase_progress,
+user_project_progress, como en supabase-setup.sql) y un resumen por plan (plan_progress).
+
+Los contadores del resumen se actualizan en la misma transacción que cada cambio de
+estado, con UPDATE condicionales: solo cuenta la escritura que cambia `completed`, así
+que repetir una petición o dos peticiones concurrentes no descuadran los totales. El
+contexto del chat lee el resumen junto al plan activo en una sola consulta por clave.
+
+Comprobar (y con --repair corregir) los resúmenes contra las filas de detalle:
+    python -m app.services.progress [--repair]
+"""
+import argparse
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.services.plan_storage import decompress_json, load_phases
+
+
+def progress_percentage(summary: models.PlanProgress) -> int:
+    """Media del % de fases y del % de proyectos completados (igual que calculateProgress del frontend)."""
+    phases = summary.completed_phases / summary.total_phases * 100 if summary.total_phases else 0
+    projects = summary.completed_projects / summary.total_projects * 100 if summary.total_projects else 0
+    return round((phases + projects) / 2)
+
+
+def progress_context(plan_title: Optional[str], summary: Optional[models.PlanProgress]) -> Dict:
+    """user_context del chat a partir del plan activo y su resumen de progreso."""
+    if summary is None:
+        current_phase = "Fase 1"
+    elif summary.current_phase is None:
+        current_phase = "Plan completado"
+    else:
+        current_phase = summary.current_phase_title or f"Fase {summary.current_phase}"
+    return {
+        "plan_title": plan_title or "Sin plan aún",
+        "current_phase": current_phase,
+        "progress_percentage": progress_percentage(summary) if summary else 0,
+        "completed_projects": summary.completed_projects if summary else 0,
+    }
+
+
+async def load_progress_context(db: AsyncSession, user_id: int) -> Dict:
+    """Plan activo y su resumen de progreso en una consulta (búsqueda por índice y por clave primaria)."""
+    row = (await db.execute(
+        select(models.CareerPlan.title, models.PlanProgress)
+        .outerjoin(models.PlanProgress, models.PlanProgress.plan_id == models.CareerPlan.id)
+        .where(models.CareerPlan.user_id == user_id, models.CareerPlan.is_active == True)
+        .limit(1)
+    )).first()
+    return progress_context(row.title if row else None, row.PlanProgress if row else None)
+
+
+async def ensure_summary(db: AsyncSession, plan_id: int, user_id: int) -> models.PlanProgress:
+    """
+    Resumen del plan; la primera vez se crea con los totales del plan (se descomprimen
+    las fases una sola vez para contar los proyectos).
+    """
+    summary = await db.get(models.PlanProgress, plan_id)
+    if summary is not None:
+        return summary
+    phases = await load_phases(db, plan_id)
+    summary = models.PlanProgress(
+        plan_id=plan_id,
+        user_id=user_id,
+        total_phases=len(phases),
+        completed_phases=0,
+        total_projects=sum(len(decompress_json(phase.content).get("projects") or []) for phase in phases),
+        completed_projects=0,
+        current_phase=phases[0].position if phases else None,
+        current_phase_title=phases[0].title if phases else None,
+    )
+    db.add(summary)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Otra petición concurrente lo creó primero
+        await db.rollback()
+        summary = await db.get(models.PlanProgress, plan_id)
+    return summary
+
+
+async def _ensure_row(db: AsyncSession, model, **keys) -> None:
+    """Crea la fila de detalle (sin completar) si no existe, para que el cambio de estado sea un UPDATE."""
+    where = [getattr(model, column) == value for column, value in keys.items() if column != "user_id"]
+    if (await db.execute(select(model.id).where(*where))).first() is not None:
+        return
+    db.add(model(completed=False, **keys))
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+
+
+async def _set_completed(db: AsyncSession, model, where: List, completed: bool, **extra) -> bool:
+    """Cambia `completed` solo si es distinto; True si esta escritura lo ha cambiado."""
+    values = {"completed": completed, "completed_at": datetime.now(timezone.utc) if completed else None}
+    result = await db.execute(
+        update(model).where(*where, model.completed != completed).values(**values, **extra)
+    )
+    if result.rowcount == 0 and extra:
+        await db.execute(update(model).where(*where).values(**extra))
+    return result.rowcount > 0
+
+
+async def _refresh_current_phase(db: AsyncSession, plan_id: int) -> None:
+    """Primera fase sin completar (pocas filas: las fases de un solo plan)."""
+    completed = set((await db.execute(
+        select(models.PhaseProgress.position).where(
+            models.PhaseProgress.plan_id == plan_id, models.PhaseProgress.completed == True
+        )
+    )).scalars())
+    current = next((row for row in await load_phases(db, plan_id, with_content=False)
+                    if row.position not in completed), None)
+    await db.execute(
+        update(models.PlanProgress).where(models.PlanProgress.plan_id == plan_id).values(
+            current_phase=current.position if current else None,
+            current_phase_title=current.title if current else None,
+        )
+    )
+
+
+async def set_phase_completed(
+    db: AsyncSession, user_id: int, plan_id: int, position: int, completed: bool
+) -> models.PlanProgress:
+    summary = await ensure_summary(db, plan_id, user_id)
+    await _ensure_row(db, models.PhaseProgress, user_id=user_id, plan_id=plan_id, position=position)
+    changed = await _set_completed(db, models.PhaseProgress, [
+        models.PhaseProgress.plan_id == plan_id, models.PhaseProgress.position == position
+    ], completed)
+    if changed:
+        # Primero el contador (bloquea la fila del resumen en Postgres) y luego la fase actual
+        await db.execute(
+            update(models.PlanProgress).where(models.PlanProgress.plan_id == plan_id).values(
+                completed_phases=models.PlanProgress.completed_phases + (1 if completed else -1)
+            )
+        )
+        await _refresh_current_phase(db, plan_id)
+    await db.commit()
+    await db.refresh(summary)
+    return summary
+
+
+async def set_project_progress(
+    db: AsyncSession,
+    user_id: int,
+    plan_id: int,
+    position: int,
+    project_index: int,
+    completed: bool,
+    github_url: Optional[str] = None,
+    notes: Optional[str] = None,
+) -> models.PlanProgress:
+    summary = await ensure_summary(db, plan_id, user_id)
+    await _ensure_row(db, models.ProjectProgress, user_id=user_id, plan_id=plan_id,
+                      position=position, project_index=project_index)
+    extra = {key: value for key, value in (("github_url", github_url), ("notes", notes)) if value is not None}
+    changed = await _set_completed(db, models.ProjectProgress, [
+        models.ProjectProgress.plan_id == plan_id,
+        models.ProjectProgress.position == position,
+        models.ProjectProgress.project_index == project_index,
+    ], completed, **extra)
+    if changed:
+        await db.execute(
+            update(models.PlanProgress).where(models.PlanProgress.plan_id == plan_id).values(
+                completed_projects=models.PlanProgress.completed_projects + (1 if completed else -1)
+            )
+        )
+    await db.commit()
+    await db.refresh(summary)
+    return summary
+
+
+async def load_progress_detail(db: AsyncSession, plan_id: int) -> Dict:
+    """Fases y proyectos completados del plan (pantalla de progreso, no el chat)."""
+    phases = (await db.execute(
+        select(models.PhaseProgress.position)
+        .where(models.PhaseProgress.plan_id == plan_id, models.PhaseProgress.completed == True)
+        .order_by(models.PhaseProgress.position)
+    )).scalars().all()
+    projects = (await db.execute(
+        select(models.ProjectProgress)
+        .where(models.ProjectProgress.plan_id == plan_id)
+        .order_by(models.ProjectProgress.position, models.ProjectProgress.project_index)
+    )).scalars().all()
+    return {"completed_phases": list(phases), "projects": projects}
+
+
+async def check_progress(db: AsyncSession, repair: bool = False) -> Dict:
+    """
+    Recalcula los resúmenes desde las filas de detalle y devuelve los planes que no
+    cuadran. total_projects no se comprueba: fijarlo exige descomprimir todas las fases
+    y no cambia tras crear el resumen. Con repair=True corrige los descuadres y crea los
+    resúmenes que falten.
+    """
+    def counts(model):
+        return select(model.plan_id, func.count()).where(model.completed == True).group_by(model.plan_id)
+
+    phases_done = dict((await db.execute(counts(models.PhaseProgress))).all())
+    projects_done = dict((await db.execute(counts(models.ProjectProgress))).all())
+    total_phases = dict((await db.execute(
+        select(models.PlanPhase.plan_id, func.count()).group_by(models.PlanPhase.plan_id)
+    )).all())
+    # Primera fase sin completar de cada plan (los planes terminados no aparecen)
+    done = models.PhaseProgress
+    current = dict((await db.execute(
+        select(models.PlanPhase.plan_id, func.min(models.PlanPhase.position))
+        .outerjoin(done, and_(done.plan_id == models.PlanPhase.plan_id, done.position == models.PlanPhase.position,
+                              done.completed == True))
+        .where(done.id.is_(None))
+        .group_by(models.PlanPhase.plan_id)
+    )).all())
+
+    summaries = {row.plan_id: row for row in (await db.execute(select(models.PlanProgress))).scalars()}
+    mismatched = []
+    for plan_id, summary in summaries.items():
+        expected = {
+            "total_phases": total_phases.get(plan_id, 0),
+            "completed_phases": phases_done.get(plan_id, 0),
+            "completed_projects": projects_done.get(plan_id, 0),
+            "current_phase": current.get(plan_id),
+        }
+        if any(getattr(summary, key) != value for key, value in expected.items()):
+            mismatched.append(plan_id)
+            if repair:
+                for key, value in expected.items():
+                    setattr(summary, key, value)
+    if repair:
+        for plan_id in mismatched:
+            summary = summaries[plan_id]
+            if summary.current_phase is None:
+                summary.current_phase_title = None
+            else:
+                summary.current_phase_title = (await db.execute(
+                    select(models.PlanPhase.title).where(
+                        models.PlanPhase.plan_id == plan_id, models.PlanPhase.position == summary.current_phase
+                    )
+                )).scalar_one_or_none()
+
+    tracked = set()
+    for model in (models.PhaseProgress, models.ProjectProgress):
+        tracked.update((await db.execute(select(model.plan_id).distinct())).scalars())
+    missing = sorted(tracked - set(summaries))
+    if repair:
+        await db.commit()
+        owners = dict((await db.execute(
+            select(models.CareerPlan.id, models.CareerPlan.user_id).where(models.CareerPlan.id.in_(missing))
+        )).all()) if missing else {}
+        for plan_id in missing:
+            await ensure_summary(db, plan_id, owners[plan_id])
+        if missing:
+            # Los resúmenes nuevos empiezan a cero: una segunda pasada les pone los contadores
+            await check_progress(db, repair=True)
+    return {"checked": len(summaries), "mismatched": mismatched, "missing": missing, "repaired": repair}
+
+
+async def _main(repair: bool) -> Dict:
+    from app.database import SessionLocal, engine
+
+    async with SessionLocal() as db:
+        report = await check_progress(db, repair=repair)
+    await engine.dispose()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comprueba los resúmenes de progreso contra las filas de detalle")
+    parser.add_argument("--repair", action="store_true", help="corrige los resúmenes descuadrados o que falten")
+    args = parser.parse_args()
+    report = asyncio.run(_main(args.repair))
+    print(json.dumps({**report, "mismatched": len(report["mismatched"]), "missing": len(report["missing"])}))
@@ -0,0 +1,103 @@
+import hashlib
+import re
+import string
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+# Subir al cambiar la estructura de las plantillas; el contenido ya entra en la versión por su hash
+PROMPTS_VERSION = "2"
+PROMPTS_DIR = Path(__file__).resolve().parent.parent / "prompts"
+
+# Cabecera de sección en los ficheros: [[system]] o [[user]]
+_SECTION = re.compile(r"^\[\[(system|user)\]\]\s*$", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class _Section:
+    role: str
+    text: str
+    template: Optional[string.Template]  # None = texto fijo
+    fields: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    Plantilla compilada: secciones fijas seguidas de secciones con variables ($nombre).
+    Las secciones consecutivas del mismo rol forman un único mensaje, así que el
+    texto fijo queda siempre al principio (prefijo estable para la caché de prompts
+    del proveedor) y los datos del usuario al final.
+    """
+    name: str
+    version: str
+    sections: Tuple[_Section, ...]
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return tuple(field for section in self.sections for field in section.fields)
+
+    def render(self, **values) -> List[Dict]:
+        missing = set(self.fields) - set(values)
+        if missing:
+            raise KeyError(f"Faltan variables para el prompt {self.name}: {', '.join(sorted(missing))}")
+        messages: List[Dict] = []
+        for section in self.sections:
+            text = section.template.substitute(values) if section.template else section.text
+            if messages and messages[-1]["role"] == section.role:
+                messages[-1]["content"] += "\n\n" + text
+            else:
+                messages.append({"role": section.role, "content": text})
+        return messages
+
+
+def _fields(template: string.Template) -> Tuple[str, ...]:
+    return tuple(
+        match.group("named") or match.group("braced")
+        for match in template.pattern.finditer(template.template)
+        if match.group("named") or match.group("braced")
+    )
+
+
+def compile_template(name: str, source: str, mode: str) -> PromptTemplate:
+    """Parte el fichero en secciones y comprueba que ninguna sección fija va detrás de una con variables."""
+    parts = _SECTION.split(source)
+    if parts[0].strip():
+        raise ValueError(f"Prompt {name}: texto antes de la primera sección [[system]]/[[user]]")
+    sections = []
+    for role, text in zip(parts[1::2], parts[2::2]):
+        text = text.strip()
+        template = string.Template(text)
+        fields = _fields(template)
+        if not fields and sections and sections[-1].fields:
+            raise ValueError(f"Prompt {name}: sección fija detrás de una con variables (rompe el prefijo estable)")
+        sections.append(_Section(role=role, text=text, template=template if fields else None, fields=fields))
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:8]
+    return PromptTemplate(name=name, version=f"{PROMPTS_VERSION}-{mode}-{digest}", sections=tuple(sections))
+
+
+class PromptLibrary:
+    """Plantillas de app/prompts/<modo>/*.txt, leídas y compiladas una sola vez por worker."""
+
+    def __init__(self, mode: str = settings.PROMPT_MODE, directory: Path = PROMPTS_DIR):
+        if not (directory / mode).is_dir():
+            raise ValueError(f"PROMPT_MODE desconocido: {mode}")
+        self.mode = mode
+        self.templates: Dict[str, PromptTemplate] = {
+            path.stem: compile_template(path.stem, path.read_text(encoding="utf-8"), mode)
+            for path in sorted((directory / mode).glob("*.txt"))
+        }
+
+    def __getitem__(self, name: str) -> PromptTemplate:
+        return self.templates[name]
+
+    def render(self, name: str, **values) -> List[Dict]:
+        return self.templates[name].render(**values)
+
+
+prompts = PromptLibrary()
+
+# Forma parte de la clave de la caché de planes: cambia con el modo y con cualquier edición de la plantilla
+PLAN_PROMPT_VERSION = prompts["plan"].version
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+from app.config import settings
+
+
+class TokenBucket:
+    """
+    Cubo de fichas con recarga continua (`rate_per_minute` fichas por minuto, como los
+    límites de Groq). `acquire` espera en orden de llegada hasta que hay fichas.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.max_rate = rate_per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """Consume `amount` fichas (como mucho la capacidad). Devuelve los segundos esperados."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+    def scale_rate(self, factor: float, floor: float = 0.1) -> None:
+        """Ajusta la recarga entre floor * max_rate y max_rate (control adaptativo)."""
+        self._refill()
+        self.rate = min(self.max_rate, max(self.max_rate * floor, self.rate * factor))
+
+    def refund(self, amount: float) -> None:
+        """Devuelve fichas reservadas de más (p. ej. max_tokens frente a los tokens usados)."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class GroqRateLimiter:
+    """
+    Límites por minuto de la API key (peticiones y tokens), compartidos por todas las
+    llamadas del worker. Cada llamada reserva tokens de prompt estimados + max_tokens
+    y al terminar devuelve la diferencia con el `usage` real.
+    Con un límite a 0 ese cubo no se aplica.
+
+    Es adaptativo: un 429 pausa todas las llamadas durante el retry-after y reduce a
+    la mitad la recarga de los cubos; cada éxito la recupera poco a poco (AIMD).
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = settings.GROQ_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = settings.GROQ_TOKENS_PER_MINUTE,
+    ):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._paused_until = 0.0
+        self.stats = {
+            "acquired": 0, "throttled": 0, "wait_seconds": 0.0,
+            "tokens_reserved": 0, "tokens_refunded": 0, "rate_limited": 0,
+        }
+
+    def _buckets(self):
+        return [bucket for bucket in (self.requests, self.tokens) if bucket is not None]
+
+    async def reserve(self, tokens: int) -> int:
+        waited = 0.0
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+            waited += pause
+        if self.requests is not None:
+            waited += await self.requests.acquire(1)
+        if self.tokens is not None:
+            waited += await self.tokens.acquire(tokens)
+        self.stats["acquired"] += 1
+        self.stats["tokens_reserved"] += tokens
+        if waited > 0:
+            self.stats["throttled"] += 1
+            self.stats["wait_seconds"] += waited
+        return tokens
+
+    def settle(self, reserved: int, used: Optional[int]) -> None:
+        if self.tokens is None or not used or used >= reserved:
+            return
+        self.tokens.refund(reserved - used)
+        self.stats["tokens_refunded"] += reserved - used
+
+    def penalize(self, retry_after: Optional[float]) -> None:
+        """Groq ha devuelto 429: pausar y reducir el ritmo."""
+        self.stats["rate_limited"] += 1
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        for bucket in self._buckets():
+            bucket.scale_rate(0.5)
+
+    def reward(self) -> None:
+        for bucket in self._buckets():
+            if bucket.rate < bucket.max_rate:
+                bucket.scale_rate(1.05)
+
+    def snapshot(self) -> Dict:
+        return {
+            **self.stats,
+            "wait_seconds": round(self.stats["wait_seconds"], 3),
+            "requests_per_minute": settings.GROQ_REQUESTS_PER_MINUTE or None,
+            "tokens_per_minute": settings.GROQ_TOKENS_PER_MINUTE or None,
+            "requests_available": int(self.requests.tokens) if self.requests else None,
+            "tokens_available": int(self.tokens.tokens) if self.tokens else None,
+            "rate_factor": round(min((b.rate / b.max_rate for b in self._buckets()), default=1.0), 3),
+        }
+
+
+# Un único limitador por worker: los límites son de la API key, no de cada servicio
+groq_rate_limiter = GroqRateLimiter()
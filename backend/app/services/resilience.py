@@ -0,0 +1,180 @@
+import asyncio
+import random
+import time
+from typing import Dict, Optional
+
+from app.config import settings
+
+
+class LLMUnavailableError(Exception):
+    """Groq no está disponible (circuito abierto o reintentos agotados). Las rutas responden 503."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_retryable(error: Exception) -> bool:
+    # El SDK se importa aquí para no cargarlo al arrancar: solo hace falta tras un fallo
+    import groq
+
+    # Fallos transitorios del proveedor: se reintentan y cuentan para el circuito
+    if isinstance(error, (groq.RateLimitError, groq.InternalServerError, groq.APIConnectionError, groq.APITimeoutError)):
+        return True
+    # 408 / 409 también son transitorios según la API
+    return isinstance(error, groq.APIStatusError) and error.status_code in (408, 409)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Lee retry-after-ms / retry-after (en segundos) de la respuesta de error, si la hay."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = response.headers.get(header)
+        if value:
+            try:
+                return max(0.0, float(value) * scale)
+            except ValueError:
+                continue  # formato fecha HTTP: se usa el backoff normal
+    return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Backoff exponencial con jitter completo; si el servidor indica retry-after, se respeta como mínimo."""
+    ceiling = min(settings.GROQ_RETRY_MAX_DELAY_SECONDS, settings.GROQ_RETRY_BASE_DELAY_SECONDS * (2 ** attempt))
+    delay = random.uniform(0, ceiling)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, settings.GROQ_RETRY_MAX_DELAY_SECONDS))
+    return delay
+
+
+class CircuitBreaker:
+    """
+    closed -> open tras `failure_threshold` fallos transitorios seguidos; en open las
+    llamadas fallan al momento durante `reset_timeout` segundos. Después pasa a
+    half-open y deja salir `half_open_max_calls` sondas: un éxito lo cierra y un
+    fallo lo vuelve a abrir. Una sonda que termina sin éxito ni fallo (cancelada o con
+    un error inesperado) cuenta como fallo al liberarse (`end_probe`), y si las sondas no
+    informan en `reset_timeout` segundos se abre otra ronda.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = settings.GROQ_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = settings.GROQ_CIRCUIT_RESET_SECONDS,
+        half_open_max_calls: int = settings.GROQ_CIRCUIT_HALF_OPEN_CALLS,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.half_opened_at = 0.0
+        self._probes = 0
+        self._round = 0  # ronda de half-open: una sonda de una ronda anterior no afecta a la actual
+        self.stats = {"opened": 0, "rejected": 0, "probes": 0, "abandoned_probes": 0}
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def _half_open(self) -> None:
+        self.state = "half_open"
+        self.half_opened_at = time.monotonic()
+        self._probes = 0
+        self._round += 1
+
+    def before_call(self) -> Optional[int]:
+        """
+        Lanza LLMUnavailableError si el circuito no deja pasar la llamada. Si la llamada
+        es una sonda devuelve su ronda, que hay que pasar a `end_probe` al terminar.
+        """
+        if self.failure_threshold <= 0:
+            return None
+        if self.state == "open":
+            if self.retry_after() > 0:
+                self.stats["rejected"] += 1
+                raise LLMUnavailableError("Groq no disponible (circuito abierto)", self.retry_after())
+            self._half_open()
+        if self.state == "half_open":
+            if self._probes >= self.half_open_max_calls:
+                if time.monotonic() - self.half_opened_at < self.reset_timeout:
+                    self.stats["rejected"] += 1
+                    raise LLMUnavailableError("Groq no disponible (probando recuperación)", self.reset_timeout)
+                # Las sondas de esta ronda no han informado: se deja salir otra tanda
+                self._half_open()
+            self._probes += 1
+            self.stats["probes"] += 1
+            return self._round
+        return None
+
+    def end_probe(self, probe_round: int) -> None:
+        """Libera una sonda: si el circuito sigue en half-open sin que haya informado, cuenta como fallo."""
+        if self.state == "half_open" and probe_round == self._round:
+            self.stats["abandoned_probes"] += 1
+            self.record_failure()
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.stats["opened"] += 1
+
+    def snapshot(self) -> Dict:
+        return {
+            **self.stats,
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_after": round(self.retry_after(), 2) if self.state == "open" else 0,
+        }
+
+
+class Hedger:
+    """Segunda petición idéntica si la primera no ha respondido en `delay` segundos; gana la primera que acabe bien."""
+
+    def __init__(self, delay: float = settings.GROQ_HEDGE_DELAY_SECONDS):
+        self.delay = delay
+        self.stats = {"hedged": 0, "hedge_wins": 0}
+
+    async def run(self, make_call):
+        first = asyncio.ensure_future(make_call())
+        if self.delay <= 0:
+            return await first
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.delay)
+            if not done:
+                self.stats["hedged"] += 1
+                tasks.append(asyncio.ensure_future(make_call()))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+# Estado compartido por todas las instancias de GroqService del worker.
+# Un circuito por modelo: si cae uno, el router puede seguir con la alternativa
+circuit_breakers: Dict[str, CircuitBreaker] = {}
+chat_hedger = Hedger()
+
+
+def circuit_breaker(model: str) -> CircuitBreaker:
+    if model not in circuit_breakers:
+        circuit_breakers[model] = CircuitBreaker()
+    return circuit_breakers[model]
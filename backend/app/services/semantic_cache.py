@@ -0,0 +1,191 @@
+import hashlib
+import re
+import time
+import unicodedata
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.config import settings
+
+_NON_WORD = re.compile(r"[^a-z0-9ñ ]+")
+
+# Palabras vacías frecuentes en preguntas: no aportan al significado
+STOPWORDS = frozenset(
+    "a al como con cual cuales de del el en entre es esta este exactamente la las lo los me mi mis "
+    "para pero por puedo que se sirve son su sus te tu un una uno y o explicas explica explicame "
+    "quiero saber significa debo deberia hago hacer".split()
+)
+
+# Palabras que remiten a la conversación ("¿y eso cómo se usa?", "explícame lo anterior"):
+# la pregunta no se entiende sin el historial
+FOLLOW_UP_WORDS = frozenset(
+    "eso esto ese esa esos esas aquello aquel anterior antes dijiste comentaste mencionaste "
+    "entonces tambien ahi alli arriba siguiente ultimo ultima".split()
+)
+# Palabras sobre el estado del propio usuario ("¿cómo voy con mi plan?"): la respuesta
+# depende de su progreso, no se comparte
+PERSONAL_WORDS = frozenset(
+    "voy llevo falta faltan progreso avance plan fase hoy semana horas dedico tengo estoy".split()
+)
+# Conectores con los que empieza una pregunta de seguimiento ("y en Java?", "pero si...")
+FOLLOW_UP_STARTS = frozenset("y pero o entonces vale ok".split())
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sin tildes (salvo la ñ), sin signos de puntuación y espacios colapsados."""
+    text = text.lower().replace("ñ", "\0")
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).replace("\0", "ñ")
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+class HashingVectorizer:
+    """
+    Vectoriza texto con n-gramas de caracteres (y palabras) hasheados en un
+    espacio fijo, sin modelo ni entrenamiento: solo CPU y NumPy. Los vectores
+    salen normalizados (L2), así que el producto escalar es la similitud coseno.
+    """
+
+    def __init__(self, dim: int = 1024, ngram_sizes=(3, 4, 5)):
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+
+    def _features(self, text: str) -> List[str]:
+        words = [w for w in text.split() if w not in STOPWORDS] or text.split()
+        features = [f"w:{w}" for w in words]
+        # n-gramas dentro de cada palabra: toleran plurales, conjugaciones y erratas
+        for word in words:
+            padded = f" {word} "
+            for n in self.ngram_sizes:
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def transform(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(normalize_text(text)):
+            h = zlib.crc32(feature.encode("utf-8"))
+            # El bit alto decide el signo para que las colisiones se compensen
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SemanticCache:
+    """
+    Caché de respuestas del chat por similitud semántica.
+
+    Guarda (vector de la pregunta, contexto, respuesta) en una matriz NumPy de
+    capacidad fija (las entradas más antiguas se sobrescriben). Una búsqueda es
+    un producto matriz-vector; devuelve la respuesta más parecida si supera el
+    umbral y pertenece al mismo contexto.
+
+    Las preguntas autocontenidas (tipo FAQ) se comparten entre usuarios con el mismo
+    plan y fase; las preguntas sobre el propio progreso solo se sirven al mismo
+    usuario; las de seguimiento no se cachean (ver scope).
+    """
+
+    def __init__(
+        self,
+        threshold: float = settings.SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = settings.SEMANTIC_CACHE_TTL_SECONDS,
+        dim: int = settings.SEMANTIC_CACHE_DIM,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.vectorizer = HashingVectorizer(dim)
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._contexts = np.full(max_entries, -1, dtype=np.int64)
+        self._expires = np.zeros(max_entries, dtype=np.float64)
+        self._answers: List[Optional[str]] = [None] * max_entries
+        self._next = 0
+        self._size = 0
+        self.stats = {"hits": 0, "hits_shared": 0, "hits_user": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def context_key(user_context: Dict, user_id: Optional[int] = None) -> int:
+        """
+        Huella del contexto que cambia la respuesta: plan y fase actual y, para las
+        entradas de un solo usuario, su id y el resto de su contexto (progreso, proyectos).
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(f"{user_context.get('plan_title', '')}|{user_context.get('current_phase', '')}".encode("utf-8"))
+        if user_id is not None:
+            digest.update(f"\0u{user_id}".encode("utf-8"))
+            for key in sorted(user_context):
+                digest.update(f"\0{key}={user_context[key]}".encode("utf-8"))
+        return int.from_bytes(digest.digest(), "big", signed=True)
+
+    def is_cacheable(self, message: str) -> bool:
+        # Mensajes muy cortos ("¿y eso?") dependen del historial, no se cachean
+        return len(normalize_text(message)) >= settings.SEMANTIC_CACHE_MIN_CHARS
+
+    def scope(self, message: str) -> Optional[str]:
+        """
+        Ámbito de la respuesta en la caché:
+        - "shared": pregunta autocontenida (tipo FAQ); se responde solo con el plan y la
+          fase y sirve a cualquier usuario del mismo plan y fase.
+        - "user": pregunta sobre el propio progreso ("¿cómo voy con mi plan?"); solo para
+          el mismo usuario con el mismo contexto.
+        - None: no se cachea (mensajes cortos y preguntas de seguimiento, que dependen
+          de la conversación).
+        """
+        if not self.is_cacheable(message):
+            return None
+        words = normalize_text(message).split()
+        if words[0] in FOLLOW_UP_STARTS or not FOLLOW_UP_WORDS.isdisjoint(words):
+            return None
+        return "shared" if PERSONAL_WORDS.isdisjoint(words) else "user"
+
+    def is_shared(self, message: str) -> bool:
+        return self.scope(message) == "shared"
+
+    def _key(self, message: str, user_context: Dict, user_id: Optional[int]) -> Optional[int]:
+        """Contexto de la entrada, o None si el mensaje no se cachea."""
+        scope = self.scope(message)
+        if scope == "shared":
+            return self.context_key(user_context)
+        if scope == "user" and user_id is not None:
+            return self.context_key(user_context, user_id)
+        return None
+
+    def lookup(self, message: str, user_context: Dict, user_id: Optional[int] = None) -> Optional[str]:
+        context = self._key(message, user_context, user_id) if self._size else None
+        if context is None:
+            self.stats["misses"] += 1
+            return None
+        query = self.vectorizer.transform(message)
+        scores = self._vectors[:self._size] @ query
+        valid = (self._contexts[:self._size] == context) & (self._expires[:self._size] > time.time())
+        scores = np.where(valid, scores, -1.0)
+        best = int(np.argmax(scores))
+        if scores[best] >= self.threshold:
+            self.stats["hits"] += 1
+            self.stats["hits_shared" if context == self.context_key(user_context) else "hits_user"] += 1
+            return self._answers[best]
+        self.stats["misses"] += 1
+        return None
+
+    def store(self, message: str, user_context: Dict, answer: str, user_id: Optional[int] = None):
+        context = self._key(message, user_context, user_id)
+        if context is None:
+            return
+        slot = self._next
+        self._vectors[slot] = self.vectorizer.transform(message)
+        self._contexts[slot] = context
+        self._expires[slot] = time.time() + self.ttl_seconds
+        self._answers[slot] = answer
+        self._next = (slot + 1) % self.max_entries
+        self._size = min(self._size + 1, self.max_entries)
+        self.stats["stores"] += 1
+
+    def snapshot(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": self._size,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1 @@
+# Benchmarks y pruebas de carga (no se ejecutan en producción)
@@ -0,0 +1,69 @@
+"""
+Coste de get_current_user con un JWT válido: caché token -> usuario frente a
+verificar la firma y consultar el usuario en cada petición.
+
+Llama a la dependencia directamente (sin HTTP) contra una base SQLite temporal.
+
+Uso (desde backend/):
+    python -m benchmarks.auth_cache --iterations 5000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.common import percentile
+
+
+async def _measure(get_current_user, credentials, iterations, before_each):
+    from app.database import SessionLocal
+
+    latencies = []
+    for _ in range(iterations):
+        before_each()
+        # Una sesión por iteración, como una petición real (sin identity map compartido)
+        async with SessionLocal() as db:
+            start = time.perf_counter()
+            await get_current_user(credentials, db)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run(iterations):
+    from fastapi.security import HTTPAuthorizationCredentials
+    from app.database import SessionLocal, engine
+    from app.dependencies import get_current_user
+    from app.migrations import run_migrations
+    from app import models
+    from app.services.auth import create_access_token, user_cache
+
+    await run_migrations()
+    async with SessionLocal() as db:
+        user = models.User(email="bench@plan-carrera.local", name="Bench")
+        db.add(user)
+        await db.commit()
+        user_id = user.id
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token(user_id))
+
+    print(f"{'modo':<10} {'p50 µs':>8} {'p99 µs':>8}")
+    for mode, before_each in (("sin caché", user_cache.clear), ("con caché", lambda: None)):
+        latencies = await _measure(get_current_user, credentials, iterations, before_each)
+        print(f"{mode:<10} {percentile(latencies, 50) * 1e6:>8.1f} {percentile(latencies, 99) * 1e6:>8.1f}")
+    print(user_cache.snapshot())
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # La configuración se lee al importar app, así que la URL se fija antes
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+        asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
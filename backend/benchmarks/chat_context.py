@@ -0,0 +1,105 @@
+"""
+Tokens de prompt por turno de chat: política anterior (últimos 10 mensajes de BD,
+8 en el prompt, sin importar su longitud) frente al constructor con presupuesto de
+tokens + resumen acumulado.
+
+Reproduce conversaciones sintéticas (preguntas cortas, respuestas de mentor y
+de vez en cuando bloques de código pegados) sin llamar al LLM: el resumen se
+simula con un texto de CHAT_SUMMARY_MAX_TOKENS tokens cada vez que se regeneraría.
+Los tokens se cuentan con la misma aproximación local (estimate_tokens).
+
+Uso (desde backend/):
+    python -m benchmarks.chat_context --conversations 50 --turns 40
+"""
+import argparse
+import random
+from types import SimpleNamespace
+
+from app.config import settings
+from app.services.chat_context import build_chat_context, estimate_tokens, truncate_to_tokens
+from app.services.groq_service import GroqService
+
+USER_CONTEXT = {"plan_title": "Backend con Python", "current_phase": "Fase 2", "progress_percentage": 30, "completed_projects": 1}
+QUESTIONS = [
+    "¿Qué diferencia hay entre una lista y una tupla?",
+    "No entiendo bien los decoradores, ¿me lo explicas con un ejemplo?",
+    "¿Qué proyecto me recomiendas para practicar SQL?",
+    "¿Cómo preparo una entrevista técnica junior?",
+    "¿Vale la pena aprender Docker ahora o después?",
+]
+CODE_LINE = "    resultado = [procesar(item) for item in datos if item.activo]\n"
+ANSWER = (
+    "¡Buena pregunta! 🚀 Te lo explico paso a paso con un ejemplo práctico relacionado con tu plan. "
+    "Primero revisa el concepto base, después aplícalo en un ejercicio pequeño y por último "
+    "intégralo en tu proyecto de la fase actual. Si te atascas, comparte el error y lo vemos. "
+) * 3
+
+
+def _conversation(rng: random.Random, turns: int):
+    messages = []
+    for _ in range(turns):
+        question = rng.choice(QUESTIONS)
+        if rng.random() < 0.2:
+            question += "\n```python\ndef procesar(datos):\n" + CODE_LINE * rng.randint(20, 80) + "```"
+        messages.append(("user", question))
+        messages.append(("assistant", ANSWER))
+    return messages
+
+
+def _prompt_tokens(messages) -> int:
+    return sum(estimate_tokens(m["content"]) for m in messages)
+
+
+def replay(conversation, service: GroqService):
+    """Devuelve (tokens antes, tokens después, mensajes recordados antes, después) por turno."""
+    rows, summary, results = [], None, []
+    for turn in range(0, len(conversation), 2):
+        role, question = conversation[turn]
+
+        # Antes: 10 mensajes de BD, los 8 últimos al prompt
+        old_history = [{"role": r.role, "content": r.content} for r in rows[-10:]]
+        old = _prompt_tokens(service._chat_messages(question, USER_CONTEXT, old_history[-8:]))
+
+        # Después: presupuesto + resumen
+        recent = list(reversed(rows[-settings.CHAT_HISTORY_FETCH_LIMIT:]))
+        context = build_chat_context(recent, summary)
+        new = _prompt_tokens(service._chat_messages(question, USER_CONTEXT, context.history, context.summary))
+        summarized = summary.last_message_id if summary else 0
+        results.append((old, new, min(len(rows), 8), summarized + len(context.history)))
+
+        if context.needs_summary:
+            text = truncate_to_tokens(" ".join(m["content"] for m in context.pending), settings.CHAT_SUMMARY_MAX_TOKENS)
+            summary = SimpleNamespace(summary=text, last_message_id=context.pending[-1]["id"])
+
+        for role, content in conversation[turn:turn + 2]:
+            rows.append(SimpleNamespace(id=len(rows) + 1, role=role, content=content))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    service = GroqService()
+    results = []
+    for _ in range(args.conversations):
+        results.extend(replay(_conversation(rng, args.turns), service))
+
+    old = sorted(r[0] for r in results)
+    new = sorted(r[1] for r in results)
+    print(f"turnos reproducidos: {len(results)}  (presupuesto {settings.CHAT_CONTEXT_TOKEN_BUDGET} tokens)")
+    print(f"{'política':<12} {'media':>8} {'p95':>8} {'máx':>8} {'total':>10}")
+    for name, values in (("anterior", old), ("presupuesto", new)):
+        print(f"{name:<12} {sum(values) / len(values):>8.0f} {values[int(len(values) * 0.95)]:>8} "
+              f"{values[-1]:>8} {sum(values):>10}")
+    print(f"ahorro de tokens de prompt: {1 - sum(new) / sum(old):.1%}")
+    print(f"mensajes previos cubiertos (media): anterior {sum(r[2] for r in results) / len(results):.1f}, "
+          f"presupuesto {sum(r[3] for r in results) / len(results):.1f} (ventana + resumen)")
+
+
+if __name__ == "__main__":
+    main()
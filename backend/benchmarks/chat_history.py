@@ -0,0 +1,134 @@
+"""
+Historial de chat con muchos mensajes: paginación por cursor vs OFFSET, con índice compuesto.
+
+Siembra N mensajes repartidos entre U usuarios en un SQLite temporal y mide:
+  - la consulta de contexto de /chat/message (últimos 10 del usuario)
+  - la primera página y una página profunda de GET /chat/history (cursor)
+  - la misma página profunda con OFFSET
+El tiempo por cursor debe ser constante con la profundidad; OFFSET crece.
+
+Uso (desde backend/):
+    python -m benchmarks.chat_history --messages 1000000 --users 1000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.common import percentile
+
+
+def _seed(path: str, messages: int, users: int):
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO users (id, email, name) VALUES (?, ?, ?)",
+                     ((u, f"user{u}@bench.local", f"Usuario {u}") for u in range(1, users + 1)))
+    rng = random.Random(7)
+    base = time.time() - messages
+
+    def rows():
+        for i in range(messages):
+            # Marcas de tiempo crecientes con resolución de segundos (como CURRENT_TIMESTAMP)
+            ts = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(base + i))
+            # El usuario 1 concentra el 10% de los mensajes (conversación muy larga)
+            user_id = 1 if i % 10 == 0 else rng.randint(2, users)
+            yield (user_id, "user" if i % 2 == 0 else "assistant", f"Mensaje de prueba número {i} sobre Python y SQL", ts)
+
+    conn.executemany("INSERT INTO chat_messages (user_id, role, content, timestamp) VALUES (?, ?, ?, ?)", rows())
+    conn.commit()
+    conn.close()
+
+
+async def _timed(fn, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return percentile(samples, 50) * 1000, percentile(samples, 99) * 1000
+
+
+async def _measure(db, models, history_page, page_size: int, repeats: int):
+    from sqlalchemy import func, select
+
+    user_id = 1
+    total = (await db.execute(
+        select(func.count()).select_from(models.ChatMessage).where(models.ChatMessage.user_id == user_id)
+    )).scalar_one()
+    print(f"usuario {user_id}: {total} mensajes ({total // page_size} páginas de {page_size})")
+
+    # Recorrer el historial con cursor guardando el cursor de cada página
+    cursors = [None]
+    while True:
+        page = await history_page(db, user_id, page_size, cursors[-1])
+        if len(page) < page_size:
+            break
+        cursors.append(page[-1].id)
+    deep = len(cursors) - 1
+
+    async def offset_page(n):
+        query = select(models.ChatMessage).where(models.ChatMessage.user_id == user_id).order_by(
+            models.ChatMessage.timestamp.desc(), models.ChatMessage.id.desc()
+        ).offset(n * page_size).limit(page_size)
+        return list((await db.execute(query)).scalars())
+
+    cases = [
+        ("contexto chat (últimos 10)", lambda: history_page(db, user_id, 10)),
+        ("cursor página 1", lambda: history_page(db, user_id, page_size, cursors[0])),
+        (f"cursor página {deep}", lambda: history_page(db, user_id, page_size, cursors[deep])),
+        ("offset página 1", lambda: offset_page(0)),
+        (f"offset página {deep}", lambda: offset_page(deep)),
+    ]
+    print(f"{'consulta':<30} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, fn in cases:
+        p50, p99 = await _timed(fn, repeats)
+        print(f"{label:<30} {p50:>8.3f} {p99:>8.3f}")
+
+    conn = await db.connection()
+    for sql in (
+        "SELECT * FROM chat_messages WHERE user_id = 1 ORDER BY timestamp DESC, id DESC LIMIT 10",
+        "SELECT * FROM chat_messages WHERE user_id = 1 AND (timestamp, id) < "
+        "((SELECT timestamp FROM chat_messages WHERE id = 5000), 5000) ORDER BY timestamp DESC, id DESC LIMIT 50",
+    ):
+        plan = (await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)).fetchall()
+        print("plan de consulta:", "; ".join(row[-1] for row in plan))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--no-index", action="store_true", help="borra los índices compuestos (esquema anterior)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "history.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        from app.database import SessionLocal, engine
+        from app.migrations import run_migrations
+        from app.api.routes.chat import _history_page
+        from app import models
+
+        asyncio.run(run_migrations())
+        if args.no_index:
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("DROP INDEX ix_chat_messages_user_id_timestamp")
+                conn.execute("DROP INDEX ix_career_plans_user_id_is_active")
+        start = time.perf_counter()
+        _seed(db_path, args.messages, args.users)
+        print(f"sembrados {args.messages} mensajes en {time.perf_counter() - start:.1f}s")
+
+        async def measure():
+            async with SessionLocal() as db:
+                await _measure(db, models, _history_page, args.page_size, args.repeats)
+            await engine.dispose()
+
+        asyncio.run(measure())
+
+
+if __name__ == "__main__":
+    main()
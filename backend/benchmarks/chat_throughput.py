@@ -0,0 +1,80 @@
+"""
+Throughput de /chat/message con un LLM falso rápido, a distintos niveles de concurrencia.
+
+El servidor falso responde en --llm-latency segundos, así que el coste medido es
+sobre todo el de la API: dependencias, consultas de contexto y guardado del turno.
+Cada cliente usa su propio usuario de desarrollo (mismo usuario en todas las peticiones).
+
+Uso (desde backend/):
+    python -m benchmarks.chat_throughput --concurrency 50 100 250 500 --requests 2000
+    # comparar con otro commit:
+    git worktree add /tmp/before <commit> && python -m benchmarks.chat_throughput --app-dir /tmp/before/backend
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import BACKEND_DIR, percentile, uvicorn_server
+
+
+async def _load(base_url: str, concurrency: int, total: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                i = queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/chat/message", json={"message": f"Duda número {i} sobre SQL"})
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, latencies, errors
+
+
+async def run(base_url: str, levels, total: int):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await client.post("/chat/message", json={"message": "hola"})
+    print(f"{'clientes':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'errores':>8}")
+    for concurrency in levels:
+        rps, latencies, errors = await _load(base_url, concurrency, total)
+        print(f"{concurrency:>9} {rps:>8.1f} {percentile(latencies, 50) * 1000:>8.1f} "
+              f"{percentile(latencies, 99) * 1000:>9.1f} {errors:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 100, 250, 500])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--app-dir", type=Path, default=BACKEND_DIR)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, uvicorn_server(
+        "benchmarks.fake_groq:app", {"FAKE_CHAT_LATENCY": str(args.llm_latency)}
+    ) as fake_url:
+        app_env = {"GROQ_API_KEY": "fake-key", "GROQ_BASE_URL": fake_url, "DATABASE_URL": f"sqlite:///{tmp}/bench.db"}
+        with uvicorn_server("app.main:app", app_env, cwd=args.app_dir) as api_url:
+            asyncio.run(run(api_url, args.concurrency, args.requests))
+
+
+if __name__ == "__main__":
+    main()
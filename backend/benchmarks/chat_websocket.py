@@ -0,0 +1,149 @@
+"""
+Chat por WebSocket (/chat/ws) frente a HTTP (/chat/message/stream).
+
+1. Coste por turno sin el LLM: el Groq falso responde al instante (sin latencia de
+   primer token y con un ritmo de tokens enorme), así que lo medido es lo que pone la
+   API: autenticación, plan activo, historial, resumen, guardado y envío. Las rondas
+   HTTP y WebSocket se intercalan; en WebSocket cada turno reutiliza la sesión de la
+   conexión.
+2. Capacidad de un worker: N conexiones abiertas y ociosas a la vez (usuarios
+   sembrados distintos), RSS del proceso por conexión y latencia de un ping y de un
+   turno con todas abiertas. La conexión N+1 debe rechazarse (CHAT_WS_MAX_CONNECTIONS=N).
+
+Uso (desde backend/):
+    python -m benchmarks.chat_websocket --turns 200 --connections 1000
+"""
+import argparse
+import asyncio
+import json
+import resource
+import tempfile
+import time
+
+import httpx
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+from benchmarks.common import memory_mb, percentile, uvicorn_process, uvicorn_server
+from benchmarks.suite import SECRET_KEY, _seed
+
+MESSAGE = "¿Qué es una API?"
+
+
+async def _http_turn(client: httpx.AsyncClient, token: str) -> float:
+    start = time.perf_counter()
+    async with client.stream(
+        "POST", "/chat/message/stream", json={"message": MESSAGE}, headers={"Authorization": f"Bearer {token}"}
+    ) as response:
+        async for line in response.aiter_lines():
+            if line.startswith("event: done"):
+                break
+    return time.perf_counter() - start
+
+
+async def _ws_turn(ws) -> float:
+    start = time.perf_counter()
+    await ws.send(json.dumps({"type": "message", "message": MESSAGE}))
+    while True:
+        event = json.loads(await ws.recv())
+        if event["type"] == "done":
+            return time.perf_counter() - start
+        if event["type"] == "error":
+            raise RuntimeError(event["detail"])
+
+
+async def _ws_open(ws_url: str, token: str):
+    ws = await connect(f"{ws_url}?token={token}", ping_interval=None, max_queue=None)
+    ready = json.loads(await ws.recv())
+    assert ready["type"] == "ready", ready
+    return ws
+
+
+async def _per_turn(api_url: str, ws_url: str, token: str, turns: int):
+    http, ws_times = [], []
+    async with httpx.AsyncClient(base_url=api_url, timeout=60) as client:
+        ws = await _ws_open(ws_url, token)
+        await _http_turn(client, token)  # calentar caché de usuario y conexiones
+        await _ws_turn(ws)
+        for _ in range(turns // 10):
+            http += [await _http_turn(client, token) for _ in range(10)]
+            ws_times += [await _ws_turn(ws) for _ in range(10)]
+        await ws.close()
+    return http, ws_times
+
+
+async def _capacity(ws_url: str, pid: int, tokens, connections: int):
+    before = memory_mb(pid).get("rss", 0)
+    sockets = []
+    start = time.perf_counter()
+    for i in range(0, connections, 50):
+        sockets += await asyncio.gather(*(
+            _ws_open(ws_url, tokens[j % len(tokens)]) for j in range(i, min(i + 50, connections))
+        ))
+    opened_in = time.perf_counter() - start
+    after = memory_mb(pid).get("rss", 0)
+
+    pings = []
+    for ws in sockets[:: max(1, len(sockets) // 200)]:
+        ping_start = time.perf_counter()
+        await ws.send('{"type": "ping"}')
+        await ws.recv()
+        pings.append(time.perf_counter() - ping_start)
+    turns = [await _ws_turn(sockets[-1]) for _ in range(20)]
+
+    try:
+        extra = await connect(f"{ws_url}?token={tokens[0]}", ping_interval=None)
+        await extra.recv()
+        rejected = "no"
+    except ConnectionClosed as e:
+        rejected = f"sí (código {e.rcvd.code if e.rcvd else '?'})"
+    await asyncio.gather(*(ws.close() for ws in sockets))
+    return before, after, opened_in, pings, turns, rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=20, help="usuarios sembrados (escala small) con JWT")
+    args = parser.parse_args()
+
+    # Cada conexión es un descriptor en el cliente y otro en el servidor
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, args.connections * 2 + 256)), hard))
+
+    fake_env = {"FAKE_FIRST_TOKEN_LATENCY": "0", "FAKE_TOKENS_PER_SECOND": "1000000", "FAKE_CHAT_LATENCY": "0"}
+    with tempfile.TemporaryDirectory() as tmp, uvicorn_server("benchmarks.fake_groq:app", fake_env) as fake_url:
+        app_env = {
+            "GROQ_API_KEY": "fake-key",
+            "GROQ_BASE_URL": fake_url,
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "SECRET_KEY": SECRET_KEY,
+            "CHAT_WS_MAX_CONNECTIONS": str(args.connections),
+        }
+        tokens = _seed("small", app_env, args.users)["tokens"]
+        with uvicorn_process("app.main:app", app_env) as (api_url, proc):
+            ws_url = api_url.replace("http://", "ws://") + "/chat/ws"
+
+            http, ws_times = asyncio.run(_per_turn(api_url, ws_url, tokens[0], args.turns))
+            print(f"Turno sin LLM ({len(http)} por camino, rondas intercaladas)")
+            print(f"{'camino':<24} {'p50 ms':>8} {'p99 ms':>8}")
+            for label, timings in (("HTTP /chat/message/stream", http), ("WebSocket /chat/ws", ws_times)):
+                print(f"{label:<24} {percentile(timings, 50) * 1000:>8.2f} {percentile(timings, 99) * 1000:>8.2f}")
+
+            before, after, opened_in, pings, turns, rejected = asyncio.run(
+                _capacity(ws_url, proc.pid, tokens, args.connections)
+            )
+            print(f"\nCapacidad de un worker: {args.connections} conexiones abiertas en {opened_in:.1f} s")
+            print(f"RSS {before:.1f} -> {after:.1f} MB "
+                  f"({(after - before) * 1024 / args.connections:.1f} KB por conexión)")
+            print(f"ping con todas abiertas:  p50 {percentile(pings, 50) * 1000:.2f} ms  "
+                  f"p99 {percentile(pings, 99) * 1000:.2f} ms")
+            print(f"turno con todas abiertas: p50 {percentile(turns, 50) * 1000:.2f} ms  "
+                  f"p99 {percentile(turns, 99) * 1000:.2f} ms")
+            print(f"conexión {args.connections + 1} rechazada: {rejected}")
+            print(httpx.get(api_url + "/chat/ws/stats").json())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Guardado de los turnos del chat: COMMIT por petición frente al búfer de escritura
+diferida (CHAT_WRITE_BEHIND_ENABLED), a alta concurrencia y con un LLM falso rápido
+para que el coste de la base de datos pese en la latencia.
+
+Las dos APIs corren a la vez sobre bases de datos separadas y las rondas se intercalan.
+Al final se cuentan las filas de chat_messages de cada una (tras apagar la API, que vacía
+el búfer) para comprobar que no se pierde ningún turno.
+
+Uso (desde backend/):
+    python -m benchmarks.chat_write_behind --concurrency 100 250 --requests 2000
+"""
+import argparse
+import asyncio
+import sqlite3
+import tempfile
+from contextlib import ExitStack
+
+from benchmarks.chat_throughput import _load
+from benchmarks.common import percentile, uvicorn_server
+
+MODES = ("false", "true")
+
+
+async def _warm_up(base_url: str):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await client.post("/chat/message", json={"message": "hola"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[100, 250])
+    parser.add_argument("--requests", type=int, default=2000, help="peticiones por nivel y modo")
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    results = {(mode, c): ([], 0.0, 0) for mode in MODES for c in args.concurrency}
+    with tempfile.TemporaryDirectory() as tmp:
+        with ExitStack() as stack:
+            fake_url = stack.enter_context(
+                uvicorn_server("benchmarks.fake_groq:app", {"FAKE_CHAT_LATENCY": str(args.llm_latency)})
+            )
+            urls = {
+                mode: stack.enter_context(uvicorn_server("app.main:app", {
+                    "GROQ_API_KEY": "fake-key",
+                    "GROQ_BASE_URL": fake_url,
+                    "DATABASE_URL": f"sqlite:///{tmp}/{mode}.db",
+                    "CHAT_WRITE_BEHIND_ENABLED": mode,
+                    "METRICS_ENABLED": "false",
+                }))
+                for mode in MODES
+            }
+            for url in urls.values():
+                asyncio.run(_warm_up(url))
+            # Rondas intercaladas: la deriva de la máquina afecta por igual a los dos modos
+            for _ in range(args.rounds):
+                for concurrency in args.concurrency:
+                    for mode, url in urls.items():
+                        rps, latencies, errors = asyncio.run(_load(url, concurrency, args.requests // args.rounds))
+                        previous, total_rps, total_errors = results[(mode, concurrency)]
+                        results[(mode, concurrency)] = (previous + latencies, total_rps + rps / args.rounds,
+                                                        total_errors + errors)
+
+        print(f"{'write-behind':<13} {'clientes':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'errores':>8}")
+        for concurrency in args.concurrency:
+            for mode in MODES:
+                latencies, rps, errors = results[(mode, concurrency)]
+                print(f"{mode:<13} {concurrency:>9} {rps:>8.1f} {percentile(latencies, 50) * 1000:>8.1f} "
+                      f"{percentile(latencies, 99) * 1000:>9.1f} {errors:>8}")
+
+        # APIs ya apagadas: lo que haya en la tabla es lo que sobrevivió al vaciado final
+        for mode in MODES:
+            with sqlite3.connect(f"{tmp}/{mode}.db") as conn:
+                rows = conn.execute("SELECT COUNT(*) FROM chat_messages").fetchone()[0]
+            ok = sum(len(results[(mode, c)][0]) for c in args.concurrency) + 1
+            print(f"write-behind={mode}: {rows} mensajes guardados (esperados {ok * 2})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Arranque en frío de un worker: tiempo de `import app.main` y tiempo desde que se lanza
+uvicorn hasta la primera respuesta de /health, más la latencia de la primera petición
+de chat contra el Groq falso (la que crea el cliente de Groq si la precarga en segundo
+plano no ha terminado: --chat-delay simula un worker que ya lleva un rato arrancado).
+
+Cada medida es un proceso nuevo; se informa la mediana de --runs. La base de datos se
+migra antes (`python -m app.migrations`), como en un despliegue: se mide el arranque
+con el esquema al día. Con --app-dir se compara con otra copia del backend:
+    git worktree add /tmp/before <commit> && python -m benchmarks.cold_start --app-dir /tmp/before/backend
+
+Objetivo frente al arranque anterior (migraciones y dos clientes de Groq al arrancar):
+-25 % en import y -20 % hasta la primera respuesta. Lo que queda es sobre todo FastAPI
+y SQLAlchemy.
+
+Uso (desde backend/):
+    python -m benchmarks.cold_start --runs 7
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import BACKEND_DIR, free_port, uvicorn_server
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def _import_seconds(app_dir: Path, env: dict) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=app_dir, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def _first_response(app_dir: Path, env: dict, chat_delay: float):
+    """(segundos hasta el primer 200 de /health, segundos de la primera petición de chat)."""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=app_dir,
+        env=env,
+    )
+    try:
+        # Sondeo con sockets (barato): con un cliente HTTP el sondeo le quita CPU al arranque
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if proc.poll() is not None or time.perf_counter() - start > 60:
+                    raise RuntimeError(f"No arrancó la API de {app_dir}")
+                time.sleep(0.005)
+        with httpx.Client(base_url=base_url, timeout=60) as client:
+            client.get("/health").raise_for_status()
+            ready = time.perf_counter() - start
+            time.sleep(chat_delay)
+            chat_start = time.perf_counter()
+            client.post("/chat/message", json={"message": "hola"}).raise_for_status()
+            return ready, time.perf_counter() - chat_start
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def _row(label: str, imports, starts):
+    row = (
+        statistics.median(imports) * 1000,
+        statistics.median(ready for ready, _ in starts) * 1000,
+        statistics.median(chat for _, chat in starts) * 1000,
+    )
+    print(f"{label:<10} {row[0]:>10.0f} {row[1]:>16.0f} {row[2]:>15.0f}")
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--app-dir", type=Path, default=None, help="otra copia del backend como referencia")
+    parser.add_argument("--chat-delay", type=float, default=0, help="segundos entre /health y el primer chat")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, uvicorn_server(
+        "benchmarks.fake_groq:app", {"FAKE_CHAT_LATENCY": "0.05"}
+    ) as fake_url:
+        targets = {"actual": BACKEND_DIR}
+        if args.app_dir:
+            targets = {"anterior": args.app_dir, **targets}
+        envs = {
+            label: {**os.environ, "GROQ_API_KEY": "fake-key", "GROQ_BASE_URL": fake_url,
+                    "DATABASE_URL": f"sqlite:///{tmp}/{label}.db"}
+            for label in targets
+        }
+        samples = {label: ([], []) for label in targets}
+        for label, app_dir in targets.items():
+            subprocess.run([sys.executable, "-m", "app.migrations"], cwd=app_dir, env=envs[label],
+                           check=True, capture_output=True)
+        # Rondas intercaladas: la deriva de la máquina afecta por igual a las dos copias
+        for _ in range(args.runs):
+            for label, app_dir in targets.items():
+                samples[label][0].append(_import_seconds(app_dir, envs[label]))
+                samples[label][1].append(_first_response(app_dir, envs[label], args.chat_delay))
+
+        print(f"{'':<10} {'import ms':>10} {'1ª respuesta ms':>16} {'1er chat ms':>15}")
+        rows = {label: _row(label, *samples[label]) for label in targets}
+        if "anterior" in rows:
+            before, after = rows["anterior"], rows["actual"]
+            print(f"{'cambio':<10} {(after[0] - before[0]) / before[0]:>+10.0%} {(after[1] - before[1]) / before[1]:>+16.0%} "
+                  f"{(after[2] - before[2]) / before[2]:>+15.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Utilidades compartidas por los benchmarks: arrancar servidores locales y medir percentiles."""
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def uvicorn_process(app_path: str, env: dict = None, port: int = None, cwd: Path = BACKEND_DIR):
+    """
+    Arranca `uvicorn app_path` en un subproceso, espera a que responda y devuelve
+    (base_url, proceso). `cwd` permite arrancar otra copia del backend (p. ej. un
+    `git worktree` de un commit anterior).
+    """
+    port = port or free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path, "--port", str(port), "--log-level", "warning"],
+        cwd=cwd,
+        env={**os.environ, **(env or {})},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                httpx.get(base_url + "/docs", timeout=1)
+                break
+            except httpx.HTTPError:
+                if proc.poll() is not None or time.time() > deadline:
+                    raise RuntimeError(f"No se pudo arrancar {app_path}")
+                time.sleep(0.1)
+        yield base_url, proc
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+@contextmanager
+def uvicorn_server(app_path: str, env: dict = None, port: int = None, cwd: Path = BACKEND_DIR):
+    """Como `uvicorn_process`, pero solo devuelve la URL base."""
+    with uvicorn_process(app_path, env, port, cwd) as (base_url, _):
+        yield base_url
+
+
+def memory_mb(pid: int) -> dict:
+    """RSS actual y pico (VmRSS / VmHWM) de un proceso en MB; vacío fuera de Linux."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            fields = dict(line.split(":", 1) for line in status if ":" in line)
+    except OSError:
+        return {}
+    return {
+        key: round(int(fields[name].split()[0]) / 1024, 1)
+        for key, name in (("rss", "VmRSS"), ("peak", "VmHWM"))
+        if name in fields
+    }
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
@@ -0,0 +1,299 @@
+"""
+Servidor falso compatible con la API de chat de Groq/OpenAI para pruebas de carga.
+
+Responde en /openai/v1/chat/completions con una latencia configurable, sin coste
+ni API key real. Las peticiones con max_tokens >= 2000 se tratan como generación
+de planes (respuesta JSON con fases) y el resto como chat. Con stream=true envía
+fragmentos SSE: el primero tras FAKE_FIRST_TOKEN_LATENCY y el resto a
+FAKE_TOKENS_PER_SECOND (un "token" ≈ 4 caracteres).
+POST /callbacks recibe los callbacks de trabajos en segundo plano.
+
+Inyección de fallos (variables FAKE_* al arrancar o POST /faults en caliente):
+error_rate (fracción de 500), rate_limit_rate (fracción de 429 con retry-after),
+slow_rate / slow_latency (cola lenta), outage (todas las peticiones devuelven 503)
+down_models (lista de modelos que devuelven 503), malformed_rate (planes con una
+fase sin proyectos o con pocos learning_items) y truncated_rate (planes cortados).
+Las peticiones de reparación ("Campo a generar" / "Fase a generar") reciben solo
+ese campo o esa fase; las de adaptación ("Plan base: ") reciben la estructura del plan
+base con sus fases (título, semanas y descripción, sin contenido).
+FAKE_MODEL_SPEED ("modelo=factor,...") escala la latencia por modelo: con 0.3 el
+modelo responde en el 30 % del tiempo.
+FAKE_PREFILL_TOKENS_PER_SECOND simula el coste de procesar el prompt: añade
+(tokens de prompt - tokens cacheados) / ritmo. Como la caché de prompts de los
+proveedores, los tokens cacheados son el prefijo común más largo con algún prompt
+reciente (se devuelven en usage.prompt_tokens_details.cached_tokens).
+
+Uso:
+    FAKE_CHAT_LATENCY=0.3 FAKE_PLAN_LATENCY=8 uvicorn benchmarks.fake_groq:app --port 9100
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CHAT_LATENCY = float(os.getenv("FAKE_CHAT_LATENCY", "0.3"))
+PLAN_LATENCY = float(os.getenv("FAKE_PLAN_LATENCY", "8"))
+FIRST_TOKEN_LATENCY = float(os.getenv("FAKE_FIRST_TOKEN_LATENCY", "0.2"))
+TOKENS_PER_SECOND = float(os.getenv("FAKE_TOKENS_PER_SECOND", "500"))
+MODEL_SPEED = {
+    name: float(factor)
+    for name, factor in (item.split("=") for item in os.getenv("FAKE_MODEL_SPEED", "").split(",") if "=" in item)
+}
+PREFILL_TOKENS_PER_SECOND = float(os.getenv("FAKE_PREFILL_TOKENS_PER_SECOND", "0"))
+CHAT_REPLY = "¡Buena pregunta! 🚀 Una API es un contrato que permite que dos programas se comuniquen."
+
+app = FastAPI(title="Fake Groq")
+stats = {"requests": 0, "plan_requests": 0, "chat_requests": 0, "callbacks": 0, "errors": 0, "rate_limited": 0, "slow": 0,
+         "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0,
+         "malformed": 0, "truncated": 0, "repairs": 0, "adaptations": 0}
+faults = {
+    "error_rate": float(os.getenv("FAKE_ERROR_RATE", "0")),
+    "rate_limit_rate": float(os.getenv("FAKE_RATE_LIMIT_RATE", "0")),
+    "retry_after": float(os.getenv("FAKE_RETRY_AFTER", "1")),
+    "slow_rate": float(os.getenv("FAKE_SLOW_RATE", "0")),
+    "slow_latency": float(os.getenv("FAKE_SLOW_LATENCY", "5")),
+    "outage": os.getenv("FAKE_OUTAGE", "") == "1",
+    "down_models": [],
+    "malformed_rate": float(os.getenv("FAKE_MALFORMED_RATE", "0")),
+    "truncated_rate": float(os.getenv("FAKE_TRUNCATED_RATE", "0")),
+}
+model_requests = {}
+recent_prompts = []  # prompts serializados recientes para simular la caché de prefijos
+callbacks = []
+
+
+def sample_plan(phases: int = 5) -> dict:
+    """Plan de carrera realista (5 fases, 3 proyectos por fase) para simular la respuesta del modelo."""
+    return {
+        "plan_title": "De cero a desarrollador backend con Python y SQL",
+        "total_weeks": 6 * phases,
+        "phases": [
+            {
+                "id": n,
+                "title": f"Fase {n}: Bloque de aprendizaje {n}",
+                "duration_weeks": 6,
+                "description": (
+                    f"En esta fase consolidarás los conocimientos del bloque {n}, "
+                    "practicando con ejercicios guiados y proyectos reales que podrás mostrar en GitHub."
+                ),
+                "learning_items": [
+                    f"Objetivo {i} de la fase {n}: dominar un concepto clave con ejemplos prácticos"
+                    for i in range(1, 12)
+                ],
+                "projects": [
+                    {
+                        "difficulty": difficulty,
+                        "title": f"Proyecto {difficulty} de la fase {n}",
+                        "description": "Aplicación que pone en práctica lo aprendido en la fase.",
+                        "requirements": [f"Requisito técnico {r}" for r in range(1, reqs + 1)],
+                        "github_tips": "Incluye un README con capturas, instrucciones de instalación y decisiones técnicas.",
+                        "technologies": ["Python", "SQL", "Git"],
+                    }
+                    for difficulty, reqs in (("easy", 6), ("medium", 8), ("hard", 10))
+                ],
+                "resources": [
+                    {"title": "Documentación oficial de Python", "url": "https://docs.python.org/es/3/", "type": "documentation"},
+                    {"title": "Curso de SQL desde cero", "url": "https://www.coursera.org/learn/sql", "type": "course"},
+                    {"title": "Git y GitHub paso a paso", "url": "https://www.youtube.com/watch?v=example", "type": "video"},
+                ],
+            }
+            for n in range(1, phases + 1)
+        ],
+    }
+
+
+def _is_plan_request(body: dict) -> bool:
+    return (body.get("max_tokens") or 0) >= 2000
+
+
+def _repair_target(body: dict):
+    """("field", nombre) o ("phase", posición) si es una petición de reparación de plan."""
+    content = body.get("messages", [{}])[-1].get("content", "")
+    for marker, kind in (("Campo a generar: ", "field"), ("Fase a generar: ", "phase")):
+        if marker in content:
+            return kind, content.rsplit(marker, 1)[1].strip()
+    return None
+
+
+def _is_adapt_request(body: dict) -> bool:
+    return "Plan base: " in body.get("messages", [{}])[-1].get("content", "")
+
+
+def _broken_plan() -> str:
+    plan = sample_plan()
+    if random.random() < faults["truncated_rate"]:
+        stats["truncated"] += 1
+        text = json.dumps(plan, ensure_ascii=False)
+        return text[: int(len(text) * random.uniform(0.5, 0.9))]
+    if random.random() < faults["malformed_rate"]:
+        stats["malformed"] += 1
+        phase = random.choice(plan["phases"])
+        if random.random() < 0.5:
+            del phase["projects"]
+        else:
+            phase["learning_items"] = phase["learning_items"][:5]
+    return json.dumps(plan, ensure_ascii=False)
+
+
+def _reply_content(body: dict) -> str:
+    target = _repair_target(body)
+    if target is not None:
+        stats["repairs"] += 1
+        kind, value = target
+        phase = sample_plan()["phases"][0]
+        return json.dumps({value: phase[value]} if kind == "field" else {**phase, "id": int(value)}, ensure_ascii=False)
+    if _is_adapt_request(body):
+        stats["adaptations"] += 1
+        plan = sample_plan()
+        return json.dumps({
+            "plan_title": plan["plan_title"],
+            "total_weeks": plan["total_weeks"],
+            "phases": [
+                {key: phase[key] for key in ("id", "title", "duration_weeks", "description")} for phase in plan["phases"]
+            ],
+        }, ensure_ascii=False)
+    if _is_plan_request(body):
+        return _broken_plan()
+    return CHAT_REPLY
+
+
+async def _stream_chunks(body: dict, content: str):
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    await asyncio.sleep(FIRST_TOKEN_LATENCY)
+    for start in range(0, len(content), 4):
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [
+                {"index": 0, "delta": {"role": "assistant", "content": content[start:start + 4]}, "finish_reason": None}
+            ],
+        }
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        await asyncio.sleep(1 / TOKENS_PER_SECOND)
+    # Como Groq: el último fragmento cierra la elección y trae el uso en x_groq
+    final = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        "x_groq": {"id": completion_id, "usage": _usage(body, content)},
+    }
+    yield f"data: {json.dumps(final, ensure_ascii=False)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def _cached_prompt_tokens(body: dict) -> int:
+    prompt = "".join(f"{m.get('role')}:{m.get('content', '')}\n" for m in body.get("messages", []))
+    common = max((len(os.path.commonprefix([prompt, seen])) for seen in recent_prompts), default=0)
+    recent_prompts.append(prompt)
+    del recent_prompts[:-32]
+    return common // 4
+
+
+def _usage(body: dict, content: str, cached_tokens: int = 0) -> dict:
+    prompt_tokens = sum(len(m.get("content", "")) // 4 for m in body.get("messages", []))
+    completion_tokens = len(content) // 4
+    stats["prompt_tokens"] += prompt_tokens
+    stats["completion_tokens"] += completion_tokens
+    stats["cached_prompt_tokens"] += min(cached_tokens, prompt_tokens)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": min(cached_tokens, prompt_tokens)},
+    }
+
+
+def _injected_fault(model: str):
+    """Respuesta de error según `faults`, o None si esta petición sale bien."""
+    down = faults["outage"] or model in faults["down_models"]
+    if down or random.random() < faults["error_rate"]:
+        stats["errors"] += 1
+        status_code = 503 if down else 500
+        return JSONResponse({"error": {"message": "fake upstream error", "type": "server_error"}}, status_code=status_code)
+    if random.random() < faults["rate_limit_rate"]:
+        stats["rate_limited"] += 1
+        return JSONResponse(
+            {"error": {"message": "fake rate limit", "type": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"retry-after": str(faults["retry_after"])},
+        )
+    return None
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    stats["plan_requests" if _is_plan_request(body) else "chat_requests"] += 1
+    model = body.get("model", "fake")
+    model_requests[model] = model_requests.get(model, 0) + 1
+    fault = _injected_fault(model)
+    if fault is not None:
+        return fault
+    content = _reply_content(body)
+    if body.get("stream"):
+        return StreamingResponse(_stream_chunks(body, content), media_type="text/event-stream")
+
+    latency = PLAN_LATENCY if _is_plan_request(body) else CHAT_LATENCY
+    if _repair_target(body) is not None or _is_adapt_request(body):
+        # La generación es proporcional a la salida: una fase, un campo o una adaptación cuesta una fracción del plan
+        latency = PLAN_LATENCY * len(content) / len(json.dumps(sample_plan(), ensure_ascii=False))
+    latency *= MODEL_SPEED.get(model, 1.0)
+    if random.random() < faults["slow_rate"]:
+        stats["slow"] += 1
+        latency = faults["slow_latency"]
+    cached_tokens = _cached_prompt_tokens(body)
+    if PREFILL_TOKENS_PER_SECOND:
+        uncached = sum(len(m.get("content", "")) // 4 for m in body.get("messages", [])) - cached_tokens
+        latency += max(0, uncached) / PREFILL_TOKENS_PER_SECOND
+    await asyncio.sleep(latency)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+                "logprobs": None,
+            }
+        ],
+        "usage": _usage(body, content, cached_tokens),
+    }
+
+
+@app.post("/callbacks")
+async def receive_callback(request: Request):
+    """Destino de `callback_url` en las pruebas de /ai/jobs."""
+    stats["callbacks"] += 1
+    callbacks.append(await request.json())
+    return {"ok": True}
+
+
+@app.get("/callbacks")
+async def list_callbacks():
+    return callbacks
+
+
+@app.post("/faults")
+async def set_faults(request: Request):
+    """Cambia los fallos inyectados sin reiniciar (p. ej. {"outage": true})."""
+    faults.update(await request.json())
+    return faults
+
+
+@app.get("/stats")
+async def get_stats():
+    """Peticiones recibidas (para comprobar cuántas llamadas reales hizo la API)."""
+    return {**stats, "models": model_requests}
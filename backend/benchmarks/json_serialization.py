@@ -0,0 +1,101 @@
+"""
+Microbenchmark de serialización de un CareerPlanResponse con un plan realista de 5 fases
+(el que devuelve el Groq falso): tiempo por respuesta y memoria asignada.
+
+Caminos comparados:
+  jsonable_encoder + json     lo que hace FastAPI con una ruta sin response_model
+  model_dump + json           FastAPI con response_model y JSONResponse (versiones < 0.130)
+  model_dump + orjson         lo mismo con FastJSONResponse (app.api.responses)
+  model_dump_json (Any)       generated_plan como Any: pydantic infiere el tipo de cada valor
+                              en Rust (model_response)
+  model_dump_json (tipado)    generated_plan como GeneratedPlan (schemas, extra="allow")
+y el coste de construir la respuesta (validación) con generated_plan Any frente a tipado.
+
+La memoria es la de tracemalloc: pico y bloques asignados por operación en el heap de
+Python (lo que reservan por dentro pydantic-core u orjson fuera de él no aparece, pero sí
+los objetos intermedios y el resultado).
+
+Uso (desde backend/):
+    python -m benchmarks.json_serialization --runs 2000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from benchmarks.common import percentile
+
+
+def _timings(call, runs: int):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _allocations(call):
+    call()  # calentar cachés de pydantic/orjson fuera de la medida
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return peak, blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    from fastapi.encoders import jsonable_encoder
+
+    from app.api.responses import dumps
+    from app.schemas import CareerPlanResponse, GeneratedPlan
+    from benchmarks.fake_groq import sample_plan
+
+    class TypedPlanResponse(CareerPlanResponse):
+        generated_plan: Optional[GeneratedPlan] = None
+
+    row = {
+        "id": 1, "user_id": 1, "title": "De cero a desarrollador backend", "tech_stack": "['Python', 'SQL']",
+        "difficulty_level": "beginner", "hours_per_day": 2, "goal": "Conseguir mi primer trabajo",
+        "timeline_weeks": 30, "is_active": True, "created_at": datetime.now(timezone.utc),
+    }
+    plan = sample_plan(phases=5)
+    typed = TypedPlanResponse(**row, generated_plan=plan)
+    untyped = CareerPlanResponse(**row, generated_plan=plan)
+
+    cases = [
+        ("jsonable_encoder + json", lambda: json.dumps(
+            jsonable_encoder(untyped), ensure_ascii=False, separators=(",", ":")).encode("utf-8")),
+        ("model_dump + json", lambda: json.dumps(
+            untyped.model_dump(mode="json"), ensure_ascii=False, separators=(",", ":")).encode("utf-8")),
+        ("model_dump + orjson", lambda: dumps(untyped.model_dump(mode="json"))),
+        ("model_dump_json (Any)", lambda: untyped.model_dump_json().encode("utf-8")),
+        ("model_dump_json (tipado)", lambda: typed.model_dump_json().encode("utf-8")),
+        ("construir (Any)", lambda: CareerPlanResponse(**row, generated_plan=plan)),
+        ("construir (tipado)", lambda: TypedPlanResponse(**row, generated_plan=plan)),
+    ]
+    size = len(untyped.model_dump_json().encode("utf-8"))
+    print(f"Plan de 5 fases: {size} bytes de JSON, {args.runs} repeticiones por camino\n")
+    print(f"{'camino':<26} {'p50 µs':>8} {'p99 µs':>8} {'pico KB':>8} {'bloques':>8}")
+    # Rondas intercaladas para que el ruido de la máquina afecte a todos por igual
+    timings = {label: [] for label, _ in cases}
+    for _ in range(4):
+        for label, call in cases:
+            timings[label] += _timings(call, args.runs // 4)
+    for label, call in cases:
+        peak, blocks = _allocations(call)
+        print(f"{label:<26} {percentile(timings[label], 50) * 1e6:>8.1f} {percentile(timings[label], 99) * 1e6:>8.1f} "
+              f"{peak / 1024:>8.1f} {blocks:>8}")
+
+
+if __name__ == "__main__":
+    main()
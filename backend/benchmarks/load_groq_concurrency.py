@@ -0,0 +1,80 @@
+"""
+Prueba de carga: latencia de /chat/message mientras hay generaciones de plan en curso.
+
+Arranca el servidor falso de Groq y la API (SQLite temporal), mantiene N generaciones
+de plan en vuelo y mide p50/p99 de mensajes de chat concurrentes. Con el cliente
+síncrono la p99 del chat crecía con N (el event loop quedaba bloqueado); con el
+cliente asíncrono debe mantenerse plana.
+
+Uso (desde backend/):
+    python -m benchmarks.load_groq_concurrency --in-flight 0 2 8 --chats 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import percentile, uvicorn_server
+
+
+async def _plan_loop(client: httpx.AsyncClient, stop: asyncio.Event):
+    while not stop.is_set():
+        await client.post("/ai/generate-plan", json={}, timeout=120)
+
+
+async def _measure_chat(client: httpx.AsyncClient, total: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/chat/message", json={"message": f"¿Qué es una API? ({i})"}, timeout=120)
+            if response.status_code != 200:
+                raise RuntimeError(response.text)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies
+
+
+async def run(base_url: str, in_flight_levels, chats: int, concurrency: int):
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        # Primera petición en serie: crea el usuario de desarrollo antes de la carga concurrente
+        await client.post("/chat/message", json={"message": "hola"}, timeout=120)
+        print(f"{'planes en vuelo':>16} {'p50 chat (s)':>13} {'p99 chat (s)':>13}")
+        for in_flight in in_flight_levels:
+            stop = asyncio.Event()
+            plan_tasks = [asyncio.create_task(_plan_loop(client, stop)) for _ in range(in_flight)]
+            await asyncio.sleep(0.5)
+            latencies = await _measure_chat(client, chats, concurrency)
+            stop.set()
+            await asyncio.gather(*plan_tasks, return_exceptions=True)
+            print(f"{in_flight:>16} {percentile(latencies, 50):>13.3f} {percentile(latencies, 99):>13.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[0, 2, 8])
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--chat-latency", type=float, default=0.3)
+    parser.add_argument("--plan-latency", type=float, default=4.0)
+    args = parser.parse_args()
+
+    fake_env = {"FAKE_CHAT_LATENCY": str(args.chat_latency), "FAKE_PLAN_LATENCY": str(args.plan_latency)}
+    with tempfile.TemporaryDirectory() as tmp, uvicorn_server("benchmarks.fake_groq:app", fake_env) as fake_url:
+        app_env = {
+            "GROQ_API_KEY": "fake-key",
+            "GROQ_BASE_URL": fake_url,
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+        }
+        with uvicorn_server("app.main:app", app_env) as api_url:
+            asyncio.run(run(api_url, args.in_flight, args.chats, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Coste de la instrumentación (/metrics, X-Request-ID, tiempos de SQL y de Groq).
+
+1. En proceso: coste de una observación de histograma y de una consulta SQL con y sin
+   los eventos de cursor instalados.
+2. Contra uvicorn: latencia de /health y de GET /ai/plans (SQL) con METRICS_ENABLED
+   true/false, intercalando rondas para que el ruido afecte por igual a los dos.
+3. Un chat normal y uno en streaming contra el Groq falso y las series que quedan en
+   /metrics (latencia, tiempo hasta el primer token y tokens por tarea y modelo).
+
+Uso (desde backend/):
+    python -m benchmarks.metrics_overhead --requests 2000
+"""
+import argparse
+import tempfile
+import time
+from contextlib import ExitStack
+
+import httpx
+
+from benchmarks.common import percentile, uvicorn_server
+
+
+def _in_process(iterations: int):
+    from sqlalchemy import create_engine, text
+
+    from app.services import metrics
+
+    histogram = metrics.Histogram("bench_seconds", "bench", ("route",))
+    start = time.perf_counter()
+    for i in range(iterations):
+        histogram.observe(i % 100 / 1000, "/health")
+    observe_us = (time.perf_counter() - start) / iterations * 1e6
+
+    query_us = {}
+    for label, instrumented in (("sin eventos", False), ("con eventos", True)):
+        engine = create_engine("sqlite://")
+        if instrumented:
+            metrics.install_db_metrics(engine)
+        with engine.connect() as conn:
+            for _ in range(iterations // 10):
+                conn.execute(text("SELECT 1")).scalar()
+            start = time.perf_counter()
+            for _ in range(iterations):
+                conn.execute(text("SELECT 1")).scalar()
+            query_us[label] = (time.perf_counter() - start) / iterations * 1e6
+        engine.dispose()
+    return observe_us, query_us
+
+
+def _timed(client: httpx.Client, path: str, n: int):
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        client.get(path).raise_for_status()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="peticiones por ruta y modo")
+    parser.add_argument("--rounds", type=int, default=4)
+    args = parser.parse_args()
+
+    observe_us, query_us = _in_process(20000)
+    print(f"observe() de histograma: {observe_us:.2f}µs")
+    print(f"SELECT 1 en SQLite: {query_us['sin eventos']:.1f}µs sin eventos, {query_us['con eventos']:.1f}µs con eventos "
+          f"(+{query_us['con eventos'] - query_us['sin eventos']:.1f}µs por consulta)")
+
+    paths = ("/health", "/ai/plans")
+    timings = {(mode, path): [] for mode in ("false", "true") for path in paths}
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as stack:
+        fake_url = stack.enter_context(uvicorn_server("benchmarks.fake_groq:app"))
+        clients = {}
+        for mode in ("false", "true"):
+            api_url = stack.enter_context(uvicorn_server("app.main:app", {
+                "GROQ_API_KEY": "fake-key",
+                "GROQ_BASE_URL": fake_url,
+                "DATABASE_URL": f"sqlite:///{tmp}/{mode}.db",
+                "METRICS_ENABLED": mode,
+            }))
+            clients[mode] = stack.enter_context(httpx.Client(base_url=api_url, timeout=30))
+        for client in clients.values():
+            for path in paths:
+                _timed(client, path, 50)  # calentamiento
+        for _ in range(args.rounds):
+            for mode, client in clients.items():
+                for path in paths:
+                    timings[(mode, path)] += _timed(client, path, args.requests // args.rounds)
+
+        print(f"\n{'ruta':<12} {'métricas':<9} {'p50 ms':>8} {'p99 ms':>8}")
+        for path in paths:
+            for mode in ("false", "true"):
+                values = timings[(mode, path)]
+                print(f"{path:<12} {mode:<9} {percentile(values, 50) * 1000:>8.2f} {percentile(values, 99) * 1000:>8.2f}")
+
+        client = clients["true"]
+        client.post("/chat/message", json={"message": "¿Qué estudio hoy?"}).raise_for_status()
+        with client.stream("POST", "/chat/message/stream", json={"message": "Dame un consejo"}) as response:
+            response.read()
+        print(f"\nX-Request-ID: {response.headers.get('x-request-id')}")
+        for line in client.get("/metrics").text.splitlines():
+            if line.startswith(("llm_request_duration_seconds_count", "llm_time_to_first_token_seconds_count",
+                                "llm_tokens_total")):
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Latencia y coste del chat con el router de modelos frente a todo en el modelo grande
+(MODEL_ROUTING_ENABLED=false), contra el Groq falso con el modelo pequeño más rápido
+(FAKE_MODEL_SPEED). Después comprueba que los planes siguen en el modelo grande y que,
+con el modelo pequeño caído, el chat pasa a la alternativa sin errores.
+
+El coste usa los precios públicos de Groq por millón de tokens (entrada / salida).
+
+Uso (desde backend/):
+    python -m benchmarks.model_routing --messages 60
+"""
+import argparse
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from benchmarks.common import percentile, uvicorn_server
+
+LARGE = "llama-3.3-70b-versatile"
+SMALL = "llama-3.1-8b-instant"
+PRICES = {LARGE: (0.59, 0.79), SMALL: (0.05, 0.08)}
+
+SIMPLE = [
+    "¿Qué es una API REST?",
+    "Hoy terminé el primer proyecto de la fase 1 🎉",
+    "¿Me recomiendas algún curso de SQL?",
+    "¿Cuántas horas debería practicar al día?",
+    "Gracias, me sirvió mucho",
+]
+COMPLEX = [
+    "Revisa mi código: ```def suma(a, b): return a - b``` ¿por qué falla?",
+    "Compara la arquitectura de microservicios con un monolito para mi proyecto final",
+    "Explica en detalle cómo optimizar una consulta SELECT con varios JOIN",
+]
+
+
+def _messages(count: int, complex_share: float, seed: int):
+    rng = random.Random(seed)
+    return [rng.choice(COMPLEX if rng.random() < complex_share else SIMPLE) for _ in range(count)]
+
+
+def _chat(api_url: str, messages, concurrency: int):
+    def one(message):
+        with httpx.Client(base_url=api_url) as client:
+            start = time.perf_counter()
+            response = client.post("/chat/message", json={"message": message}, timeout=120)
+            return time.perf_counter() - start, response.status_code
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(one, messages))
+
+
+def _cost(models: dict) -> float:
+    return sum(
+        (stats["prompt_tokens"] * PRICES[model][0] + stats["completion_tokens"] * PRICES[model][1]) / 1e6
+        for model, stats in models.items() if model in PRICES
+    )
+
+
+def _report(label: str, results, models: dict):
+    timings = [t for t, code in results if code == 200]
+    ok = len(timings)
+    calls = {model: stats["calls"] for model, stats in models.items()}
+    print(f"{label:<22} éxito {ok}/{len(results)}, p50 {percentile(timings, 50):.2f}s, "
+          f"p95 {percentile(timings, 95):.2f}s, coste ${_cost(models) / len(results) * 1000:.4f}/1000 msgs, llamadas {calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=60)
+    parser.add_argument("--complex-share", type=float, default=0.3)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--chat-latency", type=float, default=0.8)
+    parser.add_argument("--small-speed", type=float, default=0.3)
+    args = parser.parse_args()
+
+    messages = _messages(args.messages, args.complex_share, seed=5)
+    fake_env = {
+        "FAKE_CHAT_LATENCY": str(args.chat_latency),
+        "FAKE_PLAN_LATENCY": "1",
+        "FAKE_MODEL_SPEED": f"{SMALL}={args.small_speed}",
+    }
+    with tempfile.TemporaryDirectory() as tmp, uvicorn_server("benchmarks.fake_groq:app", fake_env) as fake_url:
+        for label, routing in (("solo modelo grande", "false"), ("router", "true")):
+            app_env = {
+                "GROQ_API_KEY": "fake-key",
+                "GROQ_BASE_URL": fake_url,
+                "DATABASE_URL": f"sqlite:///{tmp}/{routing}.db",
+                "CHAT_SUMMARY_ENABLED": "false",
+                "GROQ_HEDGE_DELAY_SECONDS": "0",
+                "MODEL_ROUTING_ENABLED": routing,
+                "GROQ_MODEL_LARGE": LARGE,
+                "GROQ_MODEL_SMALL": SMALL,
+            }
+            with uvicorn_server("app.main:app", app_env) as api_url, httpx.Client(base_url=api_url) as client, \
+                    httpx.Client(base_url=fake_url) as fake:
+                fake.post("/faults", json={"down_models": []})
+                results = _chat(api_url, messages, args.concurrency)
+                _report(label, results, client.get("/ai/models/stats").json()["models"])
+                if routing == "false":
+                    continue
+
+                client.post("/ai/generate-plan?fresh=true", json={"level": "beginner", "interests": ["Python"]}, timeout=120)
+                plan_models = {
+                    model: stats["tasks"]["plan"]
+                    for model, stats in client.get("/ai/models/stats").json()["models"].items() if "plan" in stats["tasks"]
+                }
+                print(f"{'planes':<22} {plan_models}")
+
+                fake.post("/faults", json={"down_models": [SMALL]})
+                before = client.get("/ai/models/stats").json()["models"]
+                results = _chat(api_url, [SIMPLE[0]] * 20, args.concurrency)
+                after = client.get("/ai/models/stats").json()["models"]
+                timings = [t for t, code in results if code == 200]
+                print(f"{'pequeño caído':<22} éxito {len(timings)}/{len(results)}, p50 {percentile(timings, 50):.2f}s, "
+                      f"fallbacks {after[SMALL]['fallbacks'] - before[SMALL]['fallbacks']}, "
+                      f"respondidos por el grande {after[LARGE]['calls'] - before[LARGE]['calls']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Planes por minuto para una cohorte: llamadas secuenciales a /ai/generate-plan
+frente a un único /ai/generate-plan/batch (NDJSON).
+
+La cohorte tiene perfiles repetidos (--duplicates) que el lote genera una sola vez.
+Con --rpm el API aplica GROQ_REQUESTS_PER_MINUTE y el lote no debe superarlo.
+
+Uso (desde backend/):
+    python -m benchmarks.plan_batch --items 40 --plan-latency 2 --concurrency 8
+    python -m benchmarks.plan_batch --items 40 --plan-latency 2 --concurrency 8 --rpm 60
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import uvicorn_server
+
+LEVELS = ["beginner", "intermediate", "advanced"]
+INTERESTS = [["Python", "SQL"], ["JavaScript", "React"], ["Java", "Spring"], ["Go", "Docker"], ["Python", "ML"]]
+
+
+def _cohort(items: int, duplicates: float, seed: int):
+    rng = random.Random(seed)
+    cohort = []
+    for i in range(items):
+        if cohort and rng.random() < duplicates:
+            cohort.append(dict(rng.choice(cohort)))
+            continue
+        cohort.append({
+            "level": rng.choice(LEVELS),
+            "interests": rng.choice(INTERESTS),
+            "hours_per_day": rng.randint(1, 4),
+            "goal": f"Objetivo de la persona {i}",
+            "timeline_weeks": rng.choice([12, 24, 36]),
+        })
+    return cohort
+
+
+def _sequential(client: httpx.Client, cohort, limit: int):
+    start = time.perf_counter()
+    for answers in cohort[:limit]:
+        client.post("/ai/generate-plan?fresh=true", json=answers, timeout=600).raise_for_status()
+    return limit / (time.perf_counter() - start) * 60
+
+
+def _batch(client: httpx.Client, cohort):
+    start = time.perf_counter()
+    first = None
+    done = None
+    with client.stream("POST", "/ai/generate-plan/batch?fresh=true", json={"items": cohort}, timeout=600) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            event = json.loads(line)
+            if event["type"] == "item" and first is None:
+                first = time.perf_counter() - start
+            if event["type"] == "done":
+                done = event
+    elapsed = time.perf_counter() - start
+    return len(cohort) / elapsed * 60, first, elapsed, done
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=40)
+    parser.add_argument("--duplicates", type=float, default=0.25)
+    parser.add_argument("--plan-latency", type=float, default=2)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rpm", type=int, default=0)
+    parser.add_argument("--sequential-sample", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    cohort = _cohort(args.items, args.duplicates, args.seed)
+    with tempfile.TemporaryDirectory() as tmp, uvicorn_server(
+        "benchmarks.fake_groq:app", {"FAKE_PLAN_LATENCY": str(args.plan_latency)}
+    ) as fake_url:
+        app_env = {
+            "GROQ_API_KEY": "fake-key",
+            "GROQ_BASE_URL": fake_url,
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "GROQ_MAX_CONCURRENT_BATCH": str(args.concurrency),
+            "GROQ_REQUESTS_PER_MINUTE": str(args.rpm),
+        }
+        with uvicorn_server("app.main:app", app_env) as api_url, httpx.Client(base_url=api_url) as client, \
+                httpx.Client(base_url=fake_url) as fake:
+            client.post("/chat/message", json={"message": "hola"}, timeout=60)
+            sequential = _sequential(client, cohort, args.sequential_sample)
+            before = fake.get("/stats").json()["plan_requests"]
+            batch, first, elapsed, done = _batch(client, cohort)
+            llm_calls = fake.get("/stats").json()["plan_requests"] - before
+            print(f"cohorte: {args.items} perfiles, {done['unique_profiles']} distintos; "
+                  f"concurrencia {args.concurrency}, límite {args.rpm or 'sin límite'} req/min")
+            print(f"secuencial: {sequential:.1f} planes/min (muestra de {args.sequential_sample})")
+            print(f"lote:       {batch:.1f} planes/min, primer plan en {first:.2f}s, total {elapsed:.2f}s, "
+                  f"{llm_calls} llamadas al LLM, {len(done['plans'])} filas guardadas")
+            print(client.get("/ai/limits/stats").json())
+
+
+if __name__ == "__main__":
+    main()
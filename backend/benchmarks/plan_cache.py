@@ -0,0 +1,73 @@
+"""
+Caché de planes: latencia de aciertos, de-duplicación de peticiones concurrentes
+y llamadas reales al LLM.
+
+Fases:
+  1. N peticiones concurrentes idénticas (un solo miss; el resto esperan a la misma generación)
+  2. M peticiones secuenciales con respuestas equivalentes (mayúsculas, orden de intereses...)
+  3. M peticiones con fresh=true (sin caché)
+
+Uso (desde backend/):
+    python -m benchmarks.plan_cache --concurrent 20 --repeats 20 --plan-latency 3
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import percentile, uvicorn_server
+
+ANSWERS = {"level": "beginner", "interests": ["Python", "SQL"], "hours_per_day": 2, "goal": "Conseguir trabajo", "timeline_weeks": 24}
+EQUIVALENT = {"level": "Beginner ", "interests": ["sql", "python"], "hours_per_day": 2, "goal": "conseguir  trabajo", "timeline_weeks": 23}
+
+
+async def _timed_post(client, path, body):
+    start = time.perf_counter()
+    response = await client.post(path, json=body, timeout=300)
+    if response.status_code != 200:
+        raise RuntimeError(response.text)
+    return time.perf_counter() - start, response.headers.get("X-Plan-Cache")
+
+
+async def run(api_url, fake_url, concurrent, repeats):
+    async with httpx.AsyncClient(base_url=api_url) as client, httpx.AsyncClient(base_url=fake_url) as fake:
+        await client.post("/chat/message", json={"message": "hola"})
+
+        results = await asyncio.gather(*(_timed_post(client, "/ai/generate-plan", ANSWERS) for _ in range(concurrent)))
+        upstream = (await fake.get("/stats")).json()["plan_requests"]
+        statuses = {s: sum(1 for _, x in results if x == s) for s in {x for _, x in results}}
+        print(f"concurrentes: {concurrent} peticiones -> {upstream} llamadas al LLM, estados {statuses}, "
+              f"p50 {statistics.median(r[0] for r in results):.3f}s")
+
+        for label, path, body in (
+            ("equivalentes (caché)", "/ai/generate-plan", EQUIVALENT),
+            ("fresh=true (sin caché)", "/ai/generate-plan?fresh=true", ANSWERS),
+        ):
+            latencies = [(await _timed_post(client, path, body))[0] for _ in range(repeats)]
+            print(f"{label:<24} p50 {percentile(latencies, 50) * 1000:9.1f} ms   p99 {percentile(latencies, 99) * 1000:9.1f} ms")
+
+        stats = (await client.get("/ai/cache/stats")).json()
+        upstream = (await fake.get("/stats")).json()["plan_requests"]
+        print(f"llamadas totales al LLM: {upstream}   stats caché: {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrent", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--plan-latency", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, uvicorn_server(
+        "benchmarks.fake_groq:app", {"FAKE_PLAN_LATENCY": str(args.plan_latency)}
+    ) as fake_url:
+        app_env = {"GROQ_API_KEY": "fake-key", "GROQ_BASE_URL": fake_url, "DATABASE_URL": f"sqlite:///{tmp}/bench.db"}
+        with uvicorn_server("app.main:app", app_env) as api_url:
+            asyncio.run(run(api_url, fake_url, args.concurrent, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
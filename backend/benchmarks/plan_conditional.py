@@ -0,0 +1,74 @@
+"""
+Vistas repetidas de planes (/ai/plans y /ai/plans/{id}): bytes transferidos y latencia
+según lo que haga el cliente.
+
+- sin caché: sin Accept-Encoding ni If-None-Match y montando el cuerpo en cada petición
+  (se vacía la LRU de http_cache antes de cada una), como antes de los ETags.
+- identity / gzip / br: el cuerpo sale de la LRU de cuerpos precomprimidos por versión.
+- revalidar (304): el cliente manda el ETag que ya tiene y recibe 304 sin cuerpo.
+
+Se ejecuta en proceso (TestClient) contra una base SQLite temporal; los bytes son los del
+cuerpo tal como viaja (comprimido si lo está).
+
+Uso (desde backend/):
+    python -m benchmarks.plan_conditional --plans 20 --runs 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import percentile
+
+
+def _measure(client, path: str, headers: dict, runs: int, before=None):
+    timings, size, status = [], 0, None
+    for _ in range(runs):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        timings.append(time.perf_counter() - start)
+        size, status = response.num_bytes_downloaded, response.status_code
+    return size, status, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # La configuración se lee al importar app, así que la URL se fija antes
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+        from fastapi.testclient import TestClient
+        from app.api.http_cache import CODINGS, body_cache
+        from app.main import app
+        from benchmarks.plan_views import _seed
+
+        def clear():
+            body_cache._entries.clear()
+            body_cache._bytes = 0
+
+        with TestClient(app) as client:
+            _seed(args.plans)
+            plan_id = client.get("/ai/plans?limit=1").json()[0]["id"]
+            views = [("listado", f"/ai/plans?limit={args.plans}"), ("detalle", f"/ai/plans/{plan_id}")]
+            print(f"{'vista':<9} {'cliente':<14} {'estado':>6} {'bytes':>8} {'p50 ms':>8} {'p99 ms':>8}")
+            for view, path in views:
+                etag = client.get(path, headers={"Accept-Encoding": CODINGS[0]}).headers["etag"]
+                cases = [
+                    ("sin caché", {"Accept-Encoding": "identity"}, clear),
+                    ("identity", {"Accept-Encoding": "identity"}, None),
+                    *((coding, {"Accept-Encoding": coding}, None) for coding in reversed(CODINGS)),
+                    ("revalidar 304", {"Accept-Encoding": CODINGS[0], "If-None-Match": etag}, None),
+                ]
+                for label, headers, before in cases:
+                    size, status, timings = _measure(client, path, headers, args.runs, before)
+                    print(f"{view:<9} {label:<14} {status:>6} {size:>8} "
+                          f"{percentile(timings, 50) * 1000:>8.2f} {percentile(timings, 99) * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
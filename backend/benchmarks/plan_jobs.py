@@ -0,0 +1,83 @@
+"""
+Generación de planes síncrona frente a trabajos en segundo plano.
+
+Lanza N peticiones concurrentes a /ai/generate-plan (la petición espera al LLM) y
+otras N a /ai/jobs/generate-plan (202 inmediato + sondeo de GET /ai/jobs/{id}).
+Mide cuánto tarda el servidor en responder a la petición HTTP, que es lo que ven
+los proxies con timeout, y cuánto hasta tener el plan.
+
+Uso (desde backend/):
+    python -m benchmarks.plan_jobs --requests 20 --plan-latency 5 --workers 4
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import percentile, uvicorn_server
+
+
+async def _sync_request(client, i):
+    start = time.perf_counter()
+    response = await client.post("/ai/generate-plan?fresh=true", json={"goal": f"Objetivo {i}"}, timeout=600)
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+async def _job_request(client, i, poll_interval):
+    start = time.perf_counter()
+    response = await client.post("/ai/jobs/generate-plan?fresh=true", json={"goal": f"Objetivo {i}"})
+    response.raise_for_status()
+    accepted = time.perf_counter() - start
+    job_id = response.json()["job_id"]
+    while True:
+        job = (await client.get(f"/ai/jobs/{job_id}")).json()
+        if job["status"] in ("completed", "failed"):
+            return accepted, time.perf_counter() - start
+        await asyncio.sleep(poll_interval)
+
+
+async def run(api_url, requests, poll_interval):
+    limits = httpx.Limits(max_connections=requests * 2)
+    async with httpx.AsyncClient(base_url=api_url, limits=limits, timeout=60) as client:
+        await client.post("/chat/message", json={"message": "hola"})
+        print(f"{'modo':<10} {'respuesta p50':>14} {'respuesta máx':>14} {'plan p50':>9} {'plan máx':>9}")
+        for mode, call in (
+            ("síncrono", lambda i: _sync_request(client, i)),
+            ("trabajo", lambda i: _job_request(client, i, poll_interval)),
+        ):
+            results = await asyncio.gather(*(call(i) for i in range(requests)))
+            response_times = [r[0] for r in results]
+            plan_times = [r[1] for r in results]
+            print(f"{mode:<10} {percentile(response_times, 50):>13.3f}s {max(response_times):>13.3f}s "
+                  f"{percentile(plan_times, 50):>8.2f}s {max(plan_times):>8.2f}s")
+        print((await client.get("/ai/jobs/stats")).json())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--plan-latency", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, uvicorn_server(
+        "benchmarks.fake_groq:app", {"FAKE_PLAN_LATENCY": str(args.plan_latency)}
+    ) as fake_url:
+        app_env = {
+            "GROQ_API_KEY": "fake-key",
+            "GROQ_BASE_URL": fake_url,
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "JOB_QUEUE_WORKERS": str(args.workers),
+            "GROQ_MAX_CONCURRENT_PLANS": str(args.workers),
+        }
+        with uvicorn_server("app.main:app", app_env) as api_url:
+            asyncio.run(run(api_url, args.requests, args.poll_interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Planes inválidos (una fase sin proyectos o con pocos learning_items, JSON cortado):
+regenerar el plan entero desde el cliente frente a reparar solo lo que falla.
+
+Sin reparación (PLAN_REPAIR_ENABLED=false) un plan inválido devuelve 500 y el cliente
+repite la petición (hasta --attempts veces). Con reparación, la API regenera la fase o
+el campo con un prompt pequeño. Se mide la latencia hasta tener un plan válido y los
+tokens que llegan al Groq falso por plan.
+
+Uso (desde backend/):
+    python -m benchmarks.plan_repair --plans 30 --malformed 0.3 --truncated 0.1
+"""
+import argparse
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import percentile, uvicorn_server
+from benchmarks.plan_batch import _cohort
+
+
+def _generate(client: httpx.Client, answers: dict, attempts: int):
+    start = time.perf_counter()
+    for attempt in range(1, attempts + 1):
+        response = client.post("/ai/generate-plan?fresh=true", json=answers, timeout=120)
+        if response.status_code == 200:
+            return time.perf_counter() - start, attempt
+    return None, attempts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=30)
+    parser.add_argument("--malformed", type=float, default=0.3)
+    parser.add_argument("--truncated", type=float, default=0.1)
+    parser.add_argument("--plan-latency", type=float, default=2)
+    parser.add_argument("--attempts", type=int, default=5)
+    args = parser.parse_args()
+
+    cohort = _cohort(args.plans, 0, seed=7)
+    fake_env = {
+        "FAKE_PLAN_LATENCY": str(args.plan_latency),
+        "FAKE_MALFORMED_RATE": str(args.malformed),
+        "FAKE_TRUNCATED_RATE": str(args.truncated),
+    }
+    print(f"{args.plans} planes, {args.malformed:.0%} con una fase incompleta, {args.truncated:.0%} cortados")
+    with tempfile.TemporaryDirectory() as tmp, uvicorn_server("benchmarks.fake_groq:app", fake_env) as fake_url:
+        for label, enabled in (("regenerar todo", "false"), ("reparar", "true")):
+            app_env = {
+                "GROQ_API_KEY": "fake-key",
+                "GROQ_BASE_URL": fake_url,
+                "DATABASE_URL": f"sqlite:///{tmp}/{enabled}.db",
+                "PLAN_CACHE_ENABLED": "false",
+                "PLAN_REPAIR_ENABLED": enabled,
+            }
+            with uvicorn_server("app.main:app", app_env) as api_url, httpx.Client(base_url=api_url) as client, \
+                    httpx.Client(base_url=fake_url) as fake:
+                before = fake.get("/stats").json()
+                results = [_generate(client, answers, args.attempts) for answers in cohort]
+                after = fake.get("/stats").json()
+                timings = [elapsed for elapsed, _ in results if elapsed is not None]
+                tokens = sum(after[key] - before[key] for key in ("prompt_tokens", "completion_tokens"))
+                retries = sum(attempt - 1 for _, attempt in results)
+                print(f"{label:<15} válidos {len(timings)}/{len(results)}, p50 {percentile(timings, 50):.2f}s, "
+                      f"p95 {percentile(timings, 95):.2f}s, reintentos del cliente {retries}, "
+                      f"{tokens // len(results)} tokens/plan")
+                if enabled == "true":
+                    print(client.get("/ai/repair/stats").json())
+
+
+if __name__ == "__main__":
+    main()
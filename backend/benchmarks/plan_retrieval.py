@@ -0,0 +1,96 @@
+"""
+Generar el plan entero frente a adaptar el plan guardado más parecido (PLAN_RETRIEVAL_ENABLED).
+
+Primero se generan --corpus planes completos (quedan guardados e indexados en plan_search).
+Después se piden --plans planes de perfiles parecidos a los del corpus (mismos intereses y
+nivel, objetivo y plazo distintos) alternando una API sin recuperación y otra con ella,
+las dos sobre la misma base de datos. Se mide la latencia hasta tener el plan y los tokens
+de salida que llegan al Groq falso por plan.
+
+Uso (desde backend/):
+    python -m benchmarks.plan_retrieval --corpus 30 --plans 30 --plan-latency 4
+"""
+import argparse
+import random
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import percentile, uvicorn_server
+from benchmarks.plan_batch import INTERESTS, LEVELS
+
+GOALS = [
+    "Conseguir mi primer trabajo como desarrollador backend",
+    "Cambiar de carrera a programación",
+    "Crear APIs y automatizar tareas en mi empresa",
+    "Prepararme para entrevistas técnicas",
+]
+
+
+def _profiles(count: int, rng: random.Random):
+    return [
+        {
+            "level": rng.choice(LEVELS),
+            "interests": rng.choice(INTERESTS),
+            "hours_per_day": rng.randint(1, 4),
+            "goal": rng.choice(GOALS),
+            "timeline_weeks": rng.choice([12, 24, 36]),
+        }
+        for _ in range(count)
+    ]
+
+
+def _generate(client: httpx.Client, answers: dict) -> float:
+    start = time.perf_counter()
+    client.post("/ai/generate-plan?fresh=true", json=answers, timeout=120).raise_for_status()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=int, default=30)
+    parser.add_argument("--plans", type=int, default=30)
+    parser.add_argument("--plan-latency", type=float, default=4)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    corpus, workload = _profiles(args.corpus, rng), _profiles(args.plans, rng)
+    fake_env = {"FAKE_PLAN_LATENCY": str(args.plan_latency)}
+    with tempfile.TemporaryDirectory() as tmp, uvicorn_server("benchmarks.fake_groq:app", fake_env) as fake_url:
+        base_env = {
+            "GROQ_API_KEY": "fake-key",
+            "GROQ_BASE_URL": fake_url,
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "PLAN_CACHE_ENABLED": "false",
+        }
+        with uvicorn_server("app.main:app", {**base_env, "PLAN_RETRIEVAL_ENABLED": "false"}) as full_url, \
+                uvicorn_server("app.main:app", {**base_env, "PLAN_RETRIEVAL_ENABLED": "true"}) as retrieval_url, \
+                httpx.Client(base_url=full_url) as full, httpx.Client(base_url=retrieval_url) as retrieval, \
+                httpx.Client(base_url=fake_url) as fake:
+            start = time.perf_counter()
+            for answers in corpus:
+                _generate(full, answers)
+            print(f"Corpus: {args.corpus} planes generados e indexados en {time.perf_counter() - start:.1f}s")
+
+            results = {"generación completa": ([], 0), "adaptar referencia": ([], 0)}
+            # Intercaladas: cada perfil se pide a las dos APIs seguidas
+            for answers in workload:
+                for label, client in (("generación completa", full), ("adaptar referencia", retrieval)):
+                    before = fake.get("/stats").json()["completion_tokens"]
+                    elapsed = _generate(client, answers)
+                    timings, tokens = results[label]
+                    timings.append(elapsed)
+                    results[label] = (timings, tokens + fake.get("/stats").json()["completion_tokens"] - before)
+
+            print(f"\n{'modo':<22} {'p50 s':>7} {'p99 s':>7} {'tokens de salida/plan':>22}")
+            for label, (timings, tokens) in results.items():
+                print(f"{label:<22} {percentile(timings, 50):>7.2f} {percentile(timings, 99):>7.2f} "
+                      f"{tokens // len(timings):>22}")
+            print(retrieval.get("/ai/retrieval/stats").json())
+            search = full.get("/ai/plans/search", params={"q": "python sql backend", "limit": 3})
+            print(f"GET /ai/plans/search: {search.status_code}, {len(search.json())} resultados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Tamaño de respuesta y tiempo de las vistas de planes: listado, detalle completo,
+detalle con máscara de campos y una sola fase. Como referencia, "listado completo"
+serializa N CareerPlanResponse con el plan entero, que es lo que costaba listar
+planes con el JSON completo en la fila.
+
+Se ejecuta en proceso (TestClient) contra una base SQLite temporal.
+
+Uso (desde backend/):
+    python -m benchmarks.plan_views --plans 20 --runs 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+
+def _seed(count: int):
+    from app.database import SessionLocal
+    from app import models
+    from app.services.plan_storage import store_plan
+    from benchmarks.fake_groq import sample_plan
+
+    async def seed():
+        async with SessionLocal() as db:
+            user = models.User(email="bench@plan-carrera.local", name="Bench")
+            db.add(user)
+            await db.flush()
+            for n in range(count):
+                plan = sample_plan(phases=5)
+                career_plan = models.CareerPlan(user_id=user.id, title=f"{plan['plan_title']} {n}", timeline_weeks=plan["total_weeks"])
+                db.add(career_plan)
+                await db.flush()
+                store_plan(db, career_plan, plan)
+            await db.commit()
+            return user.id
+
+    return asyncio.run(seed())
+
+
+def _full_list(count: int):
+    """Referencia: el listado con el plan completo de cada fila."""
+    from app.schemas import CareerPlanResponse
+    from benchmarks.fake_groq import sample_plan
+
+    plans = [
+        CareerPlanResponse(id=n, user_id=1, title="Plan", generated_plan=sample_plan(phases=5))
+        for n in range(count)
+    ]
+    start = time.perf_counter()
+    body = "[" + ",".join(plan.model_dump_json() for plan in plans) + "]"
+    return len(body.encode("utf-8")), time.perf_counter() - start
+
+
+def _storage_sizes():
+    """Bytes por plan: JSON completo en la fila frente a cabecera + fases comprimidas."""
+    import json
+    from app.services.plan_storage import split_plan
+    from benchmarks.fake_groq import sample_plan
+
+    plan = sample_plan(phases=5)
+    outline, phases = split_plan(plan)
+    stored = len(json.dumps(outline, ensure_ascii=False)) + sum(
+        len(p["content"]) + len((p["title"] + (p["description"] or "")).encode("utf-8")) for p in phases
+    )
+    return len(json.dumps(plan, ensure_ascii=False).encode("utf-8")), stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # La configuración se lee al importar app, así que la URL se fija antes
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        with TestClient(app) as client:
+            _seed(args.plans)
+            plan_id = client.get("/ai/plans?limit=1").json()[0]["id"]
+            cases = [
+                ("listado", f"/ai/plans?limit={args.plans}"),
+                ("detalle completo", f"/ai/plans/{plan_id}"),
+                ("detalle títulos", f"/ai/plans/{plan_id}?fields=plan_title,phases.title"),
+                ("una fase", f"/ai/plans/{plan_id}/phases/3"),
+                ("fase: proyectos", f"/ai/plans/{plan_id}/phases/3?fields=title,projects.title"),
+            ]
+            raw, stored = _storage_sizes()
+            print(f"almacenamiento por plan: JSON {raw} B -> cabecera + fases zlib {stored} B")
+            print(f"{'vista':<20} {'bytes':>9} {'p50 ms':>8}")
+            size, elapsed = _full_list(args.plans)
+            print(f"{'listado completo*':<20} {size:>9} {elapsed * 1000:>8.2f}  (*solo serialización)")
+            for name, path in cases:
+                timings = []
+                for _ in range(args.runs):
+                    start = time.perf_counter()
+                    response = client.get(path)
+                    timings.append(time.perf_counter() - start)
+                    response.raise_for_status()
+                print(f"{name:<20} {len(response.content):>9} {statistics.median(timings) * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Progreso del usuario en el contexto del chat: leer el resumen mantenido en cada escritura
+(plan_progress, una consulta por clave) frente a calcularlo bajo demanda en cada turno
+(contar fases y proyectos completados y descomprimir las fases para los totales).
+
+Siembra --users usuarios con un plan activo de 5 fases y progreso aleatorio en una base
+SQLite temporal y mide en proceso:
+1. p50/p99 de construir el user_context del chat de un usuario al azar, de las dos formas.
+2. p50/p99 de una escritura de progreso (proyecto marcado/desmarcado) con sus contadores.
+3. Lo que tarda el comprobador de consistencia sobre todos los planes (debe dar 0 descuadres).
+
+Uso (desde backend/):
+    python -m benchmarks.progress --users 100000 --samples 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import percentile
+
+PHASES = 5
+
+
+async def _seed(users: int, rng: random.Random):
+    from sqlalchemy import insert
+
+    from app import models
+    from app.database import SessionLocal
+    from app.migrations import run_migrations
+    from app.services.plan_storage import decompress_json, split_plan
+    from benchmarks.fake_groq import sample_plan
+    from benchmarks.seed import _batches
+
+    await run_migrations()
+    outline, phase_rows = split_plan(sample_plan(phases=PHASES))
+    projects_per_phase = [len(decompress_json(row["content"]).get("projects") or []) for row in phase_rows]
+    async with SessionLocal() as db:
+        for batch in _batches(range(1, users + 1)):
+            await db.execute(insert(models.User), [
+                {"id": n, "email": f"bench{n}@plan-carrera.local", "name": f"Usuario {n}"} for n in batch
+            ])
+            # Plan n del usuario n: ids conocidos sin leerlos de vuelta
+            await db.execute(insert(models.CareerPlan), [
+                {"id": n, "user_id": n, "title": outline["plan_title"], "generated_plan": outline, "is_active": True}
+                for n in batch
+            ])
+            await db.execute(insert(models.PlanPhase), [{"plan_id": n, **row} for n in batch for row in phase_rows])
+            phase_progress, project_progress, summaries = [], [], []
+            for n in batch:
+                done_phases = rng.randint(0, PHASES)
+                phase_progress += [
+                    {"user_id": n, "plan_id": n, "position": p, "completed": True} for p in range(1, done_phases + 1)
+                ]
+                done_projects = [
+                    (p, i) for p in range(1, PHASES + 1) for i in range(1, projects_per_phase[p - 1] + 1)
+                    if rng.random() < 0.3
+                ]
+                project_progress += [
+                    {"user_id": n, "plan_id": n, "position": p, "project_index": i, "completed": True}
+                    for p, i in done_projects
+                ]
+                current = phase_rows[done_phases] if done_phases < PHASES else None
+                summaries.append({
+                    "plan_id": n, "user_id": n, "total_phases": PHASES, "completed_phases": done_phases,
+                    "total_projects": sum(projects_per_phase), "completed_projects": len(done_projects),
+                    "current_phase": current["position"] if current else None,
+                    "current_phase_title": current["title"] if current else None,
+                })
+            for model, rows in ((models.PhaseProgress, phase_progress), (models.ProjectProgress, project_progress),
+                                (models.PlanProgress, summaries)):
+                if rows:
+                    await db.execute(insert(model), rows)
+        await db.commit()
+
+
+async def _on_demand(db, user_id: int) -> dict:
+    """Lo que haría el chat sin resumen: agregar el detalle y descomprimir las fases para los totales."""
+    from sqlalchemy import func, select
+
+    from app import models
+    from app.services.plan_storage import decompress_json, load_phases
+
+    plan = (await db.execute(
+        select(models.CareerPlan.id, models.CareerPlan.title)
+        .where(models.CareerPlan.user_id == user_id, models.CareerPlan.is_active == True).limit(1)
+    )).first()
+    if plan is None:
+        return {}
+    done = set((await db.execute(
+        select(models.PhaseProgress.position)
+        .where(models.PhaseProgress.plan_id == plan.id, models.PhaseProgress.completed == True)
+    )).scalars())
+    completed_projects = (await db.execute(
+        select(func.count()).select_from(models.ProjectProgress)
+        .where(models.ProjectProgress.plan_id == plan.id, models.ProjectProgress.completed == True)
+    )).scalar_one()
+    phases = await load_phases(db, plan.id)
+    total_projects = sum(len(decompress_json(row.content).get("projects") or []) for row in phases)
+    current = next((row for row in phases if row.position not in done), None)
+    phase_pct = len(done) / len(phases) * 100 if phases else 0
+    project_pct = completed_projects / total_projects * 100 if total_projects else 0
+    return {
+        "plan_title": plan.title,
+        "current_phase": current.title if current else "Plan completado",
+        "progress_percentage": round((phase_pct + project_pct) / 2),
+        "completed_projects": completed_projects,
+    }
+
+
+async def _timed(call, user_ids):
+    from app.database import SessionLocal
+
+    timings = []
+    async with SessionLocal() as db:
+        for user_id in user_ids:
+            start = time.perf_counter()
+            await call(db, user_id)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def _run(args):
+    from app.database import SessionLocal, engine
+    from app.services import progress
+
+    rng = random.Random(42)
+    start = time.perf_counter()
+    await _seed(args.users, rng)
+    print(f"Sembrados {args.users} usuarios en {time.perf_counter() - start:.1f}s")
+
+    sample = [rng.randint(1, args.users) for _ in range(args.samples)]
+    async with SessionLocal() as db:
+        mismatched = [u for u in sample[:200] if await progress.load_progress_context(db, u) != await _on_demand(db, u)]
+    print(f"user_context igual en las dos formas: {200 - len(mismatched)}/200")
+
+    timings = {"resumen (plan_progress)": [], "bajo demanda": []}
+    # Rondas intercaladas: la caché de páginas de SQLite favorece por igual a las dos
+    for round_ids in (sample[i::4] for i in range(4)):
+        timings["resumen (plan_progress)"] += await _timed(progress.load_progress_context, round_ids)
+        timings["bajo demanda"] += await _timed(_on_demand, round_ids)
+
+    async def toggle(db, user_id):
+        await progress.set_project_progress(db, user_id, user_id, 3, 2, rng.random() < 0.5)
+
+    timings["escritura de progreso"] = await _timed(toggle, sample[: args.samples // 4])
+
+    print(f"\n{'operación':<26} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, values in timings.items():
+        print(f"{label:<26} {percentile(values, 50) * 1000:>8.3f} {percentile(values, 99) * 1000:>8.3f}")
+
+    async with SessionLocal() as db:
+        start = time.perf_counter()
+        report = await progress.check_progress(db)
+    print(f"\nComprobador: {report['checked']} planes en {time.perf_counter() - start:.1f}s, "
+          f"{len(report['mismatched'])} descuadres, {len(report['missing'])} sin resumen")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--samples", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+        asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
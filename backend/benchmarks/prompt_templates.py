@@ -0,0 +1,98 @@
+"""
+Plantillas de prompts: tokens por tarea en modo full y compact, y efecto del prefijo
+estable en la caché de prompts del proveedor.
+
+1. En proceso: tokens estimados de cada prompt y tiempo de render por modo.
+2. Contra el Groq falso con FAKE_PREFILL_TOKENS_PER_SECOND: planes para perfiles
+   distintos; se mide la fracción de tokens de prompt cacheados (prefijo común con
+   prompts anteriores) y la latencia. Con --app-dir se añade como referencia otra
+   copia del backend (p. ej. el commit anterior, con el perfil al principio del prompt):
+    git worktree add /tmp/before <commit> && python -m benchmarks.prompt_templates --app-dir /tmp/before/backend
+
+Uso (desde backend/):
+    python -m benchmarks.prompt_templates --plans 12
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import BACKEND_DIR, percentile, uvicorn_server
+from benchmarks.plan_batch import _cohort
+
+CHAT_CONTEXT = {
+    "plan_title": "De cero a desarrollador backend", "current_phase": "Fase 2: APIs",
+    "progress_percentage": 35, "completed_projects": 2, "recent_challenges": "Autenticación con JWT",
+}
+
+
+def _render_stats(mode: str):
+    from app.services.chat_context import estimate_tokens
+    from app.services.prompts import PromptLibrary
+
+    library = PromptLibrary(mode)
+    samples = {
+        "plan": _cohort(1, 0, seed=1)[0] | {"interests": "Python, SQL", "previous_experience": "Ninguna", "learning_style": "mixto"},
+        "plan_from_chat": {"user_message": "Quiero aprender SQL y Python para ciencia de datos"},
+        "chat": CHAT_CONTEXT,
+        "summary": {"max_words": 250, "previous_summary": "(vacío)", "transcript": "Usuario: hola\nMentor: ¡hola!"},
+    }
+    rows = {}
+    for name, values in samples.items():
+        start = time.perf_counter()
+        for _ in range(1000):
+            messages = library.render(name, **values)
+        render_us = (time.perf_counter() - start) / 1000 * 1e6
+        rows[name] = (sum(estimate_tokens(m["content"]) for m in messages), render_us)
+    return rows
+
+
+def _plans(label: str, fake_url: str, tmp: str, cohort, app_dir: Path, env: dict):
+    app_env = {
+        "GROQ_API_KEY": "fake-key",
+        "GROQ_BASE_URL": fake_url,
+        "DATABASE_URL": f"sqlite:///{tmp}/{label}.db",
+        "PLAN_CACHE_ENABLED": "false",
+        **env,
+    }
+    with uvicorn_server("app.main:app", app_env, cwd=app_dir) as api_url, httpx.Client(base_url=api_url) as client, \
+            httpx.Client(base_url=fake_url) as fake:
+        before = fake.get("/stats").json()
+        timings = []
+        for answers in cohort:
+            start = time.perf_counter()
+            client.post("/ai/generate-plan", json=answers, timeout=120).raise_for_status()
+            timings.append(time.perf_counter() - start)
+        after = fake.get("/stats").json()
+    prompt = after["prompt_tokens"] - before["prompt_tokens"]
+    cached = after["cached_prompt_tokens"] - before["cached_prompt_tokens"]
+    print(f"{label:<12} {prompt // len(cohort):>8} {cached / prompt:>8.0%} {percentile(timings, 50):>8.2f} "
+          f"{percentile(timings, 95):>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=12)
+    parser.add_argument("--prefill-rate", type=float, default=1000, help="tokens de prompt por segundo del Groq falso")
+    parser.add_argument("--app-dir", type=Path, default=None)
+    args = parser.parse_args()
+
+    print(f"{'prompt':<16} {'full tok':>9} {'compact tok':>12} {'render µs':>10}")
+    full, compact = _render_stats("full"), _render_stats("compact")
+    for name in full:
+        print(f"{name:<16} {full[name][0]:>9} {compact[name][0]:>12} {full[name][1]:>10.1f}")
+
+    cohort = _cohort(args.plans, 0, seed=11)
+    fake_env = {"FAKE_PLAN_LATENCY": "0.5", "FAKE_PREFILL_TOKENS_PER_SECOND": str(args.prefill_rate)}
+    with tempfile.TemporaryDirectory() as tmp, uvicorn_server("benchmarks.fake_groq:app", fake_env) as fake_url:
+        print(f"\n{'planes':<12} {'prompt':>8} {'cacheado':>8} {'p50 s':>8} {'p95 s':>8}")
+        if args.app_dir:
+            _plans("anterior", fake_url, tmp, cohort, args.app_dir, {})
+        _plans("full", fake_url, tmp, cohort, BACKEND_DIR, {"PROMPT_MODE": "full"})
+        _plans("compact", fake_url, tmp, cohort, BACKEND_DIR, {"PROMPT_MODE": "compact"})
+
+
+if __name__ == "__main__":
+    main()
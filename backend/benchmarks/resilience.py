@@ -0,0 +1,118 @@
+"""
+Comportamiento de /chat/message frente a un Groq falso que inyecta fallos, con la
+capa de resiliencia (reintentos con backoff, circuito, hedging) y sin ella
+(GROQ_MAX_RETRIES=0, circuito y hedging desactivados).
+
+Escenarios:
+  errores  FAKE_ERROR_RATE de 500 y FAKE_RATE_LIMIT_RATE de 429: tasa de éxito.
+  cola     una fracción de respuestas muy lentas: p50/p99 con y sin hedging.
+  caída    Groq devuelve 503 a todo y luego se recupera: latencia de los fallos,
+           llamadas que llegan al proveedor y tiempo hasta volver a responder.
+
+Uso (desde backend/):
+    python -m benchmarks.resilience --requests 60
+"""
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from benchmarks.common import percentile, uvicorn_server
+
+RESILIENT = {
+    "GROQ_MAX_RETRIES": "3",
+    "GROQ_RETRY_BASE_DELAY_SECONDS": "0.2",
+    "GROQ_RETRY_MAX_DELAY_SECONDS": "2",
+    "GROQ_CIRCUIT_FAILURE_THRESHOLD": "5",
+    "GROQ_CIRCUIT_RESET_SECONDS": "2",
+    "GROQ_HEDGE_DELAY_SECONDS": "0.8",
+}
+BASELINE = {
+    "GROQ_MAX_RETRIES": "0",
+    "GROQ_CIRCUIT_FAILURE_THRESHOLD": "0",
+    "GROQ_HEDGE_DELAY_SECONDS": "0",
+}
+
+
+def _chat(api_url: str, count: int, concurrency: int):
+    """(latencia, código HTTP) de `count` mensajes de chat."""
+    def one(n):
+        with httpx.Client(base_url=api_url) as client:
+            start = time.perf_counter()
+            response = client.post("/chat/message", json={"message": f"¿Qué es una API? #{n}"}, timeout=120)
+            return time.perf_counter() - start, response.status_code
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(one, range(count)))
+
+
+def _run(fake_url: str, tmp: str, name: str, env: dict, scenario, args):
+    app_env = {
+        "GROQ_API_KEY": "fake-key",
+        "GROQ_BASE_URL": fake_url,
+        "DATABASE_URL": f"sqlite:///{tmp}/{name}.db",
+        "CHAT_SUMMARY_ENABLED": "false",
+        **env,
+    }
+    with uvicorn_server("app.main:app", app_env) as api_url, httpx.Client(base_url=fake_url) as fake:
+        fake.post("/faults", json={"error_rate": 0, "rate_limit_rate": 0, "slow_rate": 0, "outage": False})
+        _chat(api_url, 1, 1)  # usuario de desarrollo y conexiones calientes
+        return scenario(api_url, fake, args)
+
+
+def _errors(api_url, fake, args):
+    fake.post("/faults", json={"error_rate": args.error_rate, "rate_limit_rate": args.rate_limit_rate, "retry_after": 0.5})
+    results = _chat(api_url, args.requests, args.concurrency)
+    ok = sum(1 for _, code in results if code == 200)
+    return f"éxito {ok}/{len(results)} ({ok / len(results):.0%}), p99 {percentile([t for t, _ in results], 99):.2f}s"
+
+
+def _tail(api_url, fake, args):
+    fake.post("/faults", json={"slow_rate": args.slow_rate, "slow_latency": args.slow_latency})
+    before = fake.get("/stats").json()["chat_requests"]
+    timings = [t for t, code in _chat(api_url, args.requests, args.concurrency) if code == 200]
+    calls = fake.get("/stats").json()["chat_requests"] - before
+    return (f"p50 {percentile(timings, 50):.2f}s, p99 {percentile(timings, 99):.2f}s, "
+            f"{calls} llamadas para {args.requests} mensajes")
+
+
+def _outage(api_url, fake, args):
+    fake.post("/faults", json={"outage": True})
+    before = fake.get("/stats").json()["requests"]
+    results = _chat(api_url, args.requests, args.concurrency)
+    calls = fake.get("/stats").json()["requests"] - before
+    failed = [t for t, code in results if code != 200]
+    codes = sorted({code for _, code in results})
+    fake.post("/faults", json={"outage": False})
+    start = time.perf_counter()
+    while _chat(api_url, 1, 1)[0][1] != 200:
+        time.sleep(0.2)
+    recovered = time.perf_counter() - start
+    return (f"fallos {len(failed)} (HTTP {codes}), p50 {percentile(failed, 50) * 1000:.0f}ms, "
+            f"{calls} llamadas al proveedor, recuperado en {recovered:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.1)
+    parser.add_argument("--slow-rate", type=float, default=0.1)
+    parser.add_argument("--slow-latency", type=float, default=4)
+    args = parser.parse_args()
+
+    scenarios = [("errores", _errors), ("cola", _tail), ("caída", _outage)]
+    with tempfile.TemporaryDirectory() as tmp, uvicorn_server(
+        "benchmarks.fake_groq:app", {"FAKE_CHAT_LATENCY": "0.3"}
+    ) as fake_url:
+        for name, scenario in scenarios:
+            for label, env in (("sin resiliencia", BASELINE), ("con resiliencia", RESILIENT)):
+                result = _run(fake_url, tmp, f"{name}-{label[:3]}", env, scenario, args)
+                print(f"{name:<8} {label:<16} {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Datos realistas para los benchmarks: usuarios con planes (fases comprimidas, como los
+guarda la API), historial de chat y resumen de conversación, a varias escalas.
+
+Usa los modelos y el engine de la app, así que vale para SQLite y Postgres según
+DATABASE_URL. Con --reset borra TODAS las tablas antes de sembrar (solo para bases de
+datos de pruebas). Imprime en stdout un JSON con las filas creadas y, con --tokens N,
+JWT de N usuarios sembrados (firmados con el SECRET_KEY del entorno).
+
+Uso (desde backend/):
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.seed --scale medium --tokens 50
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+
+
+@dataclass(frozen=True)
+class Scale:
+    users: int
+    plans_per_user: int
+    messages_per_user: int
+
+
+SCALES = {
+    "small": Scale(users=20, plans_per_user=1, messages_per_user=20),
+    "medium": Scale(users=200, plans_per_user=2, messages_per_user=100),
+    "large": Scale(users=2000, plans_per_user=3, messages_per_user=300),
+}
+
+QUESTIONS = [
+    "¿Qué diferencia hay entre una lista y una tupla?",
+    "No entiendo bien los decoradores, ¿me lo explicas con un ejemplo?",
+    "¿Qué proyecto me recomiendas para practicar SQL?",
+    "¿Cómo preparo una entrevista técnica junior?",
+    "¿Vale la pena aprender Docker ahora o después?",
+]
+ANSWER = (
+    "Buena pregunta. Te propongo ir paso a paso: primero repasa el concepto con un ejemplo "
+    "pequeño, luego aplícalo en el proyecto de la fase actual y anota las dudas que salgan. "
+) * 3
+
+BATCH_SIZE = 5000
+
+
+def _batches(rows, size: int = BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def seed(scale: Scale, reset: bool = False, tokens: int = 0) -> dict:
+    from sqlalchemy import func, insert, select
+
+    from app import models
+    from app.database import Base, SessionLocal, engine
+    from app.migrations import run_migrations
+    from app.services.auth import create_access_token
+    from app.services.plan_storage import split_plan
+    from benchmarks.fake_groq import sample_plan
+
+    if reset:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+    await run_migrations()
+
+    rng = random.Random(42)
+    # Unos pocos planes distintos, comprimidos una vez (comprimir es lo caro de sembrar)
+    samples = [split_plan(sample_plan(phases=phases)) for phases in (4, 5, 6)]
+    start = time.perf_counter()
+    async with SessionLocal() as db:
+        await db.execute(insert(models.User), [
+            {"email": f"bench{u}@plan-carrera.local", "name": f"Usuario {u}"} for u in range(scale.users)
+        ])
+        user_ids = list((await db.execute(
+            select(models.User.id).where(models.User.email.like("bench%@plan-carrera.local")).order_by(models.User.id)
+        )).scalars())
+
+        plans = phases = 0
+        for user_batch in _batches(user_ids, 500):
+            plan_rows, plan_phases = [], []
+            for user_id in user_batch:
+                for n in range(scale.plans_per_user):
+                    outline, rows = rng.choice(samples)
+                    plan_rows.append({
+                        "user_id": user_id,
+                        "title": f"{outline['plan_title']} {n + 1}",
+                        "timeline_weeks": outline.get("total_weeks"),
+                        "generated_plan": outline,
+                        # Solo el último plan del usuario queda activo (contexto del chat)
+                        "is_active": n == scale.plans_per_user - 1,
+                        "status": "completed",
+                    })
+                    plan_phases.append(rows)
+            plan_ids = list((await db.execute(insert(models.CareerPlan).returning(models.CareerPlan.id), plan_rows)).scalars())
+            phase_rows = [{"plan_id": plan_id, **row} for plan_id, rows in zip(plan_ids, plan_phases) for row in rows]
+            await db.execute(insert(models.PlanPhase), phase_rows)
+            plans += len(plan_rows)
+            phases += len(phase_rows)
+
+        base = datetime.now(timezone.utc) - timedelta(seconds=scale.messages_per_user * 60)
+
+        def message_rows():
+            for user_id in user_ids:
+                for i in range(scale.messages_per_user):
+                    yield {
+                        "user_id": user_id,
+                        "role": "user" if i % 2 == 0 else "assistant",
+                        "content": rng.choice(QUESTIONS) if i % 2 == 0 else ANSWER,
+                        "timestamp": base + timedelta(seconds=60 * i),
+                    }
+
+        messages = 0
+        for batch in _batches(message_rows()):
+            await db.execute(insert(models.ChatMessage), batch)
+            messages += len(batch)
+
+        # Resumen de la conversación de quien tiene historial largo (como tras varios turnos de chat)
+        last_ids = dict((await db.execute(
+            select(models.ChatMessage.user_id, func.max(models.ChatMessage.id))
+            .where(models.ChatMessage.user_id.in_(user_ids))
+            .group_by(models.ChatMessage.user_id)
+        )).all()) if scale.messages_per_user >= 20 else {}
+        summaries = [
+            {"user_id": user_id, "summary": "El usuario está en la fase 2 y pregunta por Python, SQL y entrevistas.",
+             "last_message_id": message_id}
+            for user_id, message_id in last_ids.items()
+        ]
+        for batch in _batches(summaries):
+            await db.execute(insert(models.ConversationSummary), batch)
+        await db.commit()
+
+    await engine.dispose()
+    return {
+        "scale": asdict(scale),
+        "rows": {"users": len(user_ids), "plans": plans, "plan_phases": phases,
+                 "chat_messages": messages, "conversation_summaries": len(summaries)},
+        "seconds": round(time.perf_counter() - start, 2),
+        "tokens": [create_access_token(user_id) for user_id in user_ids[:tokens]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--reset", action="store_true", help="borra todas las tablas antes de sembrar")
+    parser.add_argument("--tokens", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(seed(SCALES[args.scale], args.reset, args.tokens))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Precisión y latencia de la caché semántica del chat sobre un corpus sintético en español.
+
+Para cada intención se guarda una pregunta canónica; el resto de paráfrasis deben
+acertar (misma intención) y las preguntas de control no deben recibir respuesta
+cacheada. La caché se rellena además con preguntas de relleno para medir la
+latencia de búsqueda con muchas entradas. Las preguntas canónicas las guarda un usuario
+y las paráfrasis las busca otro (entradas compartidas).
+
+Con --real las conversaciones pasan por el camino de producción: API con la caché
+activada contra el Groq falso, usuarios sembrados con historial que crece en cada
+turno y una mezcla de preguntas tipo FAQ (paráfrasis de INTENTS), preguntas de
+seguimiento ("¿y eso...?") y preguntas personales repetidas. Se informa la tasa de
+aciertos real (/chat/cache/stats) y las llamadas al LLM que se ahorran.
+
+Uso (desde backend/):
+    python -m benchmarks.semantic_cache --thresholds 0.6 0.7 0.8 0.9 --filler 2000
+    python -m benchmarks.semantic_cache --real --users 20 --turns 30
+"""
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+
+import httpx
+
+from app.config import settings
+from app.services.semantic_cache import SemanticCache
+from benchmarks.common import percentile, uvicorn_process, uvicorn_server
+from benchmarks.suite import SECRET_KEY, _seed
+
+INTENTS = {
+    "api": [
+        "¿Qué es una API?", "que es una api", "Qué es una API exactamente?", "¿me explicas qué es una API?",
+        "no entiendo qué es una API", "que significa API",
+    ],
+    "github_upload": [
+        "¿Cómo subo mi proyecto a GitHub?", "como subo mi proyecto a github", "¿Cómo puedo subir un proyecto a GitHub?",
+        "cómo subir mi proyecto a github", "pasos para subir mi proyecto a GitHub",
+    ],
+    "git_vs_github": [
+        "¿Cuál es la diferencia entre Git y GitHub?", "diferencia entre git y github", "¿Git y GitHub son lo mismo?",
+        "en qué se diferencian git y github",
+    ],
+    "python_install": [
+        "¿Cómo instalo Python en Windows?", "como instalo python en windows", "cómo instalar Python en Windows",
+        "instalar python en windows 11",
+    ],
+    "sql_join": [
+        "¿Qué es un JOIN en SQL?", "que es un join en sql", "¿para qué sirve un JOIN en SQL?", "explícame los JOIN de SQL",
+    ],
+    "venv": [
+        "¿Qué es un entorno virtual en Python?", "que es un entorno virtual de python", "¿para qué sirve un entorno virtual en Python?",
+        "cómo creo un entorno virtual en Python",
+    ],
+    "rest": [
+        "¿Qué es una API REST?", "que es una api rest", "¿me explicas qué es REST?", "qué significa REST en una API",
+    ],
+    "first_job": [
+        "¿Cómo consigo mi primer trabajo como programador?", "como consigo mi primer trabajo de programador",
+        "consejos para conseguir mi primer empleo como programador", "¿cómo encuentro mi primer trabajo en programación?",
+    ],
+    "portfolio": [
+        "¿Qué proyectos pongo en mi portafolio?", "que proyectos pongo en mi portafolio",
+        "¿qué proyectos debería tener en mi portafolio?", "ideas de proyectos para mi portafolio",
+    ],
+    "list_vs_tuple": [
+        "¿Cuál es la diferencia entre una lista y una tupla en Python?", "diferencia entre lista y tupla en python",
+        "¿lista o tupla en Python?", "en qué se diferencian las listas y las tuplas de Python",
+    ],
+}
+
+NEGATIVES = [
+    "¿Qué es una clase en Python?", "¿Cómo subo una imagen a Docker Hub?", "¿Qué es un índice en SQL?",
+    "¿Cómo instalo Node en Linux?", "¿Qué es GraphQL?", "¿Cuál es la diferencia entre SQL y NoSQL?",
+    "¿Cómo preparo una entrevista técnica?", "¿Qué es un decorador en Python?", "¿Qué es una API de streaming?",
+    "¿Cómo hago un pull request?", "¿Qué es un diccionario en Python?", "¿Cómo despliego mi app en Vercel?",
+]
+
+# Dependen de la conversación: no se cachean
+FOLLOW_UPS = [
+    "¿Y eso cómo lo aplico en el proyecto de la fase?", "Explícame lo anterior con un ejemplo",
+    "¿Puedes repetir lo que dijiste sobre los commits?", "y en JavaScript cómo sería",
+    "Entonces, ¿por dónde empiezo mañana?", "¿Eso también sirve para el portafolio?",
+]
+# Sobre el propio progreso: se cachean solo para el mismo usuario y contexto
+PERSONAL = [
+    "¿Cómo voy con mi plan esta semana?", "¿Qué me falta para terminar la fase actual?",
+    "¿Cuántas horas le dedico hoy al plan?",
+]
+
+CONTEXT = {"plan_title": "Backend con Python", "current_phase": "Fase 1"}
+FILLER_WORDS = "variable funcion bucle servidor base datos docker nube react javascript test clase modulo paquete red seguridad".split()
+
+
+def evaluate(threshold: float, filler: int):
+    cache = SemanticCache(threshold=threshold, max_entries=filler + len(INTENTS) + 10)
+    rng = random.Random(42)
+    for _ in range(filler):
+        cache.store(" ".join(rng.choice(FILLER_WORDS) for _ in range(8)) + " ?", CONTEXT, "relleno")
+    for intent, questions in INTENTS.items():
+        cache.store(questions[0], CONTEXT, intent, user_id=1)
+
+    hits = correct = false_positive = paraphrases = 0
+    latencies = []
+    for intent, questions in INTENTS.items():
+        for question in questions[1:]:
+            paraphrases += 1
+            start = time.perf_counter()
+            answer = cache.lookup(question, CONTEXT, user_id=2)
+            latencies.append(time.perf_counter() - start)
+            if answer is not None:
+                hits += 1
+                correct += answer == intent
+    for question in NEGATIVES:
+        start = time.perf_counter()
+        answer = cache.lookup(question, CONTEXT, user_id=2)
+        latencies.append(time.perf_counter() - start)
+        false_positive += answer is not None
+
+    precision = correct / (hits + false_positive) if hits + false_positive else 1.0
+    return {
+        "threshold": threshold,
+        "recall": hits / paraphrases,
+        "precision": precision,
+        "false_positive_rate": false_positive / len(NEGATIVES),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def _next_message(rng: random.Random, faq_share: float) -> str:
+    roll = rng.random()
+    if roll < faq_share:
+        return rng.choice(rng.choice(list(INTENTS.values())))
+    if roll < faq_share + (1 - faq_share) / 2:
+        return rng.choice(FOLLOW_UPS)
+    return rng.choice(PERSONAL)
+
+
+async def _real_path(api_url: str, fake_url: str, tokens, turns: int, faq_share: float):
+    rngs = [random.Random(i) for i in range(len(tokens))]
+    async with httpx.AsyncClient(base_url=api_url, timeout=60) as client:
+        llm_before = (await client.get(fake_url + "/stats")).json()["chat_requests"]
+        start = time.perf_counter()
+        # Turnos por rondas (un mensaje de cada usuario): el historial de cada uno crece
+        # con sus turnos y las preguntas de unos usuarios llegan después de las de otros
+        for _ in range(turns):
+            for token, rng in zip(tokens, rngs):
+                response = await client.post(
+                    "/chat/message", json={"message": _next_message(rng, faq_share)},
+                    headers={"Authorization": f"Bearer {token}"},
+                )
+                assert response.status_code == 200, response.text
+        elapsed = time.perf_counter() - start
+        cache = (await client.get("/chat/cache/stats")).json()
+        llm = (await client.get(fake_url + "/stats")).json()["chat_requests"] - llm_before
+    return cache, llm, elapsed
+
+
+def real_path(users: int, turns: int, faq_share: float, threshold: float):
+    fake_env = {"FAKE_FIRST_TOKEN_LATENCY": "0", "FAKE_TOKENS_PER_SECOND": "1000000", "FAKE_CHAT_LATENCY": "0"}
+    with tempfile.TemporaryDirectory() as tmp, uvicorn_server("benchmarks.fake_groq:app", fake_env) as fake_url:
+        app_env = {
+            "GROQ_API_KEY": "fake-key",
+            "GROQ_BASE_URL": fake_url,
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "SECRET_KEY": SECRET_KEY,
+            "SEMANTIC_CACHE_ENABLED": "true",
+            "SEMANTIC_CACHE_THRESHOLD": str(threshold),
+        }
+        tokens = _seed("small", app_env, users)["tokens"]
+        with uvicorn_process("app.main:app", app_env) as (api_url, _):
+            cache, llm, elapsed = asyncio.run(_real_path(api_url, fake_url, tokens, turns, faq_share))
+
+    total = len(tokens) * turns
+    print(f"Camino real: {len(tokens)} usuarios x {turns} turnos = {total} mensajes "
+          f"({faq_share:.0%} FAQ, resto seguimiento/personales), umbral {threshold}, {elapsed:.1f} s")
+    print(f"aciertos: {cache['hits']} de {total} ({cache['hits'] / total:.1%}): "
+          f"{cache['hits_shared']} compartidos, {cache['hits_user']} del mismo usuario")
+    print(f"entradas: {cache['entries']}  guardadas: {cache['stores']}")
+    print(f"llamadas de chat al LLM: {llm} (incluye resúmenes del historial)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.7, 0.75, 0.8, 0.85, 0.9])
+    parser.add_argument("--filler", type=int, default=2000)
+    parser.add_argument("--real", action="store_true", help="conversaciones por la API en lugar del corpus sintético")
+    parser.add_argument("--users", type=int, default=20, help="usuarios sembrados (escala small) con JWT")
+    parser.add_argument("--turns", type=int, default=30, help="mensajes por usuario")
+    parser.add_argument("--faq-share", type=float, default=0.6, help="fracción de preguntas tipo FAQ")
+    args = parser.parse_args()
+
+    if args.real:
+        real_path(args.users, args.turns, args.faq_share, settings.SEMANTIC_CACHE_THRESHOLD)
+        return
+
+    print(f"{'umbral':>7} {'recall':>7} {'precisión':>10} {'falsos +':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for threshold in args.thresholds:
+        r = evaluate(threshold, args.filler)
+        print(f"{r['threshold']:>7.2f} {r['recall']:>7.2f} {r['precision']:>10.2f} "
+              f"{r['false_positive_rate']:>9.2f} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
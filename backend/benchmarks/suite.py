@@ -0,0 +1,288 @@
+"""
+Suite de benchmarks de extremo a extremo, reproducible y sin API key de Groq.
+
+Por cada escala (benchmarks.seed: small, medium, large) siembra una base de datos
+nueva, arranca la API contra el Groq falso (latencia, ritmo de tokens y errores
+configurables) y ejecuta los perfiles de carga:
+  health  GET /health
+  chat    POST /chat/message, repartido entre usuarios sembrados (JWT de cada uno)
+  plan    POST /ai/generate-plan con perfiles variados (un 20 % repetidos, caché de planes)
+Cada perfil corre --duration segundos con su concurrencia y reporta throughput,
+p50/p95/p99, errores por código y memoria del proceso de la API (RSS al empezar,
+máximo durante la carga y pico del proceso).
+
+Los resultados se guardan en JSON (por defecto benchmarks/results/<fecha>-<commit>.json)
+con el commit, la configuración y cada ejecución, para comparar commits:
+    python -m benchmarks.suite --baseline benchmarks/results/antes.json
+    python -m benchmarks.suite --compare antes.json despues.json --threshold 0.1
+Con --fail-on-regression el proceso sale con código 1 si el p95 sube o el throughput
+baja más que --threshold en algún perfil.
+
+SQLite por defecto (un fichero temporal por escala). Con --database-url se usa esa base
+de datos (p. ej. Postgres) y se BORRAN sus tablas antes de sembrar cada escala.
+Con --app-dir se mide otra copia del backend (la siembra usa los modelos de esta copia):
+    git worktree add /tmp/before <commit> && python -m benchmarks.suite --app-dir /tmp/before/backend
+
+Uso (desde backend/):
+    python -m benchmarks.suite --scales small medium --profiles health chat plan --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import BACKEND_DIR, memory_mb, percentile, uvicorn_process, uvicorn_server
+from benchmarks.plan_batch import _cohort
+from benchmarks.seed import QUESTIONS, SCALES
+
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+SECRET_KEY = "benchmark-secret-key-not-for-production-use"
+
+
+@dataclass(frozen=True)
+class Profile:
+    method: str
+    path: str
+    concurrency: int
+
+
+PROFILES = {
+    "health": Profile("GET", "/health", 10),
+    "chat": Profile("POST", "/chat/message", 10),
+    "plan": Profile("POST", "/ai/generate-plan", 5),
+}
+PLAN_COHORT = _cohort(200, 0.2, seed=5)
+
+
+def _request(profile: str, i: int, tokens):
+    """(json, cabeceras) de la petición número i del perfil."""
+    headers = {"Authorization": f"Bearer {tokens[i % len(tokens)]}"} if tokens else {}
+    if profile == "chat":
+        return {"message": f"{QUESTIONS[i % len(QUESTIONS)]} ({i})"}, headers
+    if profile == "plan":
+        return PLAN_COHORT[i % len(PLAN_COHORT)], headers
+    return None, headers
+
+
+async def _load(base_url: str, name: str, concurrency: int, duration: float, tokens):
+    profile = PROFILES[name]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies, codes = [], {}
+    counter = iter(range(sys.maxsize))
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def worker(deadline: float):
+            while time.perf_counter() < deadline:
+                body, headers = _request(name, next(counter), tokens)
+                start = time.perf_counter()
+                try:
+                    response = await client.request(profile.method, profile.path, json=body, headers=headers)
+                    code = str(response.status_code)
+                except httpx.HTTPError as e:
+                    code = type(e).__name__
+                codes[code] = codes.get(code, 0) + 1
+                if code == "200":
+                    latencies.append(time.perf_counter() - start)
+
+        # Calentamiento: una petición por cliente que no cuenta
+        warmup = (_request(name, i, tokens) for i in range(concurrency))
+        await asyncio.gather(
+            *(client.request(profile.method, profile.path, json=body, headers=headers) for body, headers in warmup),
+            return_exceptions=True,
+        )
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(start + duration) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, codes, elapsed
+
+
+class MemorySampler(threading.Thread):
+    """Muestrea el RSS de un proceso cada `interval` segundos mientras dura la carga."""
+
+    def __init__(self, pid: int, interval: float = 0.2):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.start_rss = memory_mb(pid).get("rss")
+        self.max_rss = self.start_rss
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            rss = memory_mb(self.pid).get("rss")
+            if rss is not None:
+                self.max_rss = max(self.max_rss or 0, rss)
+
+    def stop(self) -> dict:
+        self._stop_event.set()
+        self.join()
+        return {"start": self.start_rss, "max": self.max_rss, "process_peak": memory_mb(self.pid).get("peak")}
+
+
+def _run_profile(base_url: str, pid: int, name: str, concurrency: int, duration: float, tokens) -> dict:
+    sampler = MemorySampler(pid)
+    sampler.start()
+    latencies, codes, elapsed = asyncio.run(_load(base_url, name, concurrency, duration, tokens))
+    memory = sampler.stop()
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        "profile": name,
+        "concurrency": concurrency,
+        "duration_seconds": round(elapsed, 2),
+        "requests": sum(codes.values()),
+        "ok": len(latencies),
+        "errors": sum(codes.values()) - len(latencies),
+        "status_codes": codes,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(ms, 50), 2),
+            "p95": round(percentile(ms, 95), 2),
+            "p99": round(percentile(ms, 99), 2),
+            "mean": round(sum(ms) / len(ms), 2) if ms else 0.0,
+            "max": round(max(ms), 2) if ms else 0.0,
+        },
+        "memory_mb": memory,
+    }
+
+
+def _seed(scale: str, env: dict, tokens: int) -> dict:
+    command = [sys.executable, "-m", "benchmarks.seed", "--scale", scale, "--tokens", str(tokens), "--reset"]
+    output = subprocess.run(
+        command, cwd=BACKEND_DIR, env={**os.environ, **env}, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _git(app_dir: Path, *args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=app_dir, capture_output=True, text=True, timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def _key(run: dict):
+    # Con otra concurrencia las cifras no son comparables
+    return run["scale"], run["profile"], run["concurrency"]
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    """Tabla de cambios entre dos resultados. Devuelve True si hay alguna regresión."""
+    print(f"\n{baseline['meta'].get('commit') or '?'} -> {current['meta'].get('commit') or '?'}")
+    print(f"{'escala':<8} {'perfil':<7} {'req/s':>22} {'p50 ms':>22} {'p95 ms':>22} {'p99 ms':>22} {'RSS máx MB':>22}")
+    before = {_key(run): run for run in baseline["runs"]}
+    regression = False
+    for run in current["runs"]:
+        old = before.get(_key(run))
+        if old is None:
+            continue
+
+        def cell(a, b):
+            if not a or b is None:
+                return f"{'-':>22}"
+            return f"{a:.1f}→{b:.1f} ({(b - a) / a:+.0%})".rjust(22)
+
+        slower = old["latency_ms"]["p95"] and run["latency_ms"]["p95"] > old["latency_ms"]["p95"] * (1 + threshold)
+        fewer = old["throughput_rps"] and run["throughput_rps"] < old["throughput_rps"] * (1 - threshold)
+        regression = regression or slower or fewer
+        print(f"{run['scale']:<8} {run['profile']:<7} {cell(old['throughput_rps'], run['throughput_rps'])} "
+              f"{cell(old['latency_ms']['p50'], run['latency_ms']['p50'])} "
+              f"{cell(old['latency_ms']['p95'], run['latency_ms']['p95'])} "
+              f"{cell(old['latency_ms']['p99'], run['latency_ms']['p99'])} "
+              f"{cell(old['memory_mb'].get('max'), run['memory_mb'].get('max'))}"
+              f"{'  ← regresión' if slower or fewer else ''}")
+    return regression
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", choices=SCALES, default=["small", "medium"])
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=list(PROFILES))
+    parser.add_argument("--duration", type=float, default=10, help="segundos de carga por perfil")
+    parser.add_argument("--concurrency", type=int, default=None, help="clientes por perfil (por defecto, el del perfil)")
+    parser.add_argument("--users", type=int, default=50, help="usuarios sembrados que reparten la carga de chat/plan")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="latencia del chat en el Groq falso")
+    parser.add_argument("--plan-latency", type=float, default=1.0, help="latencia de un plan en el Groq falso")
+    parser.add_argument("--tokens-per-second", type=float, default=500, help="ritmo de tokens en streaming")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fracción de 500 del Groq falso")
+    parser.add_argument("--database-url", default=None, help="base de datos de pruebas (se borran sus tablas)")
+    parser.add_argument("--app-dir", type=Path, default=BACKEND_DIR)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None, help="resultado anterior con el que comparar")
+    parser.add_argument("--compare", type=Path, nargs=2, metavar=("ANTES", "DESPUES"), help="solo comparar dos resultados")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, current = (json.loads(path.read_text()) for path in args.compare)
+        regression = compare(baseline, current, args.threshold)
+        sys.exit(1 if regression and args.fail_on_regression else 0)
+
+    fake_config = {
+        "FAKE_CHAT_LATENCY": str(args.llm_latency),
+        "FAKE_PLAN_LATENCY": str(args.plan_latency),
+        "FAKE_TOKENS_PER_SECOND": str(args.tokens_per_second),
+        "FAKE_ERROR_RATE": str(args.error_rate),
+    }
+    result = {
+        "meta": {
+            "commit": _git(args.app_dir, "rev-parse", "--short", "HEAD"),
+            "dirty": bool(_git(args.app_dir, "status", "--porcelain", "--", ".")),
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "database": "custom" if args.database_url else "sqlite",
+            "duration_seconds": args.duration,
+            "fake_groq": fake_config,
+        },
+        "runs": [],
+    }
+    print(f"{'escala':<8} {'perfil':<7} {'clientes':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>9} "
+          f"{'errores':>8} {'RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as stack:
+        fake_url = stack.enter_context(uvicorn_server("benchmarks.fake_groq:app", fake_config))
+        for scale in args.scales:
+            app_env = {
+                "GROQ_API_KEY": "fake-key",
+                "GROQ_BASE_URL": fake_url,
+                "DATABASE_URL": args.database_url or f"sqlite:///{tmp}/{scale}.db",
+                "SECRET_KEY": SECRET_KEY,
+            }
+            seeded = _seed(scale, app_env, args.users)
+            with uvicorn_process("app.main:app", app_env, cwd=args.app_dir) as (api_url, proc):
+                for name in args.profiles:
+                    concurrency = args.concurrency or PROFILES[name].concurrency
+                    run = _run_profile(api_url, proc.pid, name, concurrency, args.duration, seeded["tokens"])
+                    run.update(scale=scale, rows=seeded["rows"], seed_seconds=seeded["seconds"])
+                    result["runs"].append(run)
+                    latency, memory = run["latency_ms"], run["memory_mb"]
+                    print(f"{scale:<8} {name:<7} {concurrency:>8} {run['throughput_rps']:>8.1f} {latency['p50']:>8.1f} "
+                          f"{latency['p95']:>8.1f} {latency['p99']:>9.1f} {run['errors']:>8} "
+                          f"{memory.get('start') or 0:>5.0f}→{memory.get('max') or 0:<5.0f}")
+
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{result['meta']['commit'] or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2, ensure_ascii=False))
+    print(f"\nResultados: {output}")
+
+    if args.baseline:
+        regression = compare(json.loads(args.baseline.read_text()), result, args.threshold)
+        if regression and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
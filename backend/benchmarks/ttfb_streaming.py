@@ -0,0 +1,60 @@
+"""
+Tiempo hasta el primer byte (TTFB) y tiempo total: endpoints completos vs streaming SSE.
+
+Uso (desde backend/):
+    python -m benchmarks.ttfb_streaming --runs 5 --tokens-per-second 200
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.common import uvicorn_server
+
+CASES = [
+    ("/chat/message", "/chat/message/stream", {"message": "¿Qué es una API?"}),
+    ("/ai/generate-plan", "/ai/generate-plan/stream", {}),
+]
+
+
+def _timed(client: httpx.Client, path: str, body: dict):
+    start = time.perf_counter()
+    first = None
+    with client.stream("POST", path, json=body, timeout=300) as response:
+        for _ in response.iter_raw():
+            if first is None:
+                first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--first-token-latency", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    args = parser.parse_args()
+
+    fake_env = {
+        "FAKE_FIRST_TOKEN_LATENCY": str(args.first_token_latency),
+        "FAKE_TOKENS_PER_SECOND": str(args.tokens_per_second),
+        # Sin streaming, el servidor falso tarda lo mismo que generar todos los tokens
+        "FAKE_CHAT_LATENCY": str(args.first_token_latency + 25 / args.tokens_per_second),
+        "FAKE_PLAN_LATENCY": str(args.first_token_latency + 4000 / args.tokens_per_second),
+    }
+    with tempfile.TemporaryDirectory() as tmp, uvicorn_server("benchmarks.fake_groq:app", fake_env) as fake_url:
+        app_env = {"GROQ_API_KEY": "fake-key", "GROQ_BASE_URL": fake_url, "DATABASE_URL": f"sqlite:///{tmp}/bench.db"}
+        with uvicorn_server("app.main:app", app_env) as api_url, httpx.Client(base_url=api_url) as client:
+            client.post("/chat/message", json={"message": "hola"}, timeout=60)
+            print(f"{'endpoint':<28} {'TTFB (s)':>10} {'total (s)':>10}")
+            for full_path, stream_path, body in CASES:
+                for path in (full_path, stream_path):
+                    samples = [_timed(client, path, body) for _ in range(args.runs)]
+                    ttfb = statistics.median(s[0] for s in samples)
+                    total = statistics.median(s[1] for s in samples)
+                    print(f"{path:<28} {ttfb:>10.3f} {total:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
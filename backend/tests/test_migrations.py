@@ -0,0 +1,86 @@
+"""
+Migraciones sobre una base de datos con el esquema inicial (antes de 0001) y filas ya
+guardadas: las migraciones antiguas no pueden depender de columnas que añaden las
+posteriores.
+
+Ejecutar (desde backend/):
+    python -m pytest tests
+"""
+import asyncio
+import json
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.migrations import MIGRATIONS, run_migrations
+
+# Esquema del primer commit de la app (models.py sin columnas de trabajos, versión ni fases)
+BASELINE_SCHEMA = [
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, email VARCHAR(255) NOT NULL UNIQUE, name VARCHAR(255),
+        hashed_password VARCHAR(255), created_at DATETIME DEFAULT CURRENT_TIMESTAMP)""",
+    """CREATE TABLE career_plans (
+        id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(id), title VARCHAR(500) NOT NULL,
+        tech_stack TEXT, difficulty_level VARCHAR(50), hours_per_day INTEGER, goal VARCHAR(500),
+        timeline_weeks INTEGER, generated_plan TEXT, is_active BOOLEAN, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)""",
+    """CREATE TABLE chat_messages (
+        id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users(id), role VARCHAR(20) NOT NULL,
+        content TEXT NOT NULL, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)""",
+]
+
+STORED_PLAN = {
+    "plan_title": "De cero a backend",
+    "total_weeks": 12,
+    "phases": [
+        {"id": 1, "title": "Fundamentos de Python", "duration_weeks": 4, "description": "Sintaxis y tipos",
+         "learning_items": ["variables", "funciones"], "projects": [{"name": "CLI de tareas"}]},
+        {"id": 2, "title": "SQL y APIs", "duration_weeks": 8, "description": "Bases de datos y HTTP",
+         "learning_items": ["SELECT", "FastAPI"], "projects": [{"name": "API de notas"}]},
+    ],
+}
+
+
+async def _upgrade_baseline(url: str):
+    engine = create_async_engine(url)
+    try:
+        async with engine.begin() as conn:
+            for ddl in BASELINE_SCHEMA:
+                await conn.execute(text(ddl))
+            await conn.execute(text("INSERT INTO users (id, email, name) VALUES (1, 'ana@example.com', 'Ana')"))
+            await conn.execute(
+                text("INSERT INTO career_plans (id, user_id, title, tech_stack, generated_plan, is_active) "
+                     "VALUES (1, 1, 'De cero a backend', 'Python, SQL', :plan, 1)"),
+                {"plan": json.dumps(STORED_PLAN)},
+            )
+            await conn.execute(text("INSERT INTO chat_messages (user_id, role, content) VALUES (1, 'user', 'hola')"))
+
+        applied = await run_migrations(engine)
+
+        async with engine.connect() as conn:
+            plan = (await conn.execute(text(
+                "SELECT status, version, generated_plan FROM career_plans WHERE id = 1"
+            ))).one()
+            phases = (await conn.execute(text(
+                "SELECT position, title FROM plan_phases WHERE plan_id = 1 ORDER BY position"
+            ))).all()
+            indexed = (await conn.execute(text("SELECT count(*) FROM plan_search WHERE plan_id = 1"))).scalar()
+        # Una segunda pasada no aplica nada
+        again = await run_migrations(engine)
+        return applied, plan, phases, indexed, again
+    finally:
+        await engine.dispose()
+
+
+def test_upgrade_baseline_database_with_rows(tmp_path):
+    applied, plan, phases, indexed, again = asyncio.run(
+        _upgrade_baseline(f"sqlite+aiosqlite:///{tmp_path / 'baseline.db'}")
+    )
+
+    assert applied == [version for version, _ in MIGRATIONS]
+    assert again == []
+    assert plan.status == "completed"
+    assert plan.version == 1
+    # 0008 deja en generated_plan solo la cabecera y las fases en plan_phases
+    assert "phases" not in json.loads(plan.generated_plan)
+    assert [tuple(row) for row in phases] == [(1, "Fundamentos de Python"), (2, "SQL y APIs")]
+    assert indexed == 1